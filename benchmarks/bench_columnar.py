@@ -0,0 +1,95 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Columnar grid benchmarks
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+Compare the memory held by a Grid and a ColumnarGrid of the same parsed
+rows, and the time taken to build, read, dump and convert them to pandas
+DataFrames (if pandas is installed).  Run from the top of
+the source tree with::
+
+    python benchmarks/bench_columnar.py
+"""
+
+from __future__ import print_function
+
+import datetime
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hszinc  # noqa: E402
+
+
+def _history_text(count):
+    """
+    A history read as Zinc: a timestamp and a value per row.
+    """
+    tz = hszinc.zoneinfo.timezone('Brisbane')
+    start = tz.localize(datetime.datetime(2019, 1, 1))
+    step = datetime.timedelta(minutes=15)
+    grid = hszinc.Grid(version=hszinc.VER_3_0)
+    grid.column['ts'] = {}
+    grid.column['val'] = {'unit': 'kW'}
+    grid.column['status'] = {}
+    grid.extend({'ts': start + (step * i),
+                 'val': hszinc.Quantity(float(i % 97), 'kW'),
+                 'status': 'ok' if i % 10 else 'fault'}
+                for i in range(count))
+    return hszinc.dump(grid)
+
+
+def _size(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        # Grids hold reference cycles; let go of any built along the way.
+        gc.collect()
+        return (result, tracemalloc.get_traced_memory()[0] - before)
+    finally:
+        tracemalloc.stop()
+
+
+def main(count=100000, repeat=3):
+    text = _history_text(count)
+    print('history grid, %d rows, %d bytes of Zinc' % (count, len(text)))
+    (grid, grid_size) = _size(lambda: hszinc.parse(text))
+    (columnar, columnar_size) = _size(
+        lambda: hszinc.parse(text, columnar=True))
+    print('  Grid        %7.1f MB' % (grid_size / 1e6))
+    print('  ColumnarGrid %6.1f MB' % (columnar_size / 1e6))
+
+    for (name, g) in (('Grid', grid), ('ColumnarGrid', columnar)):
+        read = min(timeit.repeat(lambda: sum(1 for row in g),
+                                 number=1, repeat=repeat))
+        dump = min(timeit.repeat(lambda: hszinc.dump(g),
+                                 number=1, repeat=repeat))
+        print('  %-12s read %7.1f ms  dump %7.1f ms'
+              % (name, read * 1e3, dump * 1e3))
+    build = min(timeit.repeat(lambda: hszinc.ColumnarGrid.from_grid(grid),
+                              number=1, repeat=repeat))
+    values = columnar.column_array('val')
+    total = min(timeit.repeat(lambda: sum(values), number=1, repeat=repeat))
+    print('  from_grid %7.1f ms, sum of val column %5.1f ms'
+          % (build * 1e3, total * 1e3))
+
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        return
+    for (name, g) in (('Grid', grid), ('ColumnarGrid', columnar)):
+        frame = min(timeit.repeat(lambda: g.to_dataframe(),
+                                  number=1, repeat=repeat))
+        print('  %-12s to_dataframe %7.1f ms' % (name, frame * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Compact row benchmarks
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+Compare the memory held by a grid of entities parsed with `dict` rows and
+with CompactRows, and the time taken to parse, filter and dump each.  Run
+from the top of the source tree with::
+
+    python benchmarks/bench_compact.py
+"""
+
+from __future__ import print_function
+
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hszinc  # noqa: E402
+
+
+def _entity_text(count):
+    """
+    Points as read from an entity database: a dozen tags per row.
+    """
+    grid = hszinc.Grid(version=hszinc.VER_3_0)
+    for name in ('id', 'dis', 'point', 'sensor', 'temp', 'air', 'kind',
+                 'unit', 'siteRef', 'equipRef', 'tz', 'curVal'):
+        grid.column[name] = {}
+    grid.extend({'id': hszinc.Ref('p%d' % i),
+                 'dis': 'Point %d' % i,
+                 'point': hszinc.MARKER,
+                 'sensor': hszinc.MARKER,
+                 'temp': hszinc.MARKER,
+                 'air': hszinc.MARKER,
+                 'kind': 'Number',
+                 'unit': '°C',
+                 'siteRef': hszinc.Ref('s%d' % (i % 10)),
+                 'equipRef': hszinc.Ref('e%d' % (i % 1000)),
+                 'tz': 'Brisbane',
+                 'curVal': hszinc.Quantity(float(i % 40), '°C')}
+                for i in range(count))
+    return hszinc.dump(grid)
+
+
+def _size(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        # Grids hold reference cycles; let go of any built along the way.
+        gc.collect()
+        return (result, tracemalloc.get_traced_memory()[0] - before)
+    finally:
+        tracemalloc.stop()
+
+
+def main(count=100000, repeat=3):
+    text = _entity_text(count)
+    print('entity grid, %d rows, %d bytes of Zinc' % (count, len(text)))
+    for (name, compact) in (('dict', False), ('CompactRow', True)):
+        (grid, size) = _size(lambda: hszinc.parse(text, compact=compact))
+        parse = min(timeit.repeat(
+            lambda: hszinc.parse(text, compact=compact),
+            number=1, repeat=repeat))
+        found = min(timeit.repeat(
+            lambda: grid.filter('temp and siteRef == @s3'),
+            number=1, repeat=repeat))
+        dump = min(timeit.repeat(lambda: hszinc.dump(grid),
+                                 number=1, repeat=repeat))
+        print('  %-10s %6.1f MB  parse %6.1f ms  filter %6.1f ms  '
+              'dump %6.1f ms' % (name, size / 1e6, parse * 1e3,
+                                 found * 1e3, dump * 1e3))
+        del grid
+
+
+if __name__ == '__main__':
+    main()
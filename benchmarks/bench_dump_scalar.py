@@ -0,0 +1,60 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Scalar dumping micro-benchmarks
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+Time the dumping of each type of scalar, in both formats.  Run from the top
+of the source tree with::
+
+    python benchmarks/bench_dump_scalar.py
+"""
+
+from __future__ import print_function
+
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hszinc  # noqa: E402
+from hszinc import jsondumper, zincdumper  # noqa: E402
+from hszinc.zoneinfo import timezone  # noqa: E402
+
+SCALARS = [
+    ('null', None),
+    ('marker', hszinc.MARKER),
+    ('bool', True),
+    ('float', 42.5),
+    ('int', 42),
+    ('quantity', hszinc.Quantity(42.5, 'kW')),
+    ('str', 'Hello, world'),
+    ('ref', hszinc.Ref('p:demo:r:1eeaf0e4-5e1c1c53')),
+    ('uri', hszinc.Uri('http://example.com/')),
+    ('date', datetime.date(2019, 1, 2)),
+    ('time', datetime.time(3, 4, 5)),
+    ('datetime', timezone('Brisbane').localize(
+        datetime.datetime(2019, 1, 2, 3, 4, 5))),
+    ('coord', hszinc.Coordinate(-27.4710107, 153.0234489)),
+    ('list', [1.0, 2.0, 3.0]),
+]
+
+
+def main(number=100000):
+    print('%-10s %10s %10s' % ('', 'zinc', 'json'))
+    for (name, scalar) in SCALARS:
+        times = []
+        for module in (zincdumper, jsondumper):
+            dump = module.dump_scalar
+            elapsed = min(timeit.repeat(lambda: dump(scalar), number=number,
+                                        repeat=3))
+            times.append(elapsed * 1e6 / number)
+        print('%-10s %7.3f us %7.3f us' % tuple([name] + times))
+
+
+if __name__ == '__main__':
+    main()
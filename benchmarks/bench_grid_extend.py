@@ -0,0 +1,57 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Grid building benchmarks
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+Time building a large grid a chunk of rows at a time, as when reading a
+long history in pages.  Run from the top of the source tree with::
+
+    python benchmarks/bench_grid_extend.py [rows] [chunk rows]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hszinc  # noqa: E402
+
+
+def _chunks(rows, chunk_rows):
+    for start in range(0, rows, chunk_rows):
+        yield [{'id': hszinc.Ref('p%d' % i), 'val': float(i)}
+               for i in range(start, min(start + chunk_rows, rows))]
+
+
+def build(grid_class, version, rows, chunk_rows):
+    """
+    Build the grid, returning it and the time spent in extend().
+    """
+    grid = grid_class(version=version, columns={'id': {}, 'val': {}})
+    spent = 0.0
+    for chunk in _chunks(rows, chunk_rows):
+        start = time.perf_counter()
+        grid.extend(chunk)
+        spent += time.perf_counter() - start
+    return (grid, spent)
+
+
+def main(rows=1000000, chunk_rows=1000):
+    print('%d rows in chunks of %d' % (rows, chunk_rows))
+    for (grid_class, version) in ((hszinc.Grid, hszinc.VER_3_0),
+                                  (hszinc.Grid, None),
+                                  (hszinc.ColumnarGrid, hszinc.VER_3_0)):
+        (grid, spent) = build(grid_class, version, rows, chunk_rows)
+        assert grid['@p%d' % (rows - 1)]['val'] == rows - 1
+        print('  %-12s version %-4s %7.2f s'
+              % (grid_class.__name__, version or 'auto', spent))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
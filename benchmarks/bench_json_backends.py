@@ -0,0 +1,102 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# JSON backend benchmarks
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+Compare the installed JSON backends at parsing and dumping typical
+Project Haystack grids.  Run from the top of the source tree with::
+
+    python benchmarks/bench_json_backends.py
+"""
+
+from __future__ import print_function
+
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hszinc  # noqa: E402
+from hszinc.jsoncodec import available_json_backends  # noqa: E402
+
+
+def _points_grid(count):
+    """
+    A navigation style grid: many tags per row, mostly markers and strings.
+    """
+    grid = hszinc.Grid(version=hszinc.VER_3_0)
+    for name in ('id', 'dis', 'point', 'sensor', 'kind', 'unit', 'siteRef',
+                 'equipRef', 'curVal', 'tz'):
+        grid.column[name] = {}
+    for i in range(count):
+        grid.append({
+            'id': hszinc.Ref('p:demo:r:%08x' % i, 'Point %d' % i),
+            'dis': 'Site %d Meter %d Power' % (i // 100, i),
+            'point': hszinc.MARKER,
+            'sensor': hszinc.MARKER,
+            'kind': 'Number',
+            'unit': 'kW',
+            'siteRef': hszinc.Ref('p:demo:r:site%d' % (i // 100)),
+            'equipRef': hszinc.Ref('p:demo:r:equip%d' % (i // 10)),
+            'curVal': hszinc.Quantity(i * 0.25, 'kW'),
+            'tz': 'Brisbane',
+        })
+    return grid
+
+
+def _history_grid(count):
+    """
+    A history read: a timestamp and a value per row.
+    """
+    grid = hszinc.Grid(version=hszinc.VER_3_0, metadata={
+        'id': hszinc.Ref('p:demo:r:1'),
+        'hisStart': datetime.datetime(2019, 1, 1,
+                                      tzinfo=hszinc.zoneinfo.timezone('UTC')),
+    })
+    grid.column['ts'] = {}
+    grid.column['val'] = {'unit': 'kW'}
+    tz = hszinc.zoneinfo.timezone('Brisbane')
+    start = tz.localize(datetime.datetime(2019, 1, 1))
+    step = datetime.timedelta(minutes=15)
+    for i in range(count):
+        grid.append({'ts': start + (step * i),
+                     'val': hszinc.Quantity(i % 97, 'kW')})
+    return grid
+
+
+GRIDS = [
+    ('points', _points_grid(2000)),
+    ('history', _history_grid(5000)),
+]
+
+
+def main(repeat=5):
+    backends = available_json_backends()
+    for (name, grid) in GRIDS:
+        text = hszinc.dump(grid, mode=hszinc.MODE_JSON)
+        print('%s grid, %d rows, %d bytes' % (name, len(grid), len(text)))
+        # Warm up the time zone caches.
+        hszinc.parse(text, mode=hszinc.MODE_JSON)
+        for backend in backends:
+            hszinc.use_json_backend(backend)
+            parse = min(timeit.repeat(
+                lambda: hszinc.parse(text, mode=hszinc.MODE_JSON),
+                number=1, repeat=repeat))
+            decode = min(timeit.repeat(
+                lambda: hszinc.jsoncodec.loads(text),
+                number=1, repeat=repeat))
+            dump = min(timeit.repeat(
+                lambda: hszinc.dump(grid, mode=hszinc.MODE_JSON),
+                number=1, repeat=repeat))
+            print('  %-10s parse %7.1f ms (decode %6.1f ms)  dump %7.1f ms'
+                  % (backend, parse * 1e3, decode * 1e3, dump * 1e3))
+    hszinc.use_json_backend()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# JSON scalar decoding micro-benchmarks
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+Time the decoding of each type of JSON scalar.  Run from the top of the
+source tree with::
+
+    python benchmarks/bench_json_scalar.py
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hszinc.jsonparser import parse_embedded_scalar  # noqa: E402
+
+SCALARS = [
+    ('marker', 'm:'),
+    ('na', 'z:'),
+    ('remove', '-:'),
+    ('number', 'n:42.5'),
+    ('quantity', 'n:42.5 kW'),
+    ('str', 's:Hello, world'),
+    ('ref', 'r:p:demo:r:1eeaf0e4-5e1c1c53'),
+    ('ref+dis', 'r:p:demo:r:1eeaf0e4-5e1c1c53 Site Meter'),
+    ('date', 'd:2019-01-02'),
+    ('time', 'h:03:04:05.123'),
+    ('datetime', 't:2019-01-02T03:04:05+10:00 Brisbane'),
+    ('datetime UTC', 't:2019-01-02T03:04:05Z UTC'),
+    ('uri', 'u:http://example.com/'),
+    ('bin', 'b:text/plain'),
+    ('coord', 'c:-27.4710107,153.0234489'),
+    ('xstr', 'x:Span:today'),
+    ('plain', 'no prefix'),
+    ('bool', True),
+    ('null', None),
+]
+
+
+def main(number=100000):
+    for (name, scalar) in SCALARS:
+        elapsed = min(timeit.repeat(
+            lambda: parse_embedded_scalar(scalar), number=number, repeat=3))
+        print('%-14s %8.3f us' % (name, elapsed * 1e6 / number))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,37 +4,65 @@
 #
 # vim: set ts=4 sts=4 et tw=78 sw=4 si:
 
+import sys
 import warnings
 
-# First verify if pint is available
-PINT_AVAILABLE = False
+# First verify if pint is available.  It is slow to import and to set up, so
+# is left alone until it is needed.
 try:
-    from pint import UnitRegistry
+    from importlib.util import find_spec
 
-    PINT_AVAILABLE = True
-    from .pintutil import define_haystack_units
-
-    ureg = define_haystack_units()
+    PINT_AVAILABLE = find_spec('pint') is not None
 except ImportError:  # pragma: no cover
-    # For setup.py to interrogate the version information.  This should *NOT*
-    # get executed in production, and if it did, things wouldn't work anyway.
-    ureg = {'Quantity': None}
+    # Python 2
+    try:
+        import pint
+
+        PINT_AVAILABLE = True
+    except ImportError:
+        PINT_AVAILABLE = False
+
+
+def __getattr__(name):
+    # The pint unit registry is built the first time it is asked for.
+    if name == 'ureg':
+        if not PINT_AVAILABLE:  # pragma: no cover
+            # For setup.py to interrogate the version information.  This
+            # should *NOT* get used in production, and if it did, things
+            # wouldn't work anyway.
+            return {'Quantity': None}
+        from .pintutil import get_unit_registry
+        return get_unit_registry()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+if sys.version_info < (3, 7) and PINT_AVAILABLE:  # pragma: no cover
+    # No module __getattr__ before Python 3.7; build the registry now.
+    from .pintutil import get_unit_registry
+
+    ureg = get_unit_registry()
 
 try:
     from .grid import Grid
-    from .dumper import dump, dump_scalar
-    from .parser import parse, parse_scalar, MODE_JSON, MODE_ZINC
+    from .columnar import ColumnarGrid
+    from .compactrow import CompactRow
+    from .dumper import dump, dump_to, iter_dump, dump_scalar, \
+        register_scalar_dumper
+    from .parser import parse, parse_file, iter_parse, parse_header, \
+        parse_scalar, MODE_JSON, MODE_ZINC, ON_ERROR_RAISE, ON_ERROR_COLLECT
     from .grid_filter import parse_filter
+    from .jsoncodec import use_json_backend, JSON_BACKENDS
     from .metadata import MetadataObject
     from .datatypes import Quantity, Coordinate, Uri, Bin, MARKER, NA, \
         REMOVE, Ref, XStr, use_pint
     from .version import Version, VER_2_0, VER_3_0, LATEST_VER
 
     Q_ = Quantity
-    __all__ = ['Grid', 'dump', 'parse', 'dump_scalar', 'parse_scalar', 'parse_filter',
+    __all__ = ['Grid', 'ColumnarGrid', 'CompactRow', 'dump', 'dump_to', 'iter_dump', 'parse', 'parse_file', 'iter_parse', 'parse_header', 'dump_scalar', 'register_scalar_dumper', 'parse_scalar', 'parse_filter',
                'MetadataObject', 'ureg',
                'Coordinate', 'Uri', 'Bin', 'XStr', 'Quantity', 'MARKER', 'NA', 'REMOVE', 'Ref',
-               'MODE_JSON', 'MODE_ZINC',
+               'MODE_JSON', 'MODE_ZINC', 'ON_ERROR_RAISE', 'ON_ERROR_COLLECT',
+               'use_json_backend', 'JSON_BACKENDS',
                'VER_2_0', 'VER_3_0', 'LATEST_VER', 'Version']
 except ImportError as e:  # pragma: no cover
     # For setup.py to interrogate the version information.  This should *NOT*
@@ -0,0 +1,646 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Grids stored column by column
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+import datetime
+import numbers
+from array import array
+
+import pytz
+import six
+
+from .datatypes import BasicQuantity, Ref, MarkerType, NAType, RemoveType
+from .grid import Grid, ROW_TYPES
+from .gridindex import ABSENT
+from .version import VER_3_0
+
+try:
+    import collections.abc as col
+except ImportError:  # pragma: no cover
+    import collections as col
+
+# Stands in for a cell whose row does not have the column at all, as
+# distinct from a cell holding None.
+_ABSENT = object()
+
+# Cell codes shared by the typed columns.
+_CODE_ABSENT = 0
+_CODE_NONE = 1
+
+# Largest integer a double holds exactly.
+_MAX_EXACT_INT = 2 ** 53
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+_NAIVE_EPOCH = EPOCH.replace(tzinfo=None)
+
+# Stored in a datetime column's epoch array for cells without a datetime.
+NO_TIMESTAMP = -2 ** 63
+
+# A dictionary-encoded column with more distinct values than this, making
+# up more than half its cells, is not worth encoding and is kept as a list.
+_MAX_DISTINCT = 256
+
+# Types (exactly, not subclasses) held in dictionary-encoded columns.
+_DICTIONARY_TYPES = frozenset(
+    set(six.string_types) | {six.text_type, bool, Ref, MarkerType, NAType,
+                             RemoveType, datetime.date, datetime.time})
+
+
+class _ObjectColumn(object):
+    """
+    A column of any values, kept in a list.  Used for values the typed
+    columns cannot hold.
+    """
+
+    def __init__(self, cells=()):
+        self._cells = list(cells)
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __iter__(self):
+        return iter(self._cells)
+
+    def get(self, index):
+        return self._cells[index]
+
+    def is_null(self):
+        return False
+
+    def fill(self, count):
+        self._cells.extend([_ABSENT] * count)
+
+    def extend(self, cells):
+        self._cells.extend(cells)
+        return True
+
+    def append(self, value):
+        self._cells.append(value)
+        return True
+
+    def insert(self, index, value):
+        self._cells.insert(index, value)
+        return True
+
+    def set(self, index, value):
+        self._cells[index] = value
+        return True
+
+    def delete(self, index):
+        del self._cells[index]
+
+    def slice(self, key):
+        return _ObjectColumn(self._cells[key])
+
+
+class _TypedColumn(object):
+    """
+    A column whose cells are encoded into parallel arrays, one item per
+    array for each cell.  Subclasses give `_encode`, returning that item
+    for each array (or None if the value does not fit the column) and
+    `_decode`.
+    """
+
+    def __init__(self):
+        self._arrays = self._new_arrays()
+
+    def __len__(self):
+        return len(self._arrays[0])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.get(index)
+
+    def is_null(self):
+        return False
+
+    def fill(self, count):
+        for (arr, item) in zip(self._arrays, self._encode(_ABSENT)):
+            arr.extend(array(arr.typecode, [item]) * count)
+
+    def extend(self, cells):
+        for value in cells:
+            if not self.append(value):
+                return False
+        return True
+
+    def append(self, value):
+        items = self._encode(value)
+        if items is None:
+            return False
+        for (arr, item) in zip(self._arrays, items):
+            arr.append(item)
+        return True
+
+    def insert(self, index, value):
+        items = self._encode(value)
+        if items is None:
+            return False
+        for (arr, item) in zip(self._arrays, items):
+            arr.insert(index, item)
+        return True
+
+    def set(self, index, value):
+        items = self._encode(value)
+        if items is None:
+            return False
+        for (arr, item) in zip(self._arrays, items):
+            arr[index] = item
+        return True
+
+    def delete(self, index):
+        for arr in self._arrays:
+            del arr[index]
+
+    def slice(self, key):
+        result = self._copy()
+        result._arrays = tuple(arr[key] for arr in self._arrays)
+        return result
+
+
+class _NumberColumn(_TypedColumn):
+    """
+    Numbers and quantities, as an array of doubles and an array of codes
+    saying what each one is: absent, None, a float, an integer, or a
+    quantity in one of the column's units.
+    """
+    _CODE_FLOAT = 2
+    _CODE_INT = 3
+    _CODE_UNIT = 4
+    _MAX_UNITS = 0xffff - _CODE_UNIT
+
+    def __init__(self):
+        super(_NumberColumn, self).__init__()
+        self._units = []
+        self._unit_codes = {}
+
+    @staticmethod
+    def _new_arrays():
+        return (array('d'), array('H'))
+
+    def _copy(self):
+        result = _NumberColumn()
+        result._units = list(self._units)
+        result._unit_codes = dict(self._unit_codes)
+        return result
+
+    def _encode(self, value):
+        if value is _ABSENT:
+            return (float('nan'), _CODE_ABSENT)
+        elif value is None:
+            return (float('nan'), _CODE_NONE)
+        value_type = type(value)
+        if value_type is float:
+            return (value, self._CODE_FLOAT)
+        elif value_type is int:
+            if -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT:
+                return (float(value), self._CODE_INT)
+        elif value_type is BasicQuantity:
+            if type(value.value) is not float:
+                return None
+            try:
+                code = self._unit_codes.get(value.unit)
+            except TypeError:
+                return None
+            if code is None:
+                if len(self._units) >= self._MAX_UNITS:
+                    return None
+                code = self._CODE_UNIT + len(self._units)
+                self._units.append(value.unit)
+                self._unit_codes[value.unit] = code
+            return (value.value, code)
+        return None
+
+    def _decode(self, index):
+        (values, codes) = self._arrays
+        code = codes[index]
+        if code == self._CODE_FLOAT:
+            return values[index]
+        elif code >= self._CODE_UNIT:
+            return BasicQuantity(values[index],
+                                 self._units[code - self._CODE_UNIT])
+        elif code == self._CODE_INT:
+            return int(values[index])
+        elif code == _CODE_NONE:
+            return None
+        return _ABSENT
+
+    get = _decode
+
+
+class _DateTimeColumn(_TypedColumn):
+    """
+    Timezone-aware date/times, as an array of microseconds since the epoch
+    and an array of codes giving each one's timezone and UTC offset (or
+    saying it is absent or None).
+    """
+    _CODE_ZONE = 2
+    _MAX_ZONES = 0xffff - _CODE_ZONE
+
+    def __init__(self):
+        super(_DateTimeColumn, self).__init__()
+        self._zones = []
+        self._zone_codes = {}
+
+    @staticmethod
+    def _new_arrays():
+        return (array('q'), array('H'))
+
+    def _copy(self):
+        result = _DateTimeColumn()
+        result._zones = list(self._zones)
+        result._zone_codes = dict(self._zone_codes)
+        return result
+
+    def _encode(self, value):
+        if value is _ABSENT:
+            return (NO_TIMESTAMP, _CODE_ABSENT)
+        elif value is None:
+            return (NO_TIMESTAMP, _CODE_NONE)
+        elif type(value) is not datetime.datetime \
+                or value.utcoffset() is None:
+            return None
+        offset = value.utcoffset()
+        # The same wall time, offset and zone give back the same value
+        # without looking the zone up again.
+        zone = (value.tzinfo, offset, getattr(value, 'fold', 0))
+        try:
+            code = self._zone_codes.get(zone)
+        except TypeError:
+            return None
+        if code is None:
+            if len(self._zones) >= self._MAX_ZONES:
+                return None
+            code = self._CODE_ZONE + len(self._zones)
+            self._zones.append(zone)
+            self._zone_codes[zone] = code
+        delta = value - EPOCH
+        return ((((delta.days * 86400) + delta.seconds) * 1000000)
+                + delta.microseconds, code)
+
+    def _decode(self, index):
+        (stamps, codes) = self._arrays
+        code = codes[index]
+        if code >= self._CODE_ZONE:
+            (tz, offset, fold) = self._zones[code - self._CODE_ZONE]
+            local = _NAIVE_EPOCH + offset \
+                + datetime.timedelta(microseconds=stamps[index])
+            if fold:
+                return local.replace(tzinfo=tz, fold=fold)
+            return local.replace(tzinfo=tz)
+        elif code == _CODE_NONE:
+            return None
+        return _ABSENT
+
+    get = _decode
+
+
+class _DictionaryColumn(_TypedColumn):
+    """
+    Strings, Refs, markers and other values that tend to repeat, each kept
+    once in a list of the column's distinct values with an array of codes
+    pointing into it.  Equal values come back as the same object.
+    """
+    _CODE_VALUE = 2
+
+    def __init__(self):
+        super(_DictionaryColumn, self).__init__()
+        self._values = []
+        self._value_codes = {}
+
+    @staticmethod
+    def _new_arrays():
+        return (array('I'),)
+
+    def _copy(self):
+        result = _DictionaryColumn()
+        result._values = list(self._values)
+        result._value_codes = dict(self._value_codes)
+        return result
+
+    def is_null(self):
+        return not self._values
+
+    def _encode(self, value):
+        if value is _ABSENT:
+            return (_CODE_ABSENT,)
+        elif value is None:
+            return (_CODE_NONE,)
+        value_type = type(value)
+        if value_type not in _DICTIONARY_TYPES:
+            return None
+        # Keyed on the type too, or True, 1 and 1.0 would be one value.
+        key = (value_type, value)
+        try:
+            code = self._value_codes.get(key)
+        except TypeError:
+            return None
+        if code is None:
+            count = len(self._values)
+            if (count >= _MAX_DISTINCT) and (count * 2 > len(self)):
+                return None
+            code = self._CODE_VALUE + count
+            self._values.append(value)
+            self._value_codes[key] = code
+        return (code,)
+
+    def _decode(self, index):
+        code = self._arrays[0][index]
+        if code >= self._CODE_VALUE:
+            return self._values[code - self._CODE_VALUE]
+        elif code == _CODE_NONE:
+            return None
+        return _ABSENT
+
+    get = _decode
+
+
+def _new_column(value):
+    """
+    Return an empty column suited to holding the given value.
+    """
+    value_type = type(value)
+    if value_type in (float, int, BasicQuantity):
+        column = _NumberColumn()
+    elif value_type is datetime.datetime:
+        column = _DateTimeColumn()
+    elif (value is None) or (value is _ABSENT) \
+            or (value_type in _DICTIONARY_TYPES):
+        column = _DictionaryColumn()
+    else:
+        return _ObjectColumn()
+    if column._encode(value) is None:
+        # Such as a naive datetime, or an integer too big for a double.
+        return _ObjectColumn()
+    return column
+
+
+def _rebuild(column, cells, value):
+    """
+    Return a new column holding the given cells, for when `column` could
+    not take `value`.  A column that has only seen absent or None cells
+    is swapped for one suited to the value; otherwise it is kept in a list.
+    """
+    if column.is_null():
+        result = _new_column(value)
+        if result.extend(cells):
+            return result
+    return _ObjectColumn(cells)
+
+
+class _RowView(col.Sequence):
+    """
+    The rows of a ColumnarGrid, as seen by the Grid methods that use
+    `_row` directly.
+    """
+
+    def __init__(self, grid):
+        self._grid = grid
+
+    def __len__(self):
+        return len(self._grid)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._grid[index])
+        return self._grid[index]
+
+    def __iter__(self):
+        return iter(self._grid)
+
+
+class ColumnarGrid(Grid):
+    '''
+    A grid that stores its rows column by column.  Numbers and quantities
+    are kept in an array of doubles, timezone-aware date/times as 64-bit
+    microseconds since the epoch with a timezone code, and strings, Refs
+    and markers dictionary-encoded; anything else is kept in a list.  This
+    takes a fraction of the memory of a list of row dicts when there are
+    many rows.
+
+    The rows themselves are built when they are asked for, so each row
+    read is a new dict: changing it does not change the grid.  To update a
+    row, assign it back (``grid[i] = row``).
+    '''
+
+    @classmethod
+    def from_grid(cls, grid):
+        '''
+        Return a ColumnarGrid holding the same metadata, columns and rows as
+        the given grid.
+        '''
+        result = cls(metadata=grid.metadata, columns=grid.column)
+        result._version = grid._version
+        result._version_given = grid._version_given
+        result.errors = list(grid.errors)
+        result.extend(grid)
+        return result
+
+    @property
+    def _row(self):
+        return _RowView(self)
+
+    @_row.setter
+    def _row(self, rows):
+        # Column name -> column of cells; every column has one per row.
+        self._data = {}
+        self._length = 0
+        self._index = None
+        self._indexes_stale()
+        for row in rows:
+            self._append_row(row)
+
+    def column_array(self, name):
+        '''
+        Return the cells of a column of numbers (as an array of doubles) or
+        of date/times (as an array of 64-bit microseconds since the epoch),
+        for vectorised access.  Cells that are absent or None read as NaN
+        in a number column and as NO_TIMESTAMP in a date/time column.  The
+        array is the grid's own, so is only valid until the grid changes.
+        '''
+        column = self._data[name]
+        if not isinstance(column, (_NumberColumn, _DateTimeColumn)):
+            raise TypeError('Column %r is not stored as numbers or '
+                            'date/times' % name)
+        return column._arrays[0]
+
+    def __len__(self):
+        '''
+        Return the number of rows in the grid.
+        '''
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self._row_at(index)
+
+    def __getitem__(self, key):
+        '''
+        Retrieve the row at index.
+        '''
+        if isinstance(key, slice):
+            result = self.__class__(version=self.version,
+                                    metadata=self.metadata,
+                                    columns=self.column)
+            result._data = dict((name, column.slice(key))
+                                for (name, column) in self._data.items())
+            result._length = len(range(self._length)[key])
+            return result
+        elif isinstance(key, numbers.Number):
+            return self._row_at(self._position(key))
+        else:
+            if not self._index:
+                self.reindex()
+            return self._row_at(self._index[str(key)])
+
+    def get(self, index, default=None):
+        if not self._index:
+            self.reindex()
+        position = self._index.get(str(index))
+        if position is None:
+            return default
+        return self._row_at(position)
+
+    def __setitem__(self, index, value):
+        '''
+        Replace the row at index.
+        '''
+        if not isinstance(value, ROW_TYPES):
+            raise TypeError('value must be a dict')
+        self._detect_or_validate_row(value)
+        index = self._position(index)
+        old_value = self._row_at(index) if self._indexes else None
+        self._store(value, lambda column, cell: column.set(index, cell),
+                    lambda cells, cell: cells.__setitem__(index, cell))
+        self._index = None
+        if self._indexes:
+            self._indexed_replace(index, old_value, value)
+
+    def __delitem__(self, index):
+        '''
+        Delete the row at index.
+        '''
+        if isinstance(index, slice):
+            removed = len(range(self._length)[index])
+        else:
+            index = self._position(index)
+            removed = 1
+        if self._indexes:
+            self._indexed_delete(
+                index, None if removed != 1 else self._row_at(index))
+        for column in self._data.values():
+            column.delete(index)
+        self._length -= removed
+        self._index = None
+
+    def insert(self, index, value):
+        '''
+        Insert a new row before index.
+        '''
+        if not isinstance(value, ROW_TYPES):
+            raise TypeError('value must be a dict')
+        self._detect_or_validate_row(value)
+        # Clamp the position the way list.insert() does.
+        if index < 0:
+            index = max(index + self._length, 0)
+        if index >= self._length:
+            self._append_row(value)
+            return
+        self._indexes_stale()
+        self._store(value, lambda column, cell: column.insert(index, cell),
+                    lambda cells, cell: cells.insert(index, cell))
+        self._length += 1
+        self._index = None
+
+    def extend(self, values):
+        check = self.nearest_version < VER_3_0
+        for value in values:
+            if not isinstance(value, ROW_TYPES):
+                raise TypeError('value must be a dict')
+            if check:
+                self._detect_or_validate_row(value)
+            self._append_row(value)
+
+    def compact(self):
+        '''
+        The cells are already held column by column, so there is nothing
+        to do.
+        '''
+
+    def reindex(self):
+        '''
+        Reindex the grid if a user, update directly an id of a row
+        '''
+        self._index = {}
+        column = self._data.get('id')
+        if column is None:
+            return
+        for (position, value) in enumerate(column):
+            if value is not _ABSENT:
+                self._index[str(value)] = position
+
+    def _tag_values(self, tag):
+        column = self._data.get(tag)
+        if column is None:
+            return (ABSENT for position in range(self._length))
+        return (ABSENT if value is _ABSENT else value for value in column)
+
+    def _position(self, index):
+        '''
+        Return the non-negative position of row `index`.
+        '''
+        if index < 0:
+            index += self._length
+        if not (0 <= index < self._length):
+            raise IndexError('grid index out of range')
+        return index
+
+    def _row_at(self, position):
+        row = {}
+        for (name, column) in self._data.items():
+            value = column.get(position)
+            if value is not _ABSENT:
+                row[name] = value
+        return row
+
+    def _append_row(self, row):
+        data = self._data
+        for (name, column) in data.items():
+            value = row.get(name, _ABSENT)
+            if not column.append(value):
+                cells = list(column)
+                cells.append(value)
+                data[name] = _rebuild(column, cells, value)
+        for name in row:
+            if name not in data:
+                column = _new_column(row[name])
+                column.fill(self._length)
+                column.append(row[name])
+                data[name] = column
+        self._length += 1
+        if self._index and ('id' in row):
+            self._index[str(row['id'])] = self._length - 1
+        if self._indexes:
+            self._indexed_add(self._length - 1, row)
+
+    def _store(self, row, store, store_cell):
+        '''
+        Store the cells of `row` with `store(column, cell)`, or failing
+        that, by rebuilding the column from its cells after
+        `store_cell(cells, cell)`.
+        '''
+        data = self._data
+        for name in row:
+            if name not in data:
+                column = _new_column(row[name])
+                column.fill(self._length)
+                data[name] = column
+        for (name, column) in data.items():
+            value = row.get(name, _ABSENT)
+            if not store(column, value):
+                cells = list(column)
+                store_cell(cells, value)
+                data[name] = _rebuild(column, cells, value)
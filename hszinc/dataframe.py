@@ -0,0 +1,382 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Conversion of grids to and from NumPy arrays and pandas DataFrames
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+NumPy and pandas are optional; this module is only imported by the Grid
+methods that need them.  Each column is given a kind from the values it
+holds:
+
+- numbers and quantities (all in the same unit) become float64
+- timezone-aware date/times become datetime64[us] in UTC, and in pandas are
+  converted to the column's timezone if they all share one
+- booleans and markers become booleans; a marker column is true where the
+  row has the tag
+- strings and Refs become objects, or categoricals in pandas
+- anything else, or a mixture of these, is left as objects
+
+None, NA and absent cells are masked (absent marker cells are false).
+"""
+
+import collections
+import datetime
+import math
+import numbers
+
+import pytz
+import six
+
+from .columnar import ColumnarGrid, NO_TIMESTAMP, _NumberColumn, \
+    _DateTimeColumn, _DictionaryColumn
+from .datatypes import Quantity, Ref, MARKER, NA
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+try:
+    import pandas
+except ImportError:  # pragma: no cover
+    pandas = None
+
+KIND_NUMBER = 'number'
+KIND_DATETIME = 'datetime'
+KIND_BOOL = 'bool'
+KIND_MARKER = 'marker'
+KIND_CATEGORY = 'category'
+KIND_OBJECT = 'object'
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+# Types whose columns become categoricals.
+_CATEGORY_TYPES = frozenset(set(six.string_types) | {six.text_type, Ref})
+
+# Stands in for a cell left out of a row.
+_ABSENT = object()
+
+# A column's data, as returned by _column_data.
+ColumnData = collections.namedtuple('ColumnData',
+                                    ['kind', 'data', 'mask', 'unit', 'zone',
+                                     'categories'])
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError('NumPy is required to convert grids to arrays')
+
+
+def _require_pandas():
+    if pandas is None:
+        raise ImportError('pandas is required to convert grids to and '
+                          'from DataFrames')
+
+
+def _zone_name(tz):
+    """
+    Return the IANA name of a timezone, or None if it has none.
+    """
+    return getattr(tz, 'zone', None) or getattr(tz, 'key', None)
+
+
+def _micros(value):
+    delta = value - EPOCH
+    return (((delta.days * 86400) + delta.seconds) * 1000000) \
+        + delta.microseconds
+
+
+def _classify(cells):
+    """
+    Return the kind of a column's cells, and the unit or timezone name
+    they share (None if there is none).
+    """
+    kind = None
+    shared = None
+    for value in cells:
+        if (value is None) or (value is NA):
+            continue
+        value_type = type(value)
+        if value is MARKER:
+            (value_kind, detail) = (KIND_MARKER, None)
+        elif value_type is bool:
+            (value_kind, detail) = (KIND_BOOL, None)
+        elif isinstance(value, Quantity):
+            (value_kind, detail) = (KIND_NUMBER, value.unit)
+        elif isinstance(value, numbers.Real):
+            (value_kind, detail) = (KIND_NUMBER, None)
+        elif isinstance(value, datetime.datetime) \
+                and (value.utcoffset() is not None):
+            (value_kind, detail) = (KIND_DATETIME, _zone_name(value.tzinfo))
+        elif value_type in _CATEGORY_TYPES:
+            (value_kind, detail) = (KIND_CATEGORY, value_type)
+        else:
+            return (KIND_OBJECT, None)
+
+        if kind is None:
+            (kind, shared) = (value_kind, detail)
+        elif kind != value_kind:
+            return (KIND_OBJECT, None)
+        elif shared != detail:
+            if kind == KIND_DATETIME:
+                # Mixed timezones are given in UTC.
+                shared = None
+            elif kind != KIND_NUMBER or ((shared is not None)
+                                         and (detail is not None)):
+                return (KIND_OBJECT, None)
+            else:
+                # Plain numbers alongside quantities in one unit.
+                shared = shared or detail
+    return (kind or KIND_OBJECT, shared)
+
+
+def _cells_data(cells):
+    """
+    Convert a list of cells (None where absent) to arrays.
+    """
+    (kind, shared) = _classify(cells)
+    count = len(cells)
+    mask = numpy.fromiter(((value is None) or (value is NA)
+                           for value in cells), dtype=bool, count=count)
+    unit = None
+    zone = None
+    if kind == KIND_NUMBER:
+        unit = shared
+        data = numpy.fromiter(
+            (float('nan') if ((value is None) or (value is NA))
+             else float(getattr(value, 'value', value))
+             for value in cells), dtype=numpy.float64, count=count)
+    elif kind == KIND_DATETIME:
+        zone = shared
+        data = numpy.fromiter(
+            (NO_TIMESTAMP if ((value is None) or (value is NA))
+             else _micros(value) for value in cells),
+            dtype=numpy.int64, count=count).view('datetime64[us]')
+    elif kind == KIND_BOOL:
+        data = numpy.fromiter((value is True for value in cells),
+                              dtype=bool, count=count)
+    elif kind == KIND_MARKER:
+        data = numpy.fromiter((value is MARKER for value in cells),
+                              dtype=bool, count=count)
+        mask = numpy.fromiter((value is NA for value in cells),
+                              dtype=bool, count=count)
+    else:
+        data = numpy.empty(count, dtype=object)
+        for (index, value) in enumerate(cells):
+            data[index] = None if (value is NA) else value
+    return ColumnData(kind, data, mask, unit, zone, None)
+
+
+def _columnar_data(column):
+    """
+    Convert a column of a ColumnarGrid straight from its arrays, or return
+    None if its values need looking at one by one.
+    """
+    if isinstance(column, _NumberColumn):
+        (values, codes) = column._arrays
+        codes = numpy.frombuffer(codes, dtype=numpy.uint16).copy()
+        present = codes >= column._CODE_FLOAT
+        found = numpy.unique(codes[present])
+        if len(found) and (found[-1] >= column._CODE_UNIT):
+            if len(found) > 1:
+                return None
+            unit = column._units[int(found[0]) - column._CODE_UNIT]
+        else:
+            unit = None
+        data = numpy.frombuffer(values, dtype=numpy.float64).copy()
+        return ColumnData(KIND_NUMBER, data, ~present, unit, None, None)
+
+    elif isinstance(column, _DateTimeColumn):
+        (stamps, codes) = column._arrays
+        codes = numpy.frombuffer(codes, dtype=numpy.uint16).copy()
+        present = codes >= column._CODE_ZONE
+        zones = set(_zone_name(column._zones[int(code) - column._CODE_ZONE][0])
+                    for code in numpy.unique(codes[present]))
+        zone = zones.pop() if len(zones) == 1 else None
+        data = numpy.frombuffer(stamps, dtype=numpy.int64).copy() \
+            .view('datetime64[us]')
+        return ColumnData(KIND_DATETIME, data, ~present, None, zone, None)
+
+    elif isinstance(column, _DictionaryColumn):
+        types = set(type(value) for value in column._values)
+        if (len(types) != 1) or not (types <= _CATEGORY_TYPES):
+            return None
+        codes = numpy.frombuffer(column._arrays[0], dtype=numpy.uint32) \
+            .astype(numpy.int64)
+        # Category codes count from 0, with -1 for a missing value.
+        codes -= column._CODE_VALUE
+        codes[codes < 0] = -1
+        categories = numpy.empty(len(column._values), dtype=object)
+        for (index, value) in enumerate(column._values):
+            categories[index] = value
+        data = numpy.empty(len(codes), dtype=object)
+        present = codes >= 0
+        data[present] = categories[codes[present]]
+        return ColumnData(KIND_CATEGORY, data, ~present, None, None,
+                          (categories, codes))
+    return None
+
+
+def _column_data(grid, name):
+    column = None
+    if isinstance(grid, ColumnarGrid):
+        column = grid._data.get(name)
+    if column is not None:
+        result = _columnar_data(column)
+        if result is not None:
+            return result
+    return _cells_data([row.get(name) for row in grid])
+
+
+def _names(grid, columns):
+    if columns is None:
+        return list(grid.column.keys())
+    return [name for name in columns if name in grid.column]
+
+
+def to_numpy(grid, columns=None):
+    """
+    Return the named columns of the grid (all of them by default) as an
+    OrderedDict of NumPy masked arrays.  Quantities are given as their
+    values; use to_dataframe to keep their units.
+    """
+    _require_numpy()
+    arrays = collections.OrderedDict()
+    for name in _names(grid, columns):
+        column = _column_data(grid, name)
+        arrays[name] = numpy.ma.MaskedArray(column.data, mask=column.mask)
+    return arrays
+
+
+def to_dataframe(grid, columns=None):
+    """
+    Return the named columns of the grid (all of them by default) as a
+    pandas DataFrame.  The grid metadata, column metadata, the unit of each
+    column of quantities and the names of marker columns are kept in the
+    DataFrame's `attrs`, under 'metadata', 'columns', 'units' and
+    'markers', so that from_dataframe can restore them.  'units' only lists
+    columns whose values were quantities, whatever their column metadata
+    says.
+    """
+    _require_numpy()
+    _require_pandas()
+    series = collections.OrderedDict()
+    units = {}
+    markers = []
+    for name in _names(grid, columns):
+        column = _column_data(grid, name)
+        if column.kind == KIND_NUMBER:
+            values = column.data
+            if column.unit is not None:
+                units[name] = column.unit
+        elif column.kind == KIND_DATETIME:
+            values = pandas.Series(column.data).dt.tz_localize('UTC')
+            if column.zone is not None:
+                values = values.dt.tz_convert(column.zone)
+        elif column.kind in (KIND_BOOL, KIND_MARKER):
+            values = pandas.arrays.BooleanArray(column.data, column.mask)
+            if column.kind == KIND_MARKER:
+                markers.append(name)
+        elif column.kind == KIND_CATEGORY:
+            if column.categories is not None:
+                values = pandas.Categorical.from_codes(
+                    column.categories[1], categories=column.categories[0])
+            else:
+                values = pandas.Categorical(column.data)
+        else:
+            values = column.data
+        series[name] = values
+
+    frame = pandas.DataFrame(series)
+    frame.attrs['metadata'] = dict(grid.metadata.items())
+    frame.attrs['columns'] = collections.OrderedDict(
+        (name, dict(grid.column[name].items()))
+        for name in _names(grid, columns))
+    frame.attrs['units'] = units
+    frame.attrs['markers'] = markers
+    return frame
+
+
+def _missing(value):
+    return (value is None) or (value is pandas.NA) or (value is pandas.NaT) \
+        or (isinstance(value, float) and math.isnan(value))
+
+
+def _series_cells(series, unit, marker):
+    """
+    Return the cells of a DataFrame column as a list of values (None where
+    missing, _ABSENT for marker tags a row does not have).
+    """
+    dtype = series.dtype
+    if pandas.api.types.is_bool_dtype(dtype):
+        if marker:
+            return [None if _missing(value) else
+                    (MARKER if value else _ABSENT)
+                    for value in series.astype(object).tolist()]
+        return [None if _missing(value) else bool(value)
+                for value in series.astype(object).tolist()]
+
+    elif pandas.api.types.is_datetime64_any_dtype(dtype):
+        tz = getattr(dtype, 'tz', None)
+        if tz is None:
+            # Naive date/times are taken to be UTC.
+            zone = pytz.utc
+        else:
+            try:
+                zone = pytz.timezone(str(tz))
+            except pytz.UnknownTimeZoneError:
+                zone = pytz.utc
+            series = series.dt.tz_convert(None)
+        stamps = series.to_numpy(dtype='datetime64[us]').view(numpy.int64)
+        return [None if stamp == NO_TIMESTAMP else
+                (EPOCH + datetime.timedelta(microseconds=stamp))
+                .astimezone(zone)
+                for stamp in stamps.tolist()]
+
+    elif pandas.api.types.is_numeric_dtype(dtype):
+        if pandas.api.types.is_integer_dtype(dtype) and unit is None:
+            return [None if _missing(value) else value
+                    for value in series.astype(object).tolist()]
+        values = series.to_numpy(dtype=numpy.float64, na_value=numpy.nan)
+        if unit is None:
+            return [None if value != value else value
+                    for value in values.tolist()]
+        return [None if value != value else Quantity(value, unit)
+                for value in values.tolist()]
+
+    return [None if _missing(value) else value
+            for value in series.astype(object).tolist()]
+
+
+def from_dataframe(cls, frame, version=None):
+    """
+    Return a grid of class `cls` holding the rows of a pandas DataFrame.
+    The DataFrame's index is not included; use `frame.reset_index()` to
+    make it a column.  Metadata, units and markers are taken from `attrs`
+    as written by to_dataframe; only the numbers of columns listed in
+    'units' become quantities.  Missing values become None.
+    """
+    _require_numpy()
+    _require_pandas()
+    attrs = frame.attrs
+    units = attrs.get('units') or {}
+    markers = set(attrs.get('markers') or ())
+    column_meta = attrs.get('columns') or {}
+
+    names = [six.text_type(name) for name in frame.columns]
+    columns = []
+    cells = []
+    for (name, label) in zip(names, frame.columns):
+        meta = dict(column_meta.get(name) or {})
+        columns.append((name, meta))
+        cells.append(_series_cells(frame[label], units.get(name),
+                                   name in markers))
+
+    grid = cls(version=version, metadata=attrs.get('metadata'),
+               columns=columns)
+    grid.extend([dict((name, value) for (name, value) in zip(names, row)
+                      if value is not _ABSENT)
+                 for row in zip(*cells)])
+    return grid
@@ -14,7 +14,6 @@ import six
 from . import PINT_AVAILABLE
 
 if PINT_AVAILABLE:
-    from . import ureg
     from .pintutil import to_pint
 
 STR_SUB = [
@@ -51,7 +50,7 @@ def use_pint(val=True):
 class Quantity(six.with_metaclass(ABCMeta, object)):
     def __new__(self, value, unit=None):
         if MODE_PINT:
-            return PintQuantity(value, to_pint(unit))
+            return _pint_quantity()(value, to_pint(unit))
         else:
             return BasicQuantity(value, unit)
 
@@ -311,8 +310,27 @@ class BasicQuantity(Qty):
 
 Quantity.register(BasicQuantity)
 
-if PINT_AVAILABLE:
-    class PintQuantity(Qty, ureg.Quantity):
+_PINT_QUANTITY = None
+
+
+def _pint_quantity():
+    """
+    Return the PintQuantity class.  It derives from the Quantity class of
+    the pint unit registry, so is only defined once a Quantity is made in
+    pint mode; until then, neither pint nor the registry is loaded.
+    """
+    global _PINT_QUANTITY
+    if _PINT_QUANTITY is not None:
+        return _PINT_QUANTITY
+
+    if not PINT_AVAILABLE:  # pragma: no cover
+        # If things turn really bad...just in case.
+        _PINT_QUANTITY = BasicQuantity
+        return _PINT_QUANTITY
+
+    from .pintutil import get_unit_registry
+
+    class PintQuantity(Qty, get_unit_registry().Quantity):
         """
         A quantity is a scalar value (floating point) with a unit.
         This object uses Pint feature allowing conversion between units
@@ -325,11 +343,28 @@ if PINT_AVAILABLE:
         def __init__(self, value, unit):
             super(PintQuantity, self).__init__(value, unit)
 
+        def __reduce__(self):
+            # pint would otherwise unpickle this as its own Quantity class.
+            return (PintQuantity, (self.value, self.unit))
 
+    # Pickles refer to the class as hszinc.datatypes.PintQuantity
+    PintQuantity.__qualname__ = 'PintQuantity'
     Quantity.register(PintQuantity)
-else:  # pragma: no cover
-    # If things turn really bad...just in case.
-    PintQuantity = BasicQuantity
+    _PINT_QUANTITY = PintQuantity
+    return PintQuantity
+
+
+def __getattr__(name):
+    if name == 'PintQuantity':
+        return _pint_quantity()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # No module __getattr__ before Python 3.7; define the class now.
+    PintQuantity = _pint_quantity()
+
+if not PINT_AVAILABLE:  # pragma: no cover
     to_pint = lambda unit: unit
 
 
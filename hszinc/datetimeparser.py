@@ -0,0 +1,162 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Fast Zinc date/time decoding
+# (C) 2016 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+Decoding of the canonical Zinc date, time and date/time forms.
+
+The Zinc reader has already matched these against fixed-width regular
+expressions, so the fields can be sliced out directly rather than going
+through `strptime` or `iso8601`.  A `DateTimeParser` is created for each
+parse and caches the time zones it looks up, along with the period of each
+zone (the span between DST transitions) that the values fall in.  While a
+value's UTC offset is that of a cached period, the converted value has the
+same wall-clock time, so `astimezone` can be skipped.
+"""
+
+import bisect
+import datetime
+
+import iso8601
+import pytz
+
+from .zoneinfo import timezone
+
+# Bounds of periods are kept as tuples of datetime fields, so values can be
+# checked before a datetime is built.  These sort before and after any.
+_START = (0,)
+_END = (10000,)
+
+
+def _offset_tzinfo(suffix):
+    """
+    Return the tzinfo iso8601 gives for the given UTC offset suffix ('',
+    'Z' or '+HH:MM'), and its offset.
+    """
+    tzinfo = iso8601.parse_date('2000-01-01T00:00:00' + suffix).tzinfo
+    return (tzinfo, tzinfo.utcoffset(None))
+
+
+def _fields(dt):
+    return (dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second,
+            dt.microsecond)
+
+
+def _period(tz, utc, offset):
+    """
+    Return the (start, end) fields, in local time, of the period of the pytz
+    time zone that the naive UTC time falls in.  Returns None if this
+    cannot be determined.
+    """
+    if isinstance(tz, pytz.tzinfo.StaticTzInfo) or (tz is pytz.utc):
+        return (_START, _END)
+
+    transitions = getattr(tz, '_utc_transition_times', None)
+    if not transitions:
+        return None
+
+    # As pytz's fromutc() picks the period
+    idx = max(0, bisect.bisect_right(transitions, utc) - 1)
+    start = _fields(transitions[idx] + offset) if idx > 0 else _START
+    end = _fields(transitions[idx + 1] + offset) \
+            if (idx + 1) < len(transitions) else _END
+    return (start, end)
+
+
+class DateTimeParser(object):
+    """
+    Decoder for the date, time and date/time values of one parse.
+    """
+
+    def __init__(self):
+        self._timezones = {}
+        self._offsets = {}
+        self._periods = {}
+
+    def date(self, date_str):
+        """
+        Decode a YYYY-MM-DD date.
+        """
+        return datetime.date(int(date_str[0:4]), int(date_str[5:7]),
+                             int(date_str[8:10]))
+
+    def time(self, time_str):
+        """
+        Decode a HH:MM:SS time with optional fraction.
+        """
+        return datetime.time(int(time_str[0:2]), int(time_str[3:5]),
+                             int(time_str[6:8]),
+                             self._microseconds(time_str[9:], True))
+
+    @staticmethod
+    def _microseconds(fraction, strict=False):
+        if not fraction:
+            return 0
+        if len(fraction) > 6:
+            if strict:
+                # strptime does not accept more than 6 digits.
+                raise ValueError('Too many digits in %r' % fraction)
+            fraction = fraction[:6]
+        return int(fraction.ljust(6, '0'))
+
+    def _offset(self, suffix):
+        try:
+            return self._offsets[suffix]
+        except KeyError:
+            pass
+        result = self._offsets[suffix] = _offset_tzinfo(suffix.upper())
+        return result
+
+    def _timezone(self, tzname):
+        try:
+            return self._timezones[tzname]
+        except KeyError:
+            pass
+        try:
+            tz = timezone(tzname)
+        except:
+            # Not a time zone we know about, leave the values alone.
+            tz = None
+        self._timezones[tzname] = tz
+        return tz
+
+    def datetime(self, iso_str, tzname=None):
+        """
+        Decode a YYYY-MM-DDTHH:MM:SS date/time with optional fraction and
+        UTC offset, converting it to the named Haystack time zone.
+        """
+        # Split off the fraction and offset
+        rest = iso_str[19:]
+        fraction = ''
+        if rest.startswith('.'):
+            end = 1
+            while (end < len(rest)) and rest[end].isdigit():
+                end += 1
+            fraction = rest[1:end]
+            rest = rest[end:]
+
+        fields = (int(iso_str[0:4]), int(iso_str[5:7]), int(iso_str[8:10]),
+                  int(iso_str[11:13]), int(iso_str[14:16]),
+                  int(iso_str[17:19]), self._microseconds(fraction))
+        (offset_tz, offset) = self._offset(rest)
+
+        tz = self._timezone(tzname) if tzname else None
+        if tz is None:
+            return datetime.datetime(*fields, tzinfo=offset_tz)
+
+        key = (tzname, rest)
+        period = self._periods.get(key)
+        if (period is not None) and (period[0] <= fields < period[1]):
+            return datetime.datetime(*fields, tzinfo=period[2])
+
+        result = datetime.datetime(*fields, tzinfo=offset_tz).astimezone(tz)
+        if result.utcoffset() == offset:
+            # Same wall-clock time; remember the period for the values that
+            # follow.
+            span = _period(tz, result.replace(tzinfo=None) - offset, offset)
+            if span is not None:
+                self._periods[key] = span + (result.tzinfo,)
+        return result
@@ -5,15 +5,22 @@
 #
 # vim: set ts=4 sts=4 et tw=78 sw=4 si:
 
+import codecs
 import functools
+import io
 
 from .grid import Grid
 from .jsondumper import dump_grid as dump_json_grid, \
-    dump_scalar as dump_json_scalar
+    dump_scalar as dump_json_scalar, iter_grid as iter_json_grid, \
+    SCALAR_DUMPERS as JSON_SCALAR_DUMPERS
 from .parser import MODE_ZINC, MODE_JSON, _parse_mode
 from .version import LATEST_VER
 from .zincdumper import dump_grid as dump_zinc_grid, \
-    dump_scalar as dump_zinc_scalar
+    dump_scalar as dump_zinc_scalar, iter_grid as iter_zinc_grid, \
+    SCALAR_DUMPERS as ZINC_SCALAR_DUMPERS
+
+# Number of rows dumped at a time by iter_dump and dump_to.
+CHUNK_ROWS = 1000
 
 
 def dump(grids, mode=MODE_ZINC):
@@ -34,6 +41,62 @@ def dump(grids, mode=MODE_ZINC):
         raise NotImplementedError('Format not implemented: %s' % mode)
 
 
+def iter_dump(grids, mode=MODE_ZINC, chunk_rows=CHUNK_ROWS):
+    """
+    Dump the given grids in the specified over-the-wire format, a piece at
+    a time.  Each grid's header comes first, on its own, followed by its
+    rows `chunk_rows` at a time.  Joined, the pieces are the text `dump`
+    would return.
+    """
+    # Sanitise mode
+    mode = _parse_mode(mode)
+
+    if mode == MODE_ZINC:
+        _iter = iter_zinc_grid
+        (start, separator, end) = ('', '\n', '')
+    elif mode == MODE_JSON:
+        _iter = iter_json_grid
+        (start, separator, end) = ('[', ',', ']')
+    else:  # pragma: no cover
+        raise NotImplementedError('Format not implemented: %s' % mode)
+
+    if isinstance(grids, Grid):
+        for text in _iter(grids, chunk_rows=chunk_rows):
+            yield text
+        return
+
+    prefix = start
+    for grid in grids:
+        for text in _iter(grid, chunk_rows=chunk_rows):
+            yield prefix + text
+            prefix = ''
+        prefix = separator
+    if prefix == start:
+        # There were no grids.
+        if start or end:
+            yield start + end
+    elif end:
+        yield end
+
+
+def dump_to(grids, fp, mode=MODE_ZINC, charset='utf-8',
+            chunk_rows=CHUNK_ROWS):
+    """
+    Dump the given grids in the specified over-the-wire format to a
+    file-like object, `chunk_rows` rows at a time.  Binary files are written
+    in the given character set.
+    """
+    encoder = None
+    if isinstance(fp, (io.RawIOBase, io.BufferedIOBase)) or \
+            ('b' in getattr(fp, 'mode', '')):
+        # Encoded as one, so any byte order mark is only written once.
+        encoder = codecs.getincrementalencoder(charset)()
+    for text in iter_dump(grids, mode=mode, chunk_rows=chunk_rows):
+        if encoder is not None:
+            text = encoder.encode(text)
+        fp.write(text)
+
+
 def dump_grid(grid, mode=MODE_ZINC):
     # Sanitise mode
     mode = _parse_mode(mode)
@@ -56,3 +119,21 @@ def dump_scalar(scalar, mode=MODE_ZINC, version=LATEST_VER):
         return dump_json_scalar(scalar, version=version)
     else:  # pragma: no cover
         raise NotImplementedError('Format not implemented: %s' % mode)
+
+
+def register_scalar_dumper(cls, dumper, mode=MODE_ZINC):
+    """
+    Dump values of the given type (and its subclasses) with `dumper` in the
+    specified format, replacing any existing dumper for that type.  It is
+    called as `dumper(value, version=...)`, and returns the Zinc text or the
+    JSON data (to be encoded as JSON) for the value.
+    """
+    # Sanitise mode
+    mode = _parse_mode(mode)
+
+    if mode == MODE_ZINC:
+        ZINC_SCALAR_DUMPERS.register(cls, dumper)
+    elif mode == MODE_JSON:
+        JSON_SCALAR_DUMPERS.register(cls, dumper)
+    else:  # pragma: no cover
+        raise NotImplementedError('Format not implemented: %s' % mode)
@@ -9,7 +9,10 @@ import numbers
 
 import six
 
+from .compactrow import CompactRow, row_schema
 from .datatypes import NA, Quantity, Coordinate
+from .gridindex import TagIndex, ABSENT
+from .lazyrow import LazyRow
 from .metadata import MetadataObject
 from .sortabledict import SortableDict
 
@@ -19,6 +22,9 @@ except ImportError:  # pragma: no cover
     import collections as col
 from .version import Version, VER_3_0, VER_2_0
 
+# The types a row may be: a dict (or LazyRow), or a CompactRow.
+ROW_TYPES = (dict, CompactRow)
+
 
 class Grid(col.MutableSequence):
     '''
@@ -46,12 +52,19 @@ class Grid(col.MutableSequence):
         # The columns
         self.column = SortableDict()
 
+        # Indexes of the rows by tag value; see create_index.
+        self._indexes = {}
+
         # Rows
         self._row = []
 
         # Internal index
         self._index = None
 
+        # Rows the parser could not read, as (line, col, message); see
+        # the on_error argument of parse().
+        self.errors = []
+
         if metadata is not None:
             self.metadata.update(metadata.items())
 
@@ -202,15 +215,17 @@ class Grid(col.MutableSequence):
         '''
         Replace the row at index.
         '''
-        if not isinstance(value, dict):
+        if not isinstance(value, ROW_TYPES):
             raise TypeError('value must be a dict')
-        for val in value.values():
-            self._detect_or_validate(val)
-        if "id" in self._row[index]:
-            self._index.pop(self._row[index]['id'], None)
+        self._detect_or_validate_row(value)
+        old_value = self._row[index]
+        if "id" in old_value:
+            self._index.pop(old_value['id'], None)
         self._row[index] = value
         if "id" in value:
             self._index[str(value["id"])] = value
+        if self._indexes:
+            self._indexed_replace(index % len(self._row), old_value, value)
 
     def __delitem__(self, index):
         '''
@@ -218,16 +233,19 @@ class Grid(col.MutableSequence):
         '''
         if "id" in self._row[index]:
             self._index.pop(self._row[index]['id'], None)
+        if self._indexes:
+            self._indexed_delete(index, self._row[index])
         del self._row[index]
 
     def insert(self, index, value):
         '''
         Insert a new row before index.
         '''
-        if not isinstance(value, dict):
+        if not isinstance(value, ROW_TYPES):
             raise TypeError('value must be a dict')
-        for val in value.values():
-            self._detect_or_validate(val)
+        self._detect_or_validate_row(value)
+        if self._indexes:
+            self._indexed_insert(index, value)
         self._row.insert(index, value)
         if "id" in value:
             if not self._index:
@@ -243,13 +261,87 @@ class Grid(col.MutableSequence):
             if "id" in item:
                 self._index[str(item["id"])] = item
 
-    # FIXME
     def extend(self, values):
-        super(Grid, self).extend(values)  # Python 2 compatible :-(
-        # super().extend(values)  # Python 3+ :-)
-        for item in self._row:
-            if "id" in item:
-                self._index[str(item["id"])] = item
+        '''
+        Append the rows given.  Only the new rows are checked and indexed,
+        so building a grid a chunk at a time takes time in proportion to
+        the number of rows.
+        '''
+        rows = list(values)
+        for row in rows:
+            if not isinstance(row, ROW_TYPES):
+                raise TypeError('value must be a dict')
+        if self.nearest_version < VER_3_0:
+            # Nothing needs checking once the grid is at the latest version.
+            for row in rows:
+                self._detect_or_validate_row(row)
+
+        start = len(self._row)
+        self._row.extend(rows)
+        if self._index:
+            for row in rows:
+                if "id" in row:
+                    self._index[str(row["id"])] = row
+        elif any("id" in row for row in rows):
+            # As for insert(), the index is built once there are ids.
+            self.reindex()
+        if self._indexes:
+            for (offset, row) in enumerate(rows):
+                self._indexed_add(start + offset, row)
+
+    @property
+    def row_schema(self):
+        '''
+        The RowSchema of the grid's columns, shared by its CompactRows.
+        '''
+        return row_schema(self.column.keys())
+
+    def compact_row(self, values=()):
+        '''
+        Return a new CompactRow for this grid, holding the given mapping or
+        (name, value) pairs.
+        '''
+        return self.row_schema.row_from(values)
+
+    def compact(self):
+        '''
+        Replace the rows with CompactRows that share the grid's row schema,
+        which hold the same cells in much less memory.  Rows that are
+        already CompactRows of the grid's schema are kept as they are.
+        '''
+        schema = self.row_schema
+        self._row = [row if (type(row) is schema.row_class)
+                     else schema.row_from(row) for row in self._row]
+        if self._index:
+            # The id index holds the rows themselves.
+            self.reindex()
+
+    def create_index(self, tag):
+        '''
+        Index the rows by the value of a tag, for lookup() and for the
+        ``tag == value`` terms of filter().  The index is kept up to date as
+        rows are added, replaced and removed; inserting or deleting rows
+        other than at the end means it is rebuilt when next used.
+        '''
+        self._indexes[tag] = TagIndex(tag)
+
+    def drop_index(self, tag):
+        '''
+        Remove the index of the rows by a tag, if there is one.
+        '''
+        self._indexes.pop(tag, None)
+
+    def lookup(self, tag, value):
+        '''
+        Return a list of the rows whose tag equals the value, in order.  This
+        uses the tag's index if there is one, otherwise every row is checked.
+        '''
+        positions = self._index_positions(tag, value)
+        if positions is None:
+            rows = self._row
+        else:
+            rows = [self._row[position] for position in positions]
+        return [row for row in rows if (tag in row) and (row[tag] == value)]
 
     def filter(self, filter, limit=0):
         '''
@@ -267,13 +359,142 @@ class Grid(col.MutableSequence):
 
         result = Grid(version=self.version, metadata=self.metadata, columns=self.column)
         fn = filter_function(filter)
-        for row in self._row:
+        for row in self._filter_candidates(filter):
             if fn(self, row):
                 result.append(row)
             if limit and len(result)==limit:
                 break
         return result
 
+    def to_numpy(self, columns=None):
+        '''
+        Return the named columns (default all) as an OrderedDict of NumPy
+        masked arrays.  See hszinc.dataframe for how values are converted.
+        '''
+        from .dataframe import to_numpy
+        return to_numpy(self, columns)
+
+    def to_dataframe(self, columns=None):
+        '''
+        Return the named columns (default all) as a pandas DataFrame.  See
+        hszinc.dataframe for how values are converted.
+        '''
+        from .dataframe import to_dataframe
+        return to_dataframe(self, columns)
+
+    @classmethod
+    def from_dataframe(cls, frame, version=None):
+        '''
+        Return a grid holding the rows of a pandas DataFrame, such as one
+        returned by to_dataframe.
+        '''
+        from .dataframe import from_dataframe
+        return from_dataframe(cls, frame, version=version)
+
+    def _tag_values(self, tag):
+        '''
+        Return the value of a tag in each row, in order (ABSENT for rows
+        without the tag).
+        '''
+        return (row.get(tag, ABSENT) for row in self._row)
+
+    def _index_positions(self, tag, value):
+        '''
+        Return the positions of the rows that may have the given tag value
+        according to the tag's index, or None if there is no index to use.
+        '''
+        index = self._indexes.get(tag)
+        if index is None:
+            return None
+        if index.stale:
+            index.build(self._tag_values(tag))
+        return index.candidates(value)
+
+    def _filter_candidates(self, filter):
+        '''
+        Return the rows that may match the filter: those found by the index
+        that narrows them down the most, if any can be used, otherwise all
+        of them.
+        '''
+        if not self._indexes:
+            return self._row
+        from .grid_filter import equality_terms
+        best = None
+        for (tag, value) in equality_terms(filter):
+            positions = self._index_positions(tag, value)
+            if (positions is not None) and \
+                    ((best is None) or (len(positions) < len(best))):
+                best = positions
+        if best is None:
+            return self._row
+        return [self._row[position] for position in best]
+
+    def _indexed_add(self, position, row):
+        for index in self._indexes.values():
+            if (not index.stale) and (index.tag in row):
+                index.add(position, row[index.tag])
+
+    def _indexed_replace(self, position, old_row, new_row):
+        for index in self._indexes.values():
+            if index.stale:
+                continue
+            if index.tag in old_row:
+                index.remove(position, old_row[index.tag])
+            if index.tag in new_row:
+                index.add(position, new_row[index.tag])
+
+    def _indexed_insert(self, index, row):
+        '''
+        Update the indexes for a row about to be inserted before index.
+        Rows added to the end are indexed; otherwise the positions of the
+        rows after it change, so the indexes are rebuilt when next used.
+        '''
+        length = len(self)
+        if index >= length:
+            self._indexed_add(length, row)
+        else:
+            self._indexes_stale()
+
+    def _indexed_delete(self, index, row):
+        '''
+        Update the indexes for the row at index, about to be deleted.
+        '''
+        length = len(self)
+        if isinstance(index, numbers.Number) and (index % length == length - 1):
+            self._indexed_replace(length - 1, row, {})
+        else:
+            self._indexes_stale()
+
+    def _indexes_stale(self):
+        for index in self._indexes.values():
+            index.stale = True
+
+    def _project(self, columns):
+        '''
+        Return a copy of the grid holding only the named columns, in the
+        order given.  Used by the parsers when they cannot skip the other
+        columns themselves.
+        '''
+        columns = [name for name in columns if name in self.column]
+        result = Grid(version=self.version, metadata=self.metadata,
+                      columns=[(name, self.column[name]) for name in columns])
+        result.extend([dict((name, row[name]) for name in columns
+                            if name in row) for row in self._row])
+        return result
+
+    def _detect_or_validate_row(self, row):
+        '''
+        Detect or validate the version against every value of a row.  Cells
+        of a LazyRow that are still pending are never Project Haystack 3.0
+        types, so they are left undecoded.
+        '''
+        if isinstance(row, LazyRow):
+            values = row.decoded_values()
+        else:
+            values = row.values()
+        for val in values:
+            self._detect_or_validate(val)
+
     def _detect_or_validate(self, val):
         '''
         Detect the version used from the row content, or validate against
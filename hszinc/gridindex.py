@@ -0,0 +1,107 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Grid row indexes
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+import bisect
+import datetime
+import heapq
+
+import six
+
+from .datatypes import Ref, MarkerType, NAType, RemoveType
+
+# Types (exactly, not subclasses) whose values only ever compare equal to
+# values with the same hash.  Anything else, such as a Quantity (which
+# equals a plain number of the same value), is checked on every lookup.
+_HASHED_TYPES = frozenset(
+    set(six.string_types) | {six.text_type, type(None), bool, int, float,
+                             Ref, MarkerType, NAType, RemoveType,
+                             datetime.date, datetime.time,
+                             datetime.datetime})
+
+# Stands in for the value of a row that does not have the tag.
+ABSENT = object()
+
+
+def _insert(positions, position):
+    if (not positions) or (positions[-1] < position):
+        positions.append(position)
+    else:
+        bisect.insort(positions, position)
+
+
+def _remove(positions, position):
+    idx = bisect.bisect_left(positions, position)
+    if (idx < len(positions)) and (positions[idx] == position):
+        del positions[idx]
+
+
+class TagIndex(object):
+    """
+    A hash index of the rows of a grid by the value of one tag, giving the
+    positions of the rows (in order) that may hold a given value.  A stale
+    index has to be rebuilt before it is used.
+    """
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.stale = True
+        self._positions = {}
+        self._unhashed = []
+
+    def build(self, values):
+        """
+        Build the index from the tag's value in each row, in order (ABSENT
+        for rows without the tag).
+        """
+        self._positions = {}
+        self._unhashed = []
+        for (position, value) in enumerate(values):
+            if value is not ABSENT:
+                self.add(position, value)
+        self.stale = False
+
+    def _bucket(self, value, create=False):
+        if type(value) in _HASHED_TYPES:
+            try:
+                if create:
+                    return self._positions.setdefault(value, [])
+                return self._positions.get(value)
+            except TypeError:
+                # Such as a Ref whose value cannot be hashed.
+                pass
+        return self._unhashed
+
+    def add(self, position, value):
+        """
+        Record that the row at the position holds the value.
+        """
+        _insert(self._bucket(value, create=True), position)
+
+    def remove(self, position, value):
+        """
+        Forget that the row at the position holds the value.
+        """
+        positions = self._bucket(value)
+        if positions is not None:
+            _remove(positions, position)
+            if (not positions) and (positions is not self._unhashed):
+                del self._positions[value]
+
+    def candidates(self, value):
+        """
+        Return the positions of the rows that may hold the value, in order,
+        or None if the index cannot be used to look it up.
+        """
+        if type(value) not in _HASHED_TYPES:
+            return None
+        try:
+            positions = self._positions.get(value, [])
+        except TypeError:
+            return None
+        if not self._unhashed:
+            return positions
+        return list(heapq.merge(positions, self._unhashed))
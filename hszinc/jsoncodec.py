@@ -0,0 +1,148 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# JSON encoder/decoder selection
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+import json
+
+# Supported JSON libraries, fastest first.  'json' is the standard library
+# and is always available.
+JSON_BACKENDS = ('orjson', 'ujson', 'rapidjson', 'json')
+
+# Errors a fast backend raises for data it will not handle, but which the
+# standard library might.
+_FALLBACK_ERRORS = (TypeError, ValueError, OverflowError)
+
+
+def _json_dumps(obj):
+    # Compact and unescaped, as the other backends write it.
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _json_backend():
+    return (json.loads, _json_dumps)
+
+
+def _orjson_backend():
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+    return (orjson.loads, dumps)
+
+
+def _ujson_backend():
+    import ujson
+
+    def dumps(obj):
+        return ujson.dumps(obj, ensure_ascii=False,
+                           escape_forward_slashes=False)
+    return (ujson.loads, dumps)
+
+
+def _rapidjson_backend():
+    import rapidjson
+
+    def dumps(obj):
+        return rapidjson.dumps(obj, ensure_ascii=False)
+    return (rapidjson.loads, dumps)
+
+
+_BACKEND_LOADERS = {
+    'orjson': _orjson_backend,
+    'ujson': _ujson_backend,
+    'rapidjson': _rapidjson_backend,
+    'json': _json_backend,
+}
+
+# The backend in use as (name, loads, dumps); chosen on first use.
+_BACKEND = None
+
+
+def _load_backend(name):
+    (loads, dumps) = _BACKEND_LOADERS[name]()
+    return (name, loads, dumps)
+
+
+def available_json_backends():
+    """
+    Return the names of the JSON backends that are installed, fastest
+    first.
+    """
+    available = []
+    for name in JSON_BACKENDS:
+        try:
+            _load_backend(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def use_json_backend(name=None):
+    """
+    Select the JSON library used to decode and encode grids, by name (one of
+    JSON_BACKENDS).  With no name, the fastest one installed is used, which
+    is the default.  Returns the name of the backend chosen.
+
+    Whichever backend is used, the same documents are accepted and the
+    same data results: anything a backend rejects (such as NaN, or integers
+    wider than 64 bits) is handed on to the standard library, which then
+    has the final say.  Encoded text is compact whichever backend is used,
+    though the escaping of some characters may differ.
+    """
+    global _BACKEND
+    if name is None:
+        for candidate in JSON_BACKENDS:
+            try:
+                _BACKEND = _load_backend(candidate)
+                break
+            except ImportError:
+                continue
+    elif name not in _BACKEND_LOADERS:
+        raise ValueError('Unknown JSON backend %r, should be one of %s'
+                         % (name, ', '.join(JSON_BACKENDS)))
+    else:
+        _BACKEND = _load_backend(name)
+    return _BACKEND[0]
+
+
+def json_backend():
+    """
+    Return the name of the JSON backend in use.
+    """
+    if _BACKEND is None:
+        use_json_backend()
+    return _BACKEND[0]
+
+
+def loads(text):
+    """
+    Decode JSON text with the selected backend.
+    """
+    if _BACKEND is None:
+        use_json_backend()
+    (name, _loads, _) = _BACKEND
+    try:
+        return _loads(text)
+    except _FALLBACK_ERRORS:
+        if name == 'json':
+            raise
+        return json.loads(text)
+
+
+def dumps(obj):
+    """
+    Encode data as JSON text with the selected backend.
+    """
+    if _BACKEND is None:
+        use_json_backend()
+    (name, _, _dumps) = _BACKEND
+    try:
+        return _dumps(obj)
+    except _FALLBACK_ERRORS:
+        if name == 'json':
+            raise
+        return _json_dumps(obj)
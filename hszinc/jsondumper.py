@@ -9,20 +9,61 @@ from __future__ import unicode_literals
 
 import datetime
 import functools
-import json
 
 import six
 
 from . import Grid
 from .datatypes import Quantity, Coordinate, Ref, Bin, Uri, \
-    MARKER, NA, REMOVE, XStr
+    MarkerType, NAType, RemoveType, XStr
+from .jsoncodec import dumps as json_dumps
 from .jsonparser import MARKER_STR, NA_STR, REMOVE2_STR, REMOVE3_STR
+from .typedispatch import TypeDispatch, column_functions
 from .version import LATEST_VER, VER_3_0
 from .zoneinfo import timezone_name
 
 
 def dump_grid(grid):
-    return json.dumps(_dump_grid_to_json(grid))
+    """
+    Dump a single grid to its JSON representation.
+    """
+    return ''.join(iter_grid(grid))
+
+
+def write_grid(grid, fp, chunk_rows=1):
+    """
+    Write a single grid as JSON to a text file-like object, `chunk_rows`
+    rows at a time.
+    """
+    for text in iter_grid(grid, chunk_rows=chunk_rows):
+        fp.write(text)
+
+
+def iter_grid(grid, chunk_rows=1):
+    """
+    Generate the JSON text of a grid in pieces: the metadata and columns,
+    then the rows, `chunk_rows` at a time.  Only one row is converted to
+    JSON data at a time, so the whole grid is never held as nested dicts as
+    well as text.
+    """
+    version = grid.version
+    yield '{"meta":%s,"cols":%s,"rows":[' % (
+        json_dumps(dump_meta(grid.metadata, version=version, grid=True)),
+        json_dumps(dump_columns(grid.column, version=version)))
+
+    _dump_row = row_dumper(grid)
+    separator = ''
+    batch = []
+    for row in grid:
+        # The JSON library escapes the whole row at once, which beats
+        # escaping each cell here.
+        batch.append(json_dumps(_dump_row(row)))
+        if len(batch) >= chunk_rows:
+            yield separator + ','.join(batch)
+            separator = ','
+            batch = []
+    if batch:
+        yield separator + ','.join(batch)
+    yield ']}'
 
 
 def _dump_grid_to_json(grid):
@@ -63,7 +104,7 @@ def dump_column(col, col_meta, version=LATEST_VER):
 
 
 def dump_rows(grid):
-    return list(map(functools.partial(dump_row, grid), grid))
+    return list(map(row_dumper(grid), grid))
 
 
 def dump_row(grid, row):
@@ -72,55 +113,36 @@ def dump_row(grid, row):
         for c in list(grid.column.keys())])
 
 
+def row_dumper(grid):
+    """
+    Return a function that converts rows of the given grid to JSON data.
+    The type of each column's values is found once, up front; values of
+    that type are handed straight to its dumper, and anything else goes
+    through dump_scalar.
+    """
+    version = grid.version
+    columns = column_functions(grid, SCALAR_DUMPERS)
+
+    def _dump_row(row):
+        get = row.get
+        cells = {}
+        for (col, cls, dump) in columns:
+            value = get(col)
+            if type(value) is cls:
+                cells[col] = dump(value, version=version)
+            elif value is None:
+                cells[col] = None
+            else:
+                cells[col] = dump_scalar(value, version=version)
+        return cells
+    return _dump_row
+
+
 def dump_scalar(scalar, version=LATEST_VER):
-    if scalar is None:
-        return None
-    elif scalar is MARKER:
-        return MARKER_STR
-    elif scalar is NA:
-        if version < VER_3_0:
-            raise ValueError('Project Haystack %s ' \
-                             'does not support NA' % version)
-        return NA_STR
-    elif scalar is REMOVE:
-        if version < VER_3_0:
-            return REMOVE2_STR
-        else:
-            return REMOVE3_STR
-    elif isinstance(scalar, list):
-        return dump_list(scalar, version=version)
-    elif isinstance(scalar, dict):
-        return dump_dict(scalar, version=version)
-    elif isinstance(scalar, bool):
-        return dump_bool(scalar, version=version)
-    elif isinstance(scalar, Ref):
-        return dump_ref(scalar, version=version)
-    elif isinstance(scalar, Bin):
-        return dump_bin(scalar, version=version)
-    elif isinstance(scalar, XStr):
-        return dump_xstr(scalar, version=version)
-    elif isinstance(scalar, Uri):
-        return dump_uri(scalar, version=version)
-    elif isinstance(scalar, six.string_types):
-        return dump_str(scalar, version=version)
-    elif isinstance(scalar, datetime.datetime):
-        return dump_date_time(scalar, version=version)
-    elif isinstance(scalar, datetime.time):
-        return dump_time(scalar, version=version)
-    elif isinstance(scalar, datetime.date):
-        return dump_date(scalar, version=version)
-    elif isinstance(scalar, Coordinate):
-        return dump_coord(scalar, version=version)
-    elif isinstance(scalar, Quantity):
-        return dump_quantity(scalar, version=version)
-    elif isinstance(scalar, float) or \
-            isinstance(scalar, int) or \
-            isinstance(scalar, int):
-        return dump_decimal(scalar, version=version)
-    elif isinstance(scalar, Grid):
-        return _dump_grid_to_json(scalar)
-    else:  # pragma: no cover
+    dump = SCALAR_DUMPERS[type(scalar)]
+    if dump is None:  # pragma: no cover
         raise NotImplementedError('Unhandled case: %r' % scalar)
+    return dump(scalar, version=version)
 
 
 def dump_id(id_str, version=LATEST_VER):
@@ -194,3 +216,55 @@ def dump_dict(dic, version=LATEST_VER):
         raise ValueError('Project Haystack %s ' \
                          'does not support dict' % version)
     return {k: dump_scalar(v, version=version) for (k, v) in dic.items()}
+
+
+def dump_null(null, version=LATEST_VER):
+    return None
+
+
+def dump_marker(marker, version=LATEST_VER):
+    return MARKER_STR
+
+
+def dump_na(na, version=LATEST_VER):
+    if version < VER_3_0:
+        raise ValueError('Project Haystack %s ' \
+                         'does not support NA' % version)
+    return NA_STR
+
+
+def dump_remove(remove, version=LATEST_VER):
+    if version < VER_3_0:
+        return REMOVE2_STR
+    else:
+        return REMOVE3_STR
+
+
+def dump_inner_grid(grid, version=LATEST_VER):
+    return _dump_grid_to_json(grid)
+
+
+# The function that dumps each type of value; see register_scalar_dumper
+# in the dumper module for adding more.
+SCALAR_DUMPERS = TypeDispatch([
+    (type(None), dump_null),
+    (MarkerType, dump_marker),
+    (NAType, dump_na),
+    (RemoveType, dump_remove),
+    (list, dump_list),
+    (dict, dump_dict),
+    (bool, dump_bool),
+    (Ref, dump_ref),
+    (Bin, dump_bin),
+    (XStr, dump_xstr),
+    (Uri, dump_uri),
+] + [(cls, dump_str) for cls in six.string_types] + [
+    (datetime.datetime, dump_date_time),
+    (datetime.time, dump_time),
+    (datetime.date, dump_date),
+    (Coordinate, dump_coord),
+    (Quantity, dump_quantity),
+    (float, dump_decimal),
+] + [(cls, dump_decimal) for cls in six.integer_types] + [
+    (Grid, dump_inner_grid),
+])
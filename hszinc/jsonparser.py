@@ -4,9 +4,7 @@
 # (C) 2018 VRT Systems
 #
 # vim: set ts=4 sts=4 et tw=78 sw=4 si:
-import copy
 import datetime
-import functools
 import json
 import re
 import sys
@@ -16,7 +14,10 @@ import six
 
 from .datatypes import Quantity, Coordinate, Ref, Bin, Uri, \
     MARKER, NA, REMOVE, XStr
+from .datetimeparser import DateTimeParser
 from .grid import Grid
+from .jsoncodec import loads as json_loads
+from .streamutil import CHUNK_SIZE, iter_chunks
 from .version import LATEST_VER, Version, VER_3_0
 from .zoneinfo import timezone
 
@@ -46,43 +47,370 @@ COORD_RE = re.compile(r'c:(-?\d*\.?\d*),(-?\d*\.?\d*)$',
 
 STR_ESC_RE = re.compile(r'\\([bfnrt"\\$]|u[0-9a-fA-F]{4})')
 
+# Date/times in the form the Zinc reader handles, which skip iso8601.
+ISO_DATETIME_RE = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?'
+                             r'(?:[zZ]|[+\-]\d{2}:\d{2})$')
 
-def parse_grid(grid_str):
-    # Grab the metadata
+SPECIAL_NUMBERS = {
+    'n:INF': float('INF'),
+    'n:-INF': -float('INF'),
+    'n:NaN': float('nan'),
+}
+
+# Whitespace permitted between JSON tokens.
+JSON_WS_RE = re.compile(r'[ \t\n\r]*')
+# The start of a literal, number or escape, which may continue in the next
+# chunk of a stream.
+JSON_PARTIAL_RE = re.compile(r'[^ \t\n\r\[\]{},:"]*\Z')
+
+
+def parse_grid(grid_str, columns=None, filter=None, limit=None,
+               consume=False, grid_class=Grid, compact=False):
+    """
+    Parse a JSON grid into a `grid_class`.  If `columns` is given, only those
+    columns are decoded and returned.  `filter` is a Haystack filter applied
+    to each row as it is decoded; decoding stops once `limit` rows match.
+
+    Already decoded JSON data is left untouched unless `consume` is set, in
+    which case its row dicts and lists are decoded in place and become part
+    of the returned grid.  The data must not be used afterwards.
+
+    With `compact`, the rows are CompactRows rather than `dict`s.
+    """
     if isinstance(grid_str, six.string_types):
-        parsed = json.loads(grid_str)
-    else:
-        parsed = copy.deepcopy(grid_str)
-    meta = parsed.pop('meta')
+        # Nothing else holds the freshly decoded data.
+        grid_str = json_loads(grid_str)
+        consume = True
+
+    from .grid_filter import row_filter_function
+    (row_filter, filter_columns) = row_filter_function(filter)
+    post_filter = (row_filter is None) and bool(filter) \
+            and bool(filter.strip())
+    if post_filter:
+        # The filter follows references, so needs the whole grid.
+        grid = parse_grid(grid_str, columns=None, consume=consume)
+        grid = grid.filter(filter, limit=limit or 0)
+        if columns is not None:
+            grid = grid._project(columns)
+        if not isinstance(grid, grid_class):
+            grid = grid_class.from_grid(grid)
+        if compact:
+            grid.compact()
+        return grid
+
+    # Grab the metadata
+    meta = grid_str['meta']
+
+    # Grab the columns in the order given
+    cols = grid_str['cols']
+    decode = None
+    if columns is not None:
+        # Only keep the requested columns, in the order requested.
+        cols = dict((col['name'], col) for col in cols)
+        cols = [cols[name] for name in columns if name in cols]
+        decode = [col['name'] for col in cols]
+        if row_filter is not None:
+            # The filter may need tags that are not returned.
+            decode.extend(name for name in filter_columns
+                          if name not in decode)
+
+    # Time zones and their DST periods are cached for the parse.
+    datetimes = DateTimeParser()
+    grid = _parse_header(meta, cols, grid_class, datetimes)
+    version = grid.version
+    schema = grid.row_schema if compact else None
+
+    # Parse the rows
+    rows = []
+    for row in (grid_str.get('rows') or []):
+        if limit and (len(rows) >= limit):
+            break
+
+        if consume:
+            parsed_row = row
+            if decode is not None:
+                for col in list(row):
+                    if col not in decode:
+                        del row[col]
+            for col, value in row.items():
+                row[col] = parse_embedded_scalar(value, version=version,
+                                                 consume=True,
+                                                 datetimes=datetimes)
+        else:
+            parsed_row = {}
+            if decode is not None:
+                row = [(col, row[col]) for col in decode if col in row]
+            else:
+                row = row.items()
+            for col, value in row:
+                parsed_row[col] = parse_embedded_scalar(
+                    value, version=version, datetimes=datetimes)
+
+        if row_filter is not None:
+            if not row_filter(grid, parsed_row):
+                continue
+            if columns is not None:
+                for name in filter_columns:
+                    if name not in grid.column:
+                        parsed_row.pop(name, None)
+        if schema is not None:
+            parsed_row = schema.row_from(parsed_row)
+        rows.append(parsed_row)
+    grid.extend(rows)
+
+    return grid
+
+
+def _parse_header(meta, cols, grid_class=Grid, datetimes=None):
+    """
+    Return an empty `grid_class` with the given metadata and columns.
+    """
     # Decode version
-    version = Version(meta.pop('ver'))
+    version = Version(meta['ver'])
 
     # Parse the remaining elements
     metadata = {}
     for name, value in meta.items():
-        metadata[name] = parse_embedded_scalar(value, version=version)
+        if name != 'ver':
+            metadata[name] = parse_embedded_scalar(value, version=version,
+                                                   datetimes=datetimes)
 
-    grid = Grid(version=version, metadata=metadata)
-
-    # Grab the columns in the order given
-    for col in parsed.pop('cols'):
-        name = col.pop('name')
-        meta = {}
+    grid = grid_class(version=version, metadata=metadata)
+    for col in cols:
+        col_meta = {}
         for key, value in col.items():
-            meta[key] = parse_embedded_scalar(value, version=version)
-        grid.column[name] = meta
+            if key != 'name':
+                col_meta[key] = parse_embedded_scalar(value, version=version,
+                                                      datetimes=datetimes)
+        grid.column[col['name']] = col_meta
+    return grid
 
-    # Parse the rows
-    for row in (parsed.pop('rows', []) or []):
-        parsed_row = {}
-        for col, value in row.items():
-            parsed_row[col] = parse_embedded_scalar(value, version=version)
-        grid.append(parsed_row)
 
-    return grid
+def parse_header(grid_str, charset='utf-8', chunk_size=CHUNK_SIZE):
+    """
+    Parse the version, metadata and columns of a JSON grid, returning them
+    in an empty Grid.  The rows are not decoded.  `grid_str` may also be a
+    file-like object, which is read no further than the start of the rows,
+    or the already decoded JSON data.
+    """
+    if isinstance(grid_str, six.string_types):
+        parsed = json_loads(grid_str)
+    elif hasattr(grid_str, 'read'):
+        return next(iter_parse(grid_str, charset=charset,
+                               chunk_size=chunk_size), None)
+    else:
+        parsed = grid_str
+    return _parse_header(parsed['meta'], parsed['cols'])
+
+
+def iter_parse(stream, charset='utf-8', chunk_size=CHUNK_SIZE):
+    """
+    Parse JSON grids from a file-like object (or string) without reading it
+    all into memory.  For each grid, an empty Grid carrying the version,
+    metadata and columns is yielded, followed by each of its rows as a dict.
+    As with `parse`, the stream may hold a single grid or an array of them.
+
+    Only one row is held in memory at a time, provided the grid's `meta` and
+    `cols` come before its `rows`, as Project Haystack writes them.
+    Otherwise the rows are kept until the header has been read.
+    """
+    reader = _JsonStream(stream, charset=charset, chunk_size=chunk_size)
+    if reader.peek() == '[':
+        reader.expect('[')
+        if reader.peek() == ']':
+            reader.expect(']')
+        else:
+            while True:
+                for item in _iter_parse_grid(reader):
+                    yield item
+                if reader.expect(',]') == ']':
+                    break
+    elif reader.peek():
+        for item in _iter_parse_grid(reader):
+            yield item
+
+    if reader.peek():
+        reader.fail('Extra data')
+
+
+def _iter_parse_grid(reader):
+    """
+    Parse the grid object at the reader's position; see iter_parse.
+    """
+    meta = None
+    cols = None
+    rows = None
+    header = None
+    datetimes = DateTimeParser()
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.fail('Expecting grid meta')
+
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if (key == 'rows') and (meta is not None) and (cols is not None) \
+                and (reader.peek() == '['):
+            # The usual order: stream the rows as they are decoded.
+            header = _parse_header(meta, cols, datetimes=datetimes)
+            yield header
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield _parse_row(reader.value(), header.version,
+                                     datetimes)
+                    if reader.expect(',]') == ']':
+                        break
+        elif key == 'meta':
+            meta = reader.value()
+        elif key == 'cols':
+            cols = reader.value()
+        elif key == 'rows':
+            rows = reader.value()
+        else:
+            reader.value()
+
+        if reader.expect(',}') == '}':
+            break
+
+    if header is None:
+        if meta is None:
+            reader.fail('Expecting grid meta')
+        if cols is None:
+            reader.fail('Expecting grid cols')
+        header = _parse_header(meta, cols, datetimes=datetimes)
+        yield header
+        for row in (rows or []):
+            yield _parse_row(row, header.version, datetimes)
+
+
+def _parse_row(row, version, datetimes):
+    """
+    Decode a freshly read row in place.
+    """
+    for col, value in row.items():
+        row[col] = parse_embedded_scalar(value, version=version, consume=True,
+                                         datetimes=datetimes)
+    return row
+
+
+class _JsonStream(object):
+    """
+    Read JSON values one at a time from a text or binary file-like object,
+    or a string, through a buffer that only holds the data not yet read.
+    """
+
+    def __init__(self, stream, charset='utf-8', chunk_size=CHUNK_SIZE):
+        self._decoder = json.JSONDecoder()
+        if isinstance(stream, six.string_types):
+            self._buf = stream
+            self._chunks = iter(())
+        else:
+            self._buf = ''
+            self._chunks = iter_chunks(stream, charset=charset,
+                                       chunk_size=chunk_size)
+        self._pos = 0
+        # Characters dropped from the front of the buffer so far.
+        self._offset = 0
+
+    def _fill(self, grow=False):
+        """
+        Read the next chunk into the buffer, dropping what has been read.
+        With `grow`, chunks are read until the data not yet read has at
+        least doubled, so a value spanning many chunks is only decoded a
+        few times over.  Returns False at the end of the stream.
+        """
+        chunks = [self._buf[self._pos:]]
+        wanted = len(chunks[0]) if grow else 0
+        size = 0
+        for chunk in self._chunks:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= wanted:
+                break
+        if len(chunks) == 1:
+            return False
+        self._offset += self._pos
+        self._buf = ''.join(chunks)
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """
+        Return the next non-whitespace character, or '' at the end.
+        """
+        while True:
+            self._pos = JSON_WS_RE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """
+        Step over the next character, which must be one of chars.
+        """
+        char = self.peek()
+        if (not char) or (char not in chars):
+            self.fail('Expecting %s' % ' or '.join(repr(c) for c in chars))
+        self._pos += 1
+        return char
+
+    def value(self):
+        """
+        Decode the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                (value, end) = self._decoder.raw_decode(self._buf, self._pos)
+            except ValueError as e:
+                if not self._cut_short(e):
+                    self._pos = getattr(e, 'pos', self._pos)
+                    self.fail(getattr(e, 'msg', str(e)))
+                if not self._fill(grow=True):
+                    raise
+                continue
+
+            if (end < len(self._buf)) or not self._fill():
+                # A number at the very end might continue in the next chunk.
+                self._pos = end
+                return value
+
+    def _cut_short(self, error):
+        """
+        Return true if a decoding error may be only because the value runs
+        past the end of the buffer, so that reading more might fix it.  A
+        value that is malformed before then fails at once, rather than the
+        rest of the stream being read to find that out.
+        """
+        pos = getattr(error, 'pos', None)
+        if (pos is None) or (pos >= len(self._buf)):
+            return True
+        # A string is reported from where it starts.
+        if error.msg.startswith('Unterminated string'):
+            return True
+        return JSON_PARTIAL_RE.match(self._buf, pos) is not None
+
+    def fail(self, message):
+        raise ValueError('%s at char %d' % (message,
+                                            self._offset + self._pos))
 
 
-def parse_embedded_scalar(scalar, version=LATEST_VER):
+def parse_embedded_scalar(scalar, version=LATEST_VER, consume=False,
+                          datetimes=None):
+    # Strings are decoded according to their type prefix.
+    if isinstance(scalar, six.string_types):
+        decode = _SCALAR_DECODERS.get(scalar[:2])
+        if decode is None:
+            # Not a prefix we know, leave it alone.
+            return scalar
+        if decode is _parse_datetime:
+            return decode(scalar, datetimes)
+        return decode(scalar)
+
     # Simple cases
     if scalar is None:
         return None
@@ -91,8 +419,13 @@ def parse_embedded_scalar(scalar, version=LATEST_VER):
         if version < VER_3_0:
             raise ValueError('Lists are not supported in Haystack version %s' \
                              % version)
-        return list(map(functools.partial(parse_scalar, version=version),
-                        scalar))
+        items = [parse_scalar(item, version=version, consume=consume,
+                              datetimes=datetimes)
+                 for item in scalar]
+        if consume:
+            scalar[:] = items
+            return scalar
+        return items
     elif isinstance(scalar, dict):
         # We support this only in version 3.0 and up.
         if version < VER_3_0:
@@ -100,126 +433,183 @@ def parse_embedded_scalar(scalar, version=LATEST_VER):
                              % version)
         if sys.version_info[0] < 3 and {"meta", "cols", "rows"} <= scalar.viewkeys() \
                 or {"meta", "cols", "rows"} <= scalar.keys():  # Check if grid in grid
-            return parse_grid(scalar)
+            return parse_grid(scalar, consume=consume)
+        elif consume:
+            for (k, v) in scalar.items():
+                scalar[k] = parse_scalar(v, version=version, consume=True,
+                                         datetimes=datetimes)
+            return scalar
         else:
-            return {k: parse_scalar(v, version=version) for (k, v) in scalar.items()}
-    elif scalar == MARKER_STR:
-        return MARKER
-    elif scalar == NA_STR:
-        return NA
-    elif (scalar == REMOVE2_STR) or (scalar == REMOVE3_STR):
-        # Strictly speaking: x: is a HS 2.0 Remove, and -: is a 3.0 Remove
-        # but we'll treat both the same.
-        return REMOVE
-    elif isinstance(scalar, bool):
-        return scalar
-    elif scalar == 'n:INF':
-        return float('INF')
-    elif scalar == 'n:-INF':
-        return -float('INF')
-    elif scalar == 'n:NaN':
-        return float('nan')
-    # Conversion to dict of float value turn them into float 
+            return {k: parse_scalar(v, version=version, datetimes=datetimes)
+                    for (k, v) in scalar.items()}
+    # Conversion to dict of float value turn them into float
     # so regex won't work... better just return them
-    elif isinstance(scalar, float) or isinstance(scalar, six.integer_types):
+    elif isinstance(scalar, (bool, float) + six.integer_types):
         return scalar
 
-    # Is it a number?
+    raise TypeError('Unrecognised JSON scalar %r' % (scalar,))
+
+
+# Decoders for each type prefix.  Each is given the whole string, and
+# returns it as is if it is not a valid value of that type.
+def _parse_marker(scalar):
+    return MARKER if scalar == MARKER_STR else scalar
+
+
+def _parse_na(scalar):
+    return NA if scalar == NA_STR else scalar
+
+
+def _parse_remove(scalar):
+    # Strictly speaking: x: is a HS 2.0 Remove, and -: is a 3.0 Remove
+    # but we'll treat both the same.
+    return REMOVE if scalar == REMOVE3_STR else scalar
+
+
+def _parse_xstr_or_remove(scalar):
+    if scalar == REMOVE2_STR:
+        return REMOVE
+    return XStr(*scalar[2:].split(':'))
+
+
+def _parse_number(scalar):
     match = NUMBER_RE.match(scalar)
-    if match:
-        # We'll get a value and a unit, amongst other tokens.
-        matched = match.groups()
-        value = float(matched[0])
-        if matched[-1] is not None:
-            # It's a quantity
-            return Quantity(value, matched[-1])
-        else:
-            # It's a raw value
-            return value
+    if match is None:
+        return SPECIAL_NUMBERS.get(scalar, scalar)
 
-    # Is it a string?
-    if scalar.startswith('s:'):
-        return scalar[2:]
+    # We'll get a value and a unit, amongst other tokens.
+    matched = match.groups()
+    value = float(matched[0])
+    if matched[-1] is not None:
+        # It's a quantity
+        return Quantity(value, matched[-1])
+    else:
+        # It's a raw value
+        return value
+
+
+def _parse_str(scalar):
+    return scalar[2:]
 
-    # Is it a xstr?
-    if scalar.startswith('x:'):
-        return XStr(*scalar[2:].split(':'))
 
-    # Is it a reference?
+def _parse_ref(scalar):
     match = REF_RE.match(scalar)
-    if match:
-        matched = match.groups()
-        if matched[-1] is not None:
-            return Ref(matched[0], matched[-1], has_value=True)
-        else:
-            return Ref(matched[0])
+    if match is None:
+        return scalar
+
+    matched = match.groups()
+    if matched[-1] is not None:
+        return Ref(matched[0], matched[-1], has_value=True)
+    else:
+        return Ref(matched[0])
+
 
-    # Is it a date?
+def _parse_date(scalar):
     match = DATE_RE.match(scalar)
-    if match:
-        (year, month, day) = match.groups()
-        return datetime.date(year=int(year), month=int(month), day=int(day))
+    if match is None:
+        return scalar
+
+    (year, month, day) = match.groups()
+    return datetime.date(year=int(year), month=int(month), day=int(day))
 
-    # Is it a time?
+
+def _parse_time(scalar):
     match = TIME_RE.match(scalar)
-    if match:
-        (hour, minute, _, second, _) = match.groups()
-        # Convert second to seconds and microseconds
-        if second is None:
-            sec = 0
-            usec = 0
-        elif '.' in second:
-            (whole_sec, frac_sec) = second.split('.', 1)
-            sec = int(whole_sec)
-            usec = int(frac_sec[:6].ljust(6, '0'))
-        else:
-            sec = int(second)
-            usec = 0
-        return datetime.time(hour=int(hour), minute=int(minute),
-                             second=sec, microsecond=usec)
+    if match is None:
+        return scalar
 
-    # Is it a date/time?
+    (hour, minute, _, second, _) = match.groups()
+    # Convert second to seconds and microseconds
+    if second is None:
+        sec = 0
+        usec = 0
+    elif '.' in second:
+        (whole_sec, frac_sec) = second.split('.', 1)
+        sec = int(whole_sec)
+        usec = int(frac_sec[:6].ljust(6, '0'))
+    else:
+        sec = int(second)
+        usec = 0
+    return datetime.time(hour=int(hour), minute=int(minute),
+                         second=sec, microsecond=usec)
+
+
+def _parse_datetime(scalar, datetimes=None):
     match = DATETIME_RE.match(scalar)
-    if match:
-        matches = match.groups()
-        # Parse ISO8601 component
-        isodate = iso8601.parse_date(matches[0])
-        # Parse timezone
-        tzname = matches[-1]
-        if tzname is None:
-            return isodate  # No timezone given
-        else:
-            try:
-                tz = timezone(tzname)
-                return isodate.astimezone(tz)
-            except:  # pragma: no cover
-                # Unlikely code path.
-                return isodate
+    if match is None:
+        return scalar
 
-    # Is it a URI?
+    matches = match.groups()
+    iso_str = matches[0]
+    tzname = matches[-1]
+    if ISO_DATETIME_RE.match(iso_str):
+        # The usual form, which can be sliced up directly.
+        if datetimes is None:
+            datetimes = DateTimeParser()
+        return datetimes.datetime(iso_str, tzname)
+
+    # Parse ISO8601 component
+    isodate = iso8601.parse_date(iso_str)
+    # Parse timezone
+    if tzname is None:
+        return isodate  # No timezone given
+    else:
+        try:
+            tz = timezone(tzname)
+            return isodate.astimezone(tz)
+        except:  # pragma: no cover
+            # Unlikely code path.
+            return isodate
+
+
+def _parse_uri(scalar):
     match = URI_RE.match(scalar)
-    if match:
-        return Uri(match.group(1))
+    if match is None:
+        return scalar
+    return Uri(match.group(1))
+
 
-    # Is it a Bin?
+def _parse_bin(scalar):
     match = BIN_RE.match(scalar)
-    if match:
-        return Bin(match.group(1))
+    if match is None:
+        return scalar
+    return Bin(match.group(1))
+
 
-    # Is it a co-ordinate?
+def _parse_coord(scalar):
     match = COORD_RE.match(scalar)
-    if match:
-        (lat, lng) = match.groups()
-        return Coordinate(float(lat), float(lng))
-    return scalar
+    if match is None:
+        return scalar
+
+    (lat, lng) = match.groups()
+    return Coordinate(float(lat), float(lng))
+
+
+_SCALAR_DECODERS = {
+    MARKER_STR: _parse_marker,
+    NA_STR: _parse_na,
+    REMOVE2_STR: _parse_xstr_or_remove,
+    REMOVE3_STR: _parse_remove,
+    'n:': _parse_number,
+    's:': _parse_str,
+    'r:': _parse_ref,
+    'd:': _parse_date,
+    'h:': _parse_time,
+    't:': _parse_datetime,
+    'u:': _parse_uri,
+    'b:': _parse_bin,
+    'c:': _parse_coord,
+}
 
 
-def parse_scalar(scalar, version=LATEST_VER):
+def parse_scalar(scalar, version=LATEST_VER, consume=False, datetimes=None):
     # If we're given a string, decode the JSON data.
     if isinstance(scalar, six.text_type) and \
             (len(scalar) >= 2) and \
             (scalar[0] in ('"','[','{')) and \
             (scalar[-1] in ('"',']','}')):
-        scalar = json.loads(scalar)
+        scalar = json_loads(scalar)
+        consume = True
 
-    return parse_embedded_scalar(scalar, version=version)
+    return parse_embedded_scalar(scalar, version=version, consume=consume,
+                                 datetimes=datetimes)
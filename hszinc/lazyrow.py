@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Lazily decoded grid rows
+# (C) 2016 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+
+class Pending(object):
+    """
+    Placeholder for a cell that has not been decoded yet.  `token` is
+    whatever the row's decode function needs to produce the value, such as
+    the cell's offset in the source text.
+    """
+    __slots__ = ('token',)
+
+    def __init__(self, token):
+        self.token = token
+
+    def __repr__(self):  # pragma: no cover
+        return 'Pending(%r)' % (self.token,)
+
+
+class LazyRow(dict):
+    """
+    A grid row whose cells are decoded the first time they are read.  Cells
+    given as `Pending` are passed to `decode` on first access and the result
+    replaces the placeholder.  Anything that exposes the values (`values()`,
+    `items()`, comparison, copying, pickling...) decodes the whole row, so
+    it behaves exactly as a plain `dict`.
+    """
+    __slots__ = ('_decode',)
+
+    def __init__(self, decode, cells=()):
+        super(LazyRow, self).__init__(cells)
+        self._decode = decode
+
+    def _decoded(self, key, value):
+        if isinstance(value, Pending):
+            value = self._decode(value.token)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def decode_all(self):
+        """
+        Decode every pending cell in the row.
+        """
+        for (key, value) in list(dict.items(self)):
+            self._decoded(key, value)
+
+    def decoded_values(self):
+        """
+        Return the values that have been decoded so far.
+        """
+        return [value for value in dict.values(self)
+                if not isinstance(value, Pending)]
+
+    def __getitem__(self, key):
+        return self._decoded(key, dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        # Defining this stops dict() and update() from copying the
+        # placeholders directly; they fall back to keys() and __getitem__.
+        return dict.__iter__(self)
+
+    def values(self):
+        self.decode_all()
+        return dict.values(self)
+
+    def items(self):
+        self.decode_all()
+        return dict.items(self)
+
+    def copy(self):
+        return dict(self.items())
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self.decode_all()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        return dict.setdefault(self, key, default)
+
+    def __eq__(self, other):
+        self.decode_all()
+        if isinstance(other, LazyRow):
+            other.decode_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:  # pragma: no cover
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def __reduce_ex__(self, protocol):
+        # Copies and pickles are plain dicts; they do not keep the source
+        # text alive.
+        return (dict, (self.copy(),))
@@ -6,21 +6,32 @@
 # vim: set ts=4 sts=4 et tw=78 sw=4 si:
 
 from .zincparser import parse_grid as parse_zinc_grid, \
-    parse_scalar as parse_zinc_scalar
+    parse_scalar as parse_zinc_scalar, iter_parse as iter_parse_zinc, \
+    parse_header as parse_zinc_header, ON_ERROR_RAISE, ON_ERROR_COLLECT
 from .jsonparser import parse_grid as parse_json_grid, \
-    parse_scalar as parse_json_scalar
+    parse_scalar as parse_json_scalar, parse_header as parse_json_header, \
+    iter_parse as iter_parse_json
+import mmap
 import re
 import six
 import functools
-import json
+
+from concurrent.futures import ProcessPoolExecutor
 
 # Bring in version handling
 from .version import Version, LATEST_VER
+from .grid import Grid
+from .columnar import ColumnarGrid
+from . import datatypes
+from .jsoncodec import loads as json_loads
+from .streamutil import CHUNK_SIZE, BufferStream, ascii_compatible, \
+    is_buffer, iter_text_segments
 
 # Trailing newline sanitation
 TRAILING_NL_RE = re.compile(r'\n+$')
 
 GRID_SEP = re.compile(r'(?<=\n)\n+')
+GRID_SEP_BYTES = re.compile(br'(?<=\n)\n+')
 
 MODE_ZINC = 'text/zinc'
 MODE_JSON = 'application/json'
@@ -46,24 +57,85 @@ def _parse_mode(mode):
         raise ValueError('Unrecognised mode, should be MODE_ZINC or MODE_JSON')
 
 
-def parse(grid_str, mode=MODE_ZINC, charset='utf-8', single=True):
+def parse(grid_str, mode=MODE_ZINC, charset='utf-8', single=True,
+          lazy=False, workers=None, executor=None, columns=None, filter=None,
+          limit=None, on_error=ON_ERROR_RAISE, consume=False,
+          columnar=False, compact=False):
     """
     Parse the given Zinc text and return the equivalent data.
+
+    If `lazy` is set, the rows of Zinc grids keep a reference to the source
+    text and decode each cell only when it is first read.  The rows still
+    behave as `dict`s.  A value that looks right but cannot be decoded
+    (such as the date 2019-02-30) raises `ValueError` when it is read rather
+    than when the grid is parsed.  JSON grids are always decoded in full.
+
+    If `columns` is given, the grids only hold the named columns, in that
+    order.  The cells of the other columns are stepped over without being
+    decoded.
+
+    `filter` is a Project Haystack filter (as for `Grid.filter`) applied to
+    each row as it is parsed, so rows that do not match are never kept.
+    Parsing of each grid stops once it has `limit` rows.
+
+    Several grids may be parsed in parallel by giving `workers`, the number
+    of processes to spread them across, or an `executor` such as a
+    `concurrent.futures.ProcessPoolExecutor` to reuse between calls.  The
+    grids are returned in their original order.  `lazy` has no effect on
+    grids parsed this way, since the rows are decoded to send them back.
+
+    `grid_str` may be text or binary data: `bytes`, `bytearray`,
+    `memoryview` or `mmap.mmap`.  Binary Zinc data in an ASCII compatible
+    charset (such as UTF-8) is split into grids before it is decoded, and
+    each grid is decoded only when it is parsed; other charsets (such as
+    UTF-16) are decoded in full first.
+
+    By default, a row that cannot be parsed fails the whole grid with a
+    `ZincParseException`.  With `on_error=ON_ERROR_COLLECT`, such rows are
+    left out of Zinc grids and each grid's `errors` lists the (line, col,
+    message) of the rows it lost.
+
+    JSON may also be given already decoded, as a grid `dict` or a `list` of
+    them.  This is not modified, unless `consume` is set: its row dicts and
+    lists are then decoded in place and handed over to the grids, saving a
+    copy of each.  The data must not be used afterwards.
+
+    If `columnar` is set, the grids are ColumnarGrids, which are filled as
+    the rows are read.  These hold long grids (such as history reads) in a
+    fraction of the memory, and convert quickly to NumPy arrays and pandas
+    DataFrames.
+
+    If `compact` is set, the rows of the grids are CompactRows rather than
+    `dict`s.  These behave as `dict`s but share the names of the grid's
+    columns, so take much less memory when many rows are kept.  `lazy`
+    takes precedence, and ColumnarGrids hold their cells compactly anyway.
     """
     # Sanitise mode
     mode = _parse_mode(mode)
 
     # Decode incoming text (or python3 will whine!)
-    if isinstance(grid_str, six.binary_type):
-        grid_str = grid_str.decode(encoding=charset)
+    if is_buffer(grid_str):
+        if (mode == MODE_ZINC) and ascii_compatible(charset):
+            grid_data = iter_text_segments(grid_str, GRID_SEP_BYTES,
+                                           charset=charset)
+            grid_str = None
+        elif isinstance(grid_str, six.binary_type):
+            grid_str = grid_str.decode(encoding=charset)
+        else:
+            grid_str = six.text_type(grid_str, charset)
 
     # Split the separate grids up, the grammar definition has trouble splitting
     # them up normally.  This will truncate the newline off the end of the last
     # row.
-    _parse = functools.partial(parse_grid, mode=mode, charset=charset)
+    _parse = functools.partial(parse_grid, mode=mode, charset=charset,
+                               lazy=lazy, columns=columns, filter=filter,
+                               limit=limit, on_error=on_error,
+                               consume=consume, columnar=columnar,
+                               compact=compact)
     if mode == MODE_JSON:
         if isinstance(grid_str, six.string_types):
-            grid_data = json.loads(grid_str)
+            grid_data = json_loads(grid_str)
+            _parse = functools.partial(_parse, consume=True)
         else:
             grid_data = grid_str
 
@@ -72,10 +144,20 @@ def parse(grid_str, mode=MODE_ZINC, charset='utf-8', single=True):
         # To simplify programming, we'll "normalise" to array-of-grids here.
         if isinstance(grid_data, dict):
             grid_data = [grid_data]
-    else:
+    elif grid_str is not None:
         grid_data = GRID_SEP.split(TRAILING_NL_RE.sub('\n', grid_str))
 
-    grids = list(map(_parse, grid_data))
+    if (executor is not None) or workers:
+        grid_data = list(grid_data)
+    if (executor is not None) or (workers and (len(grid_data) > 1)):
+        grids = _parse_parallel(grid_data, mode, charset,
+                                dict(columns=columns, filter=filter,
+                                     limit=limit, on_error=on_error,
+                                     consume=consume, columnar=columnar,
+                                     compact=compact),
+                                workers, executor)
+    else:
+        grids = list(map(_parse, grid_data))
     if single:
         # Most of the time, we will only want one grid.
         if grids:
@@ -86,9 +168,104 @@ def parse(grid_str, mode=MODE_ZINC, charset='utf-8', single=True):
         return grids
 
 
-def parse_grid(grid_str, mode=MODE_ZINC, charset='utf-8'):
+def parse_file(path, mode=MODE_ZINC, charset='utf-8', **kwargs):
+    """
+    Parse the grids in the file at the given path.  Zinc files are memory
+    mapped, so only the grid being parsed is held in memory as text.  Other
+    keyword arguments are as for `parse`.
+    """
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            data = b''
+
+        try:
+            return parse(data, mode=mode, charset=charset, **kwargs)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+def _parse_remote(grid_str, mode, charset, options, pint):
+    """
+    Parse a grid in a worker process, which may not share our choice of
+    Quantity class.
+    """
+    datatypes.use_pint(pint)
+    return parse_grid(grid_str, mode=mode, charset=charset, **options)
+
+
+def _parse_parallel(grid_data, mode, charset, options, workers, executor):
+    """
+    Parse the grid segments using a pool of workers, keeping their order.
+    `options` are passed through to parse_grid.
+    """
+    _parse = functools.partial(_parse_remote, mode=mode, charset=charset,
+                               options=options, pint=datatypes.MODE_PINT)
+    if executor is not None:
+        return list(executor.map(_parse, grid_data))
+
+    # Send the grids in batches to cut down on inter-process chatter.
+    chunksize = max(1, len(grid_data) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_parse, grid_data, chunksize=chunksize))
+
+
+def iter_parse(stream, mode=MODE_ZINC, charset='utf-8', chunk_size=CHUNK_SIZE):
+    """
+    Parse grids from a file-like object (text or binary) a chunk at a time.
+    Each grid is announced by an empty Grid carrying its version, metadata
+    and columns, which is followed by its rows, one dict at a time.  JSON
+    rows are decoded from the stream one at a time too.
+    """
+    # Sanitise mode
+    mode = _parse_mode(mode)
+
+    # Permit in-memory data too; strings are read in place.
+    if is_buffer(stream):
+        stream = BufferStream(stream)
+
+    if mode == MODE_ZINC:
+        return iter_parse_zinc(stream, charset=charset, chunk_size=chunk_size)
+    elif mode == MODE_JSON:
+        return iter_parse_json(stream, charset=charset, chunk_size=chunk_size)
+    else:
+        raise NotImplementedError('Format not implemented: %s' % mode)
+
+
+def parse_header(grid_str, mode=MODE_ZINC, charset='utf-8'):
+    """
+    Parse only the header of the (first) grid in the given text, bytes or
+    file-like object: its version, metadata and column definitions.  These
+    are returned as an empty Grid, or None if there is no grid.  For Zinc,
+    nothing past the column definitions is read.  JSON given as a stream or
+    binary data is read up to the start of its rows; JSON text is decoded in
+    full, but the rows are left alone.
+    """
+    # Sanitise mode
+    mode = _parse_mode(mode)
+
+    if is_buffer(grid_str):
+        # Only the header will be decoded.
+        grid_str = BufferStream(grid_str)
+
+    if mode == MODE_ZINC:
+        return parse_zinc_header(grid_str, charset=charset)
+    elif mode == MODE_JSON:
+        return parse_json_header(grid_str, charset=charset)
+    else:  # pragma: no cover
+        raise NotImplementedError('Format not implemented: %s' % mode)
+
+
+def parse_grid(grid_str, mode=MODE_ZINC, charset='utf-8', lazy=False,
+               columns=None, filter=None, limit=None, on_error=ON_ERROR_RAISE,
+               consume=False, columnar=False, compact=False):
     # Sanitise mode
     mode = _parse_mode(mode)
+    grid_class = ColumnarGrid if columnar else Grid
+    compact = compact and not columnar
 
     # Decode incoming text
     if isinstance(grid_str, six.binary_type):  # pragma: no cover
@@ -97,9 +274,13 @@ def parse_grid(grid_str, mode=MODE_ZINC, charset='utf-8'):
         grid_str = grid_str.decode(encoding=charset)
 
     if mode == MODE_ZINC:
-        return parse_zinc_grid(grid_str)
+        return parse_zinc_grid(grid_str, lazy=lazy, columns=columns,
+                               filter=filter, limit=limit, on_error=on_error,
+                               grid_class=grid_class, compact=compact)
     elif mode == MODE_JSON:
-        return parse_json_grid(grid_str)
+        return parse_json_grid(grid_str, columns=columns, filter=filter,
+                               limit=limit, consume=consume,
+                               grid_class=grid_class, compact=compact)
     else:  # pragma: no cover
         raise NotImplementedError('Format not implemented: %s' % mode)
 
@@ -4,8 +4,6 @@
 # (C) 2016 VRT Systems
 #
 
-from pint import UnitRegistry
-
 HAYSTACK_CONVERSION = [
                     (u'_', ' '),
                     (u'°','deg'),
@@ -168,11 +166,26 @@ def to_pint(unit):
     return unit
 
                 
+_UNIT_REGISTRY = None
+
+
+def get_unit_registry():
+    """
+    Return the unit registry shared by hszinc, building it on first use.
+    """
+    global _UNIT_REGISTRY
+    if _UNIT_REGISTRY is None:
+        _UNIT_REGISTRY = define_haystack_units()
+    return _UNIT_REGISTRY
+
+
 def define_haystack_units():
     """
     Missing units found in project-haystack
     Added to the registry
     """
+    from pint import UnitRegistry
+
     ureg = UnitRegistry(on_redefinition='ignore')
     ureg.define(u'percent = []')
     ureg.define(u'pixel = [] = px = dot = picture_element = pel')
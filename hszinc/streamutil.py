@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Stream reading helpers
+# (C) 2016 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+import codecs
+import mmap
+
+import six
+
+# Number of characters (or bytes) read from a stream at a time.
+CHUNK_SIZE = 65536
+
+# In-memory binary data that can be read without copying.
+BUFFER_TYPES = (six.binary_type, bytearray, memoryview, mmap.mmap)
+
+
+def is_buffer(data):
+    """
+    Return true if data is an in-memory binary buffer (bytes, bytearray,
+    memoryview or mmap).
+    """
+    return isinstance(data, BUFFER_TYPES)
+
+
+class BufferStream(object):
+    """
+    A minimal binary file-like object reading from a buffer in place, where
+    io.BytesIO would take a copy of anything but bytes.
+    """
+
+    def __init__(self, buf):
+        self._buf = memoryview(buf)
+        self._pos = 0
+
+    def read(self, size=-1):
+        start = self._pos
+        if (size is None) or (size < 0):
+            end = len(self._buf)
+        else:
+            end = min(start + size, len(self._buf))
+        self._pos = end
+        return self._buf[start:end].tobytes()
+
+
+def ascii_compatible(charset):
+    """
+    Return true if the charset encodes ASCII text as the same bytes, with
+    no byte order mark, so that encoded text can be split on ASCII bytes
+    before it is decoded.  This is not so of UTF-16 or UTF-32, for example.
+    """
+    try:
+        return '\nver:"3.0"\n'.encode(charset) == b'\nver:"3.0"\n'
+    except (LookupError, UnicodeError):
+        return False
+
+
+def iter_text_segments(buf, separator, charset='utf-8'):
+    """
+    Split a binary buffer on the given bytes regular expression, decoding
+    each piece only as it is needed.  Trailing newlines are collapsed into
+    one, as `parser.parse` does for text.  The charset must be ASCII
+    compatible; see ascii_compatible.
+    """
+    end = len(buf)
+    while (end > 0) and (buf[end - 1:end] == b'\n'):
+        end -= 1
+    if end < len(buf):
+        end += 1
+
+    start = 0
+    for match in separator.finditer(buf, 0, end):
+        yield six.text_type(buf[start:match.start()], charset)
+        start = match.end()
+    yield six.text_type(buf[start:end], charset)
+
+
+def iter_chunks(stream, charset='utf-8', chunk_size=CHUNK_SIZE):
+    """
+    Read a text or binary file-like object in chunks, yielding text.  Binary
+    data is decoded incrementally so multi-byte characters may straddle
+    chunk boundaries.
+    """
+    decoder = None
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        if isinstance(chunk, six.binary_type):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(charset)()
+            chunk = decoder.decode(chunk)
+        yield chunk
+
+    if decoder is not None:
+        tail = decoder.decode(b'', final=True)
+        if tail:  # pragma: no cover
+            yield tail
+
+
+def iter_text_lines(text):
+    """
+    Yield the lines of a string one at a time without splitting all of it.
+    Each line keeps its trailing newline, except possibly the last.
+    """
+    pos = 0
+    end = len(text)
+    while pos < end:
+        nl = text.find('\n', pos)
+        if nl < 0:
+            yield text[pos:]
+            return
+        yield text[pos:nl + 1]
+        pos = nl + 1
+
+
+def iter_lines(stream, charset='utf-8', chunk_size=CHUNK_SIZE):
+    """
+    Read a file-like object in chunks, yielding one line at a time.  Each
+    line keeps its trailing newline, except possibly the last.  A string is
+    read in place.
+    """
+    if isinstance(stream, six.text_type):
+        for line in iter_text_lines(stream):
+            yield line
+        return
+
+    partial = ''
+    for chunk in iter_chunks(stream, charset=charset, chunk_size=chunk_size):
+        lines = (partial + chunk).split('\n')
+        partial = lines.pop()
+        for line in lines:
+            yield line + '\n'
+
+    if partial:
+        yield partial
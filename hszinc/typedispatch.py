@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Look up functions by the type of a value
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from collections import OrderedDict
+
+
+class TypeDispatch(dict):
+    """
+    A table of functions keyed by type.  Looking up a type that has not been
+    registered finds the function for its nearest registered base class, or
+    failing that, the first registered abstract base class it belongs to.
+    The result (None if there is no match) is remembered for next time, so
+    looking up a type is usually a single dict lookup.
+    """
+
+    def __init__(self, functions=()):
+        super(TypeDispatch, self).__init__()
+        self._registered = OrderedDict()
+        for (cls, function) in functions:
+            self.register(cls, function)
+
+    def register(self, cls, function):
+        """
+        Register the function for values of the given type and its
+        subclasses.
+        """
+        self._registered[cls] = function
+        # Forget what was worked out for other types; it may have changed.
+        self.clear()
+        self.update(self._registered)
+
+    def __missing__(self, cls):
+        function = None
+        for base in getattr(cls, '__mro__', ())[1:]:
+            if base in self._registered:
+                function = self._registered[base]
+                break
+        else:
+            for (registered, registered_function) in self._registered.items():
+                if issubclass(cls, registered):
+                    function = registered_function
+                    break
+        self[cls] = function
+        return function
+
+
+# Number of rows looked at to find the type of a column's values.
+SAMPLE_ROWS = 100
+
+
+def column_functions(grid, dispatch, sample_rows=SAMPLE_ROWS):
+    """
+    Pick a function from `dispatch` for each column of the grid, by the type
+    of the column's first value (other than None) in its first `sample_rows`
+    rows.  Returns a list of (column, type, function).  The type and
+    function are None for columns with no values in those rows, or whose
+    type has no function.
+    """
+    columns = list(grid.column.keys())
+    types = dict.fromkeys(columns)
+    missing = set(columns)
+    for row in grid[:sample_rows]:
+        for col in list(missing):
+            value = row.get(col)
+            if value is not None:
+                types[col] = type(value)
+                missing.discard(col)
+        if not missing:
+            break
+
+    functions = []
+    for col in columns:
+        function = None if types[col] is None else dispatch[types[col]]
+        if function is None:
+            # Leave it to the caller to deal with.
+            types[col] = None
+        functions.append((col, types[col], function))
+    return functions
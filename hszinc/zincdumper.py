@@ -15,7 +15,8 @@ import six
 
 from . import Grid
 from .datatypes import Quantity, Coordinate, Ref, Bin, Uri, \
-    MARKER, NA, REMOVE, STR_SUB, XStr
+    MARKER, MarkerType, NAType, RemoveType, STR_SUB, XStr
+from .typedispatch import TypeDispatch, column_functions
 from .version import LATEST_VER, VER_3_0
 from .zoneinfo import timezone_name
 
@@ -47,12 +48,40 @@ def dump_grid(grid):
     """
     Dump a single grid to its ZINC representation.
     """
+    return ''.join(iter_grid(grid))
+
+
+def write_grid(grid, fp, chunk_rows=1):
+    """
+    Write a single grid as ZINC to a text file-like object, `chunk_rows`
+    rows at a time.
+    """
+    for text in iter_grid(grid, chunk_rows=chunk_rows):
+        fp.write(text)
+
+
+def iter_grid(grid, chunk_rows=1):
+    """
+    Generate the ZINC text of a grid in pieces: the version, metadata and
+    columns first, then the rows, `chunk_rows` at a time.
+    """
     header = 'ver:%s' % dump_str(str(grid._version), version=grid._version)
     if bool(grid.metadata):
         header += ' ' + dump_meta(grid.metadata, version=grid._version)
     columns = dump_columns(grid.column, version=grid._version)
-    rows = dump_rows(grid)
-    return '\n'.join([header, columns] + rows + [''])
+    yield '%s\n%s\n' % (header, columns)
+
+    _dump_row = row_dumper(grid)
+    batch = []
+    for row in grid:
+        batch.append(_dump_row(row))
+        if len(batch) >= chunk_rows:
+            batch.append('')
+            yield '\n'.join(batch)
+            batch = []
+    if batch:
+        batch.append('')
+        yield '\n'.join(batch)
 
 
 def dump_meta(meta, version=LATEST_VER):
@@ -84,7 +113,7 @@ def dump_column(col, col_meta, version=LATEST_VER):
 
 
 def dump_rows(grid):
-    return list(map(functools.partial(dump_row, grid), grid))
+    return list(map(row_dumper(grid), grid))
 
 
 def dump_row(grid, row):
@@ -92,65 +121,35 @@ def dump_row(grid, row):
                      c in list(grid.column.keys())])
 
 
+def row_dumper(grid):
+    """
+    Return a function that dumps rows of the given grid.  The type of each
+    column's values is found once, up front; values of that type are handed
+    straight to its dumper, and anything else goes through dump_scalar.
+    """
+    version = grid.version
+    columns = column_functions(grid, SCALAR_DUMPERS)
+
+    def _dump_row(row):
+        get = row.get
+        cells = []
+        for (col, cls, dump) in columns:
+            value = get(col)
+            if type(value) is cls:
+                cells.append(dump(value, version=version))
+            elif value is None:
+                cells.append('N')
+            else:
+                cells.append(dump_scalar(value, version=version))
+        return ','.join(cells)
+    return _dump_row
+
+
 def dump_scalar(scalar, version=LATEST_VER):
-    if scalar is None:
-        return 'N'
-    elif scalar is NA:
-        if version < VER_3_0:
-            raise ValueError('Project Haystack version %s ' \
-                             'does not support NA' \
-                             % version)
-        return 'NA'
-    elif scalar is MARKER:
-        return 'M'
-    elif scalar is REMOVE:
-        return 'R'
-    elif isinstance(scalar, list):
-        # Forbid version 2.0 and earlier.
-        if version < VER_3_0:
-            raise ValueError('Project Haystack version %s ' \
-                             'does not support lists' \
-                             % version)
-        return '[%s]' % ','.join(map(
-            functools.partial(dump_scalar, version=version),
-            scalar))
-    elif isinstance(scalar, dict):
-        # Forbid version 2.0 and earlier.
-        if version < VER_3_0:
-            raise ValueError('Project Haystack version %s ' \
-                             'does not support dicts' \
-                             % version)
-        return '{' + ' '.join([k + ':' + dump_scalar(v, version=version) for (k, v) in scalar.items()]) + '}'
-    elif isinstance(scalar, bool):
-        return dump_bool(scalar, version=version)
-    elif isinstance(scalar, Ref):
-        return dump_ref(scalar, version=version)
-    elif isinstance(scalar, Bin):
-        return dump_bin(scalar, version=version)
-    elif isinstance(scalar, XStr):
-        return dump_xstr(scalar, version=version)
-    elif isinstance(scalar, Uri):
-        return dump_uri(scalar, version=version)
-    elif isinstance(scalar, six.string_types):
-        return dump_str(scalar, version=version)
-    elif isinstance(scalar, datetime.datetime):
-        return dump_date_time(scalar, version=version)
-    elif isinstance(scalar, datetime.time):
-        return dump_time(scalar, version=version)
-    elif isinstance(scalar, datetime.date):
-        return dump_date(scalar, version=version)
-    elif isinstance(scalar, Coordinate):
-        return dump_coord(scalar, version=version)
-    elif isinstance(scalar, Quantity):
-        return dump_quantity(scalar, version=version)
-    elif isinstance(scalar, float) or \
-            isinstance(scalar, int) or \
-            isinstance(scalar, int):
-        return dump_decimal(scalar, version=version)
-    elif isinstance(scalar, Grid):
-        return "<<" + dump_grid(scalar) + ">>"
-    else:
+    dump = SCALAR_DUMPERS[type(scalar)]
+    if dump is None:
         raise NotImplementedError('Unhandled case: %r' % scalar)
+    return dump(scalar, version=version)
 
 
 def dump_id(id_str, version=LATEST_VER):
@@ -221,3 +220,73 @@ def dump_time(time, version=LATEST_VER):
 def dump_date_time(date_time, version=LATEST_VER):
     tz_name = timezone_name(date_time, version=version)
     return '%s %s' % (date_time.isoformat(), tz_name)
+
+
+def dump_null(null, version=LATEST_VER):
+    return 'N'
+
+
+def dump_marker(marker, version=LATEST_VER):
+    return 'M'
+
+
+def dump_na(na, version=LATEST_VER):
+    if version < VER_3_0:
+        raise ValueError('Project Haystack version %s ' \
+                         'does not support NA' \
+                         % version)
+    return 'NA'
+
+
+def dump_remove(remove, version=LATEST_VER):
+    return 'R'
+
+
+def dump_list(lst, version=LATEST_VER):
+    # Forbid version 2.0 and earlier.
+    if version < VER_3_0:
+        raise ValueError('Project Haystack version %s ' \
+                         'does not support lists' \
+                         % version)
+    return '[%s]' % ','.join(map(
+        functools.partial(dump_scalar, version=version),
+        lst))
+
+
+def dump_dict(dic, version=LATEST_VER):
+    # Forbid version 2.0 and earlier.
+    if version < VER_3_0:
+        raise ValueError('Project Haystack version %s ' \
+                         'does not support dicts' \
+                         % version)
+    return '{' + ' '.join([k + ':' + dump_scalar(v, version=version) for (k, v) in dic.items()]) + '}'
+
+
+def dump_inner_grid(grid, version=LATEST_VER):
+    return "<<" + dump_grid(grid) + ">>"
+
+
+# The function that dumps each type of value; see register_scalar_dumper
+# in the dumper module for adding more.
+SCALAR_DUMPERS = TypeDispatch([
+    (type(None), dump_null),
+    (MarkerType, dump_marker),
+    (NAType, dump_na),
+    (RemoveType, dump_remove),
+    (list, dump_list),
+    (dict, dump_dict),
+    (bool, dump_bool),
+    (Ref, dump_ref),
+    (Bin, dump_bin),
+    (XStr, dump_xstr),
+    (Uri, dump_uri),
+] + [(cls, dump_str) for cls in six.string_types] + [
+    (datetime.datetime, dump_date_time),
+    (datetime.time, dump_time),
+    (datetime.date, dump_date),
+    (Coordinate, dump_coord),
+    (Quantity, dump_quantity),
+    (float, dump_decimal),
+] + [(cls, dump_decimal) for cls in six.integer_types] + [
+    (Grid, dump_inner_grid),
+])
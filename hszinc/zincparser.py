@@ -4,23 +4,19 @@
 # (C) 2016 VRT Systems
 #
 # vim: set ts=4 sts=4 et tw=78 sw=4 si:
-import datetime
 import logging
 import re
 import sys
 
-import iso8601
 import pyparsing as pp
 import six
 
-# Bring in special Project Haystack types and time zones
-from .datatypes import Quantity, Coordinate, Uri, Bin, MARKER, NA, REMOVE, Ref, XStr
+from .datatypes import MARKER
 from .grid import Grid
-# Bring in our sortable dict class to preserve order
-from .sortabledict import SortableDict
+from .streamutil import iter_lines, CHUNK_SIZE
 # Bring in version handling
-from .version import Version, VER_2_0, VER_3_0
-from .zoneinfo import timezone
+from .version import Version
+from .zincreader import ZincReader, ZincReaderError, read_grid, read_scalar
 
 # Logging instance for reporting debug info
 LOG = logging.getLogger(__name__)
@@ -31,14 +27,27 @@ NEWLINE_RE = re.compile(r'\r?\n')
 
 # Character number regex; for exceptions
 CHAR_NUM_RE = re.compile(r' *\(at char \d+\),')
+LINE_NUM_RE = re.compile(r'line:\d+')
+LINE_COL_RE = re.compile(r' *\(line:\d+, col:\d+\)')
+
+# Parsing engines.  The hand-written reader (see zincreader) handles the
+# canonical Zinc forms quickly; the pyparsing grammar below is the reference
+# implementation.  ENGINE_AUTO uses the reader and falls back to the grammar
+# for anything the reader does not accept.
+ENGINE_AUTO = 'auto'
+ENGINE_READER = 'reader'
+ENGINE_PYPARSING = 'pyparsing'
+
+# What to do about rows that cannot be parsed: raise ZincParseException, or
+# leave them out and record them in the grid's `errors`.
+ON_ERROR_RAISE = 'raise'
+ON_ERROR_COLLECT = 'collect'
 
 
 def reformat_exception(ex_msg, line_num=None):
-    print(ex_msg)
     msg = CHAR_NUM_RE.sub(u'', six.text_type(ex_msg))
-    print(msg)
     if line_num is not None:
-        return msg.replace(u'line:1', u'line:%d' % line_num)
+        return LINE_NUM_RE.sub(u'line:%d' % line_num, msg)
     else:
         return msg
 
@@ -69,48 +78,101 @@ Forward = lambda *a, **kwa: _leave_ws(pp.Forward, *a, **kwa)
 class ZincParseException(ValueError):
     """
     Exception thrown when a grid cannot be parsed successfully.  If known,
-    the line and column for the grid are given.
+    the line and column for the grid are given.  The text around that point
+    is shown when the exception is turned into a string.
     """
 
+    # The number of lines shown either side of the failing line, and the
+    # number of columns shown around the failing column.
+    CONTEXT_LINES = 3
+    CONTEXT_COLS = 100
+
     def __init__(self, message, grid_str, line, col):
+        self._message = message
+        self._formatted = None
+        # Line number of the start of grid_str, if it is part of a stream.
+        self._first_line = 1
         self.grid_str = grid_str
         self.line = line
         self.col = col
+        super(ZincParseException, self).__init__(message)
 
-        try:
-            # If we know the line and column, point it out in the message.
-            grid_str_lines = grid_str.split('\n')
-            width = max([len(l) for l in grid_str_lines])
-            linefmt = u'%%-%ds' % width
-            rowfmt = u'%4d%s' + linefmt + u'%s'
-
-            formatted_lines = [
-                rowfmt % (
-                    num,
-                    ' >' if (line == num) else '| ',
-                    line_str,
-                    '< ' if (line == num) else ' |'
-                )
-                for (num, line_str)
-                in enumerate(grid_str.split('\n'), 1)
-            ]
-            formatted_lines.insert(line,
-                                   (u'    | ' + linefmt + u' |') \
-                                   % (((col - 2) * u' ') + '.^.')
+    def __str__(self):
+        # Only render the text when asked; it may be huge.
+        if self._formatted is None:
+            try:
+                self._formatted = u'%s\n%s' % (self._message,
+                                               self._format_context())
+            except:  # pragma: no cover
+                # We should not get here.
+                LOG.exception('Exception encountered formatting log message')
+                self._formatted = self._message
+        return self._formatted
+
+    def _format_context(self):
+        """
+        Point out the failing line and column, within a window of the text.
+        """
+        grid_str = self.grid_str
+        line = self.line - self._first_line + 1
+        first = max(1, line - self.CONTEXT_LINES)
+        last = max(1, line + self.CONTEXT_LINES)
+
+        # Find the lines to show without splitting up the whole text.
+        pos = 0
+        for _ in range(first - 1):
+            pos = grid_str.find(u'\n', pos)
+            if pos < 0:
+                break
+            pos += 1
+        lines = []
+        while (pos >= 0) and (len(lines) < (last - first + 1)):
+            end = grid_str.find(u'\n', pos)
+            if end < 0:
+                lines.append(grid_str[pos:])
+                break
+            lines.append(grid_str[pos:end])
+            pos = end + 1
+        if not lines:
+            lines = [u'']
+
+        # Keep to a window around the column on long lines.
+        offset = 0
+        if max([len(l) for l in lines]) > self.CONTEXT_COLS:
+            offset = max(0, self.col - 1 - (self.CONTEXT_COLS // 2))
+            lines = [l[offset:offset + self.CONTEXT_COLS] for l in lines]
+
+        width = max([len(l) for l in lines])
+        num_offset = self._first_line - 1
+        num_width = max(4, len(str(first + len(lines) - 1 + num_offset)))
+        indent = u' ' * num_width
+        linefmt = u'%%-%ds' % width
+        rowfmt = u'%%%dd%%s' % num_width + linefmt + u'%s'
+        formatted_lines = [
+            rowfmt % (
+                num + num_offset,
+                ' >' if (line == num) else '| ',
+                line_str,
+                '< ' if (line == num) else ' |'
+            )
+            for (num, line_str) in enumerate(lines, first)
+        ]
+        if first <= line:
+            formatted_lines.insert(line - first + 1,
+                                   (indent + u'| ' + linefmt + u' |') \
+                                   % (((self.col - 2 - offset) * u' ') + '.^.')
                                    )
 
-            # Border it for readability
-            formatted_lines.insert(0, u'    .' + (u'-' * (2 + width)) + u'.')
-            formatted_lines.append(u'    \'' + (u'-' * (2 + width)) + u'\'')
+        # Border it for readability
+        formatted_lines.insert(0, indent + u'.' + (u'-' * (2 + width)) + u'.')
+        formatted_lines.append(indent + u'\'' + (u'-' * (2 + width)) + u'\'')
+        return u'\n'.join(formatted_lines)
 
-            # Append to message
-            message += u'\n%s' % u'\n'.join(formatted_lines)
-        except:  # pragma: no cover
-            # We should not get here.
-            LOG.exception('Exception encountered formatting log message')
-            pass
-
-        super(ZincParseException, self).__init__(message)
+    def __reduce__(self):
+        # Permit the exception to be passed back from a worker process.
+        return (self.__class__,
+                (self._message, self.grid_str, self.line, self.col),
+                {'_first_line': self._first_line})
 
 
 class NearestMatch(object):
@@ -195,285 +257,6 @@ def _unescape(s, uri=False):
     return out
 
 
-# Grammar according to
-#   latest: http://project-haystack.org/doc/Zinc
-#   "2.0":  https://web.archive.org/web/20141012013653/http://project-haystack.org:80/doc/Zinc
-#   "3.0":  https://web.archive.org/web/20160805064015/http://project-haystack.org:80/doc/Zinc
-
-# Rudimentary elements
-hs_digit = Regex(r'\d')
-hs_digits = Regex(r'[0-9_]+').setParseAction(
-    lambda toks: [''.join([t.replace('_', '') for t in toks[0]])])
-hs_alphaLo = Regex(r'[a-z]')
-hs_alphaHi = Regex(r'[A-Z]')
-hs_alpha = Regex(r'[a-zA-Z]')
-hs_valueSep = Regex(r' *, *').setName('valueSep')
-hs_rowSep = Regex(r' *\n *').setName('rowSep')
-hs_plusMinus = Or([Literal('+'), Literal('-')])
-
-# Forward declaration of data types.
-hs_scalar_2_0 = Forward()
-hs_scalar_3_0 = Forward()
-hs_scalar = NearestMatch({
-    VER_2_0: hs_scalar_2_0,
-    VER_3_0: hs_scalar_3_0
-})
-
-hs_grid_2_0 = Forward()
-hs_grid_3_0 = Forward()
-hs_grid = NearestMatch({
-    VER_2_0: hs_grid_2_0,
-    VER_3_0: hs_grid_3_0
-})
-
-# Co-ordinates
-hs_coordDeg = Combine(And([
-    Optional(Literal('-')),
-    Optional(hs_digits),
-    Optional(And([Literal('.'), hs_digits]))
-])).setParseAction(lambda toks: [float(toks[0] or '0')])
-hs_coord = And([Suppress(Literal('C(')),
-                hs_coordDeg,
-                Suppress(hs_valueSep),
-                hs_coordDeg,
-                Suppress(Literal(')'))]).setParseAction(
-    lambda toks: [Coordinate(toks[0], toks[1])])
-
-# Dates and times
-hs_tzHHMMOffset = Combine(Or([
-    CaselessLiteral('z'),
-    And([hs_plusMinus, Regex(r'\d\d:\d\d')])]
-))
-hs_tzName = Regex(r'[A-Z][a-zA-Z0-9_\-]*')
-hs_tzUTCGMT = Or([Literal('UTC'), Literal('GMT')])
-hs_tzUTCOffset = Combine(And([
-    hs_tzUTCGMT, Optional(
-        Or([Literal('0'),
-            And([hs_plusMinus, OneOrMore(hs_digit)]
-                )]
-           ))]))
-hs_timeZoneName = Or([hs_tzUTCOffset, hs_tzName])
-hs_dateSep = CaselessLiteral('T')
-hs_date_str = Combine(And([
-    hs_digit, hs_digit, hs_digit, hs_digit,
-    Literal('-'),
-    hs_digit, hs_digit,
-    Literal('-'),
-    hs_digit, hs_digit]))
-hs_date = hs_date_str.copy().setParseAction(
-    lambda toks: [datetime.datetime.strptime(toks[0], '%Y-%m-%d').date()])
-
-hs_time_str = Combine(And([
-    hs_digit, hs_digit,
-    Literal(':'),
-    hs_digit, hs_digit,
-    Literal(':'),
-    hs_digit, hs_digit,
-    Optional(And([
-        Literal('.'),
-        OneOrMore(hs_digit)]))
-]))
-
-
-def _parse_time(toks):
-    time_str = toks[0]
-    time_fmt = '%H:%M:%S'
-    if '.' in time_str:
-        time_fmt += '.%f'
-    return [datetime.datetime.strptime(time_str, time_fmt).time()]
-
-
-hs_time = hs_time_str.copy().setParseAction(_parse_time)
-hs_isoDateTime = Combine(And([
-    hs_date_str,
-    hs_dateSep,
-    hs_time_str,
-    Optional(hs_tzHHMMOffset)
-])).setParseAction(lambda toks: [iso8601.parse_date(toks[0].upper())])
-
-
-def _parse_datetime(toks):
-    # Made up of parts: ISO8601 Date/Time, time zone label
-    isodt = toks[0]
-    if len(toks) > 1:
-        tzname = toks[1]
-    else:
-        tzname = None
-
-    if (isodt.tzinfo is None) and bool(tzname):  # pragma: no cover
-        # This technically shouldn't happen according to Zinc specs
-        return [timezone(tzname).localise(isodt)]
-    elif bool(tzname):
-        try:
-            tz = timezone(tzname)
-            return [isodt.astimezone(tz)]
-        except:  # pragma: no cover
-            # Unlikely to occur, might do though if Project Haystack changes
-            # its timezone list or if a system doesn't recognise a particular
-            # timezone.
-            return [isodt]  # Failed, leave alone
-    else:
-        return [isodt]
-
-
-hs_dateTime = And([
-    hs_isoDateTime,
-    Optional(And([
-        Suppress(Literal(' ')),
-        hs_timeZoneName
-    ]))
-]).setParseAction(_parse_datetime)
-
-# Quantities and raw numeric values
-hs_unitChar = Or([
-    hs_alpha,
-    Word(u'%_/$' + u''.join([
-        six.unichr(c)
-        for c in range(0x0080, 0xffff)
-    ]), exact=1)
-])
-hs_unit = Combine(OneOrMore(hs_unitChar))
-hs_exp = Combine(And([
-    CaselessLiteral('e'),
-    Optional(hs_plusMinus),
-    hs_digits
-]))
-hs_decimal = Combine(And([
-    Optional(Literal('-')),
-    hs_digits,
-    Optional(And([
-        Literal('.'),
-        hs_digits
-    ])),
-    Optional(hs_exp)
-])).setParseAction(lambda toks: [float(toks[0])])
-
-hs_quantity = And([hs_decimal, hs_unit]).setParseAction(
-    lambda toks: [Quantity(toks[0], unit=toks[1])])
-hs_number = Or([
-    hs_quantity,
-    hs_decimal,
-    Or([
-        Literal('INF'),
-        Literal('-INF'),
-        Literal('NaN')
-    ]).setParseAction(lambda toks: [float(toks[0])])
-])
-
-# URIs
-hs_uriChar = Regex(r"([^\x00-\x1f\\`]|\\[bfnrt\\:/?" \
-                   + r"#\[\]@&=;`]|\\[uU][0-9a-fA-F]{4})")
-hs_uri = Combine(And([
-    Suppress(Literal('`')),
-    ZeroOrMore(hs_uriChar),
-    Suppress(Literal('`'))
-])).setParseAction(lambda toks: [Uri(_unescape(toks[0], uri=True))])
-
-# Strings
-hs_strChar = Regex(r"([^\x00-\x1f\\\"]|\\[bfnrt\\\"$]|\\[uU][0-9a-fA-F]{4})")
-hs_str = Combine(And([
-    Suppress(Literal('"')),
-    ZeroOrMore(hs_strChar),
-    Suppress(Literal('"'))
-])).setParseAction(lambda toks: [_unescape(toks[0], uri=False)])
-
-# References
-hs_refChar = Or([hs_alpha, hs_digit, Word('_:-.~', exact=1)])
-hs_ref = And([
-    Suppress(Literal('@')),
-    Combine(ZeroOrMore(hs_refChar)),
-    Optional(And([
-        Suppress(Literal(' ')),
-        hs_str
-    ]))
-]).setParseAction(lambda toks: [ \
-    Ref(toks[0], toks[1] if len(toks) > 1 else None) \
-    ])
-
-# Bins
-hs_binChar = Regex(r"[\x20-\x27\x2a-\x7f]")
-hs_bin = Combine(And([
-    Suppress(Literal('Bin(')),
-    Combine(ZeroOrMore(hs_binChar)),
-    Suppress(Literal(')'))
-])).setParseAction(lambda toks: [Bin(toks[0])])
-
-# Haystack 3.0 XStr(...)
-hs_xstr = And([
-    Regex(r"[a-zA-Z0-9_]+"),
-    Suppress(Literal('(')),
-    hs_str,
-    Suppress(Literal(')'))
-]).setParseAction(lambda toks: [XStr(toks[0], toks[1])])
-
-# Booleans
-hs_bool = Word('TF', min=1, max=1, exact=1).setParseAction( \
-    lambda toks: [toks[0] == 'T'])
-
-# Singleton values
-hs_remove = Literal('R').setParseAction( \
-    lambda toks: [REMOVE]).setName('remove')
-hs_marker = Literal('M').setParseAction( \
-    lambda toks: [MARKER]).setName('marker')
-hs_null = Literal('N').setParseAction( \
-    lambda toks: [None]).setName('null')
-hs_na = Literal('NA').setParseAction( \
-    lambda toks: [NA]).setName('na')
-# Lists, these will probably be in Haystack 4.0, so let's not
-# assume a version.  There are three cases:
-# - Empty list: [ {optional whitespace} ]
-# - List *with* trailing comma: [ 1, 2, 3, ]
-# - List without trailing comma: [ 1, 2, 3 ]
-#
-# We need to handle this trailing separator case.  That for now means
-# that a NULL within a list *MUST* be explicitly given using the 'N'
-# literal: we cannot support implicit NULLs as they are ambiguous.
-hs_list = GenerateMatch( \
-    lambda ver: Group(Or([ \
-        Suppress(Regex(r'[ *]')), \
-        And([ \
-            Suppress(Regex(r'\[ *')), \
-            Optional(DelimitedList( \
-                hs_scalar[ver], \
-                delim=hs_valueSep)), \
-            Suppress(Optional(hs_valueSep)), \
-            Suppress(Regex(r' *\]')) \
-            ]) \
-        ])).setParseAction(lambda toks: toks.asList()))
-# Tag IDs
-hs_id = Regex(r'[a-z][a-zA-Z0-9_]*').setName('id')
-
-# Grid building blocks
-hs_cell = GenerateMatch( \
-    lambda ver: Or([Empty().copy().setParseAction(lambda toks: [None]), \
-                    hs_scalar[ver]]).setName('cell'))
-
-# Dict
-# There are three cases:
-# - Empty dict: { {optional whitespace} }
-# - map with marker: { m }
-# - dics: { k:1  ]
-#
-hs_tagmarker = hs_id
-
-hs_tagpair = GenerateMatch(
-    lambda ver: And([hs_id,
-                     Suppress(Regex(r': *')),
-                     hs_scalar[ver]
-                     ])
-        .setParseAction(lambda toks: tuple(toks[:2]))
-        .setName('tagPair'))
-
-hs_tag = GenerateMatch(
-    lambda ver: Or([hs_tagmarker, hs_tagpair[ver]])
-        .setName('tag'))
-
-hs_tags = GenerateMatch(
-    lambda ver: ZeroOrMore(Or([hs_tag[ver], \
-                               Suppress(Regex(r'[ *]'))])) \
-        .setName('tags'))
-
-
 def to_dict(tokenlist):
     result = {}
     i = 0
@@ -503,143 +286,114 @@ def to_dict(tokenlist):
 #     return result
 
 
-hs_dict = GenerateMatch(
-    lambda ver: Or([
-        Suppress(Regex(r'[ *]')),
-        And([
-            Suppress(Regex(r'{ *')),
-            hs_tags[ver],
-            Suppress(Regex(r' *}'))
-        ])
-    ])
-        .setName("dict")
-        .setParseAction(to_dict)
-)
-
-hs_inner_grid = GenerateMatch( \
-    lambda ver: And([
-        Suppress(Regex(r'<< *')),
-        hs_grid[ver],
-        Suppress(Regex(r' *>>')),
-    ]))
-
-# All possible scalar values, by Haystack version
-hs_scalar_2_0 <<= Or([hs_ref, hs_bin, hs_str, hs_uri, hs_dateTime,
-                      hs_date, hs_time, hs_coord, hs_number, hs_null, hs_marker,
-                      hs_remove, hs_bool]).setName('scalar')
-hs_scalar_3_0 <<= Or([hs_ref, hs_xstr, hs_str, hs_uri, hs_dateTime,
-                      hs_date, hs_time, hs_coord, hs_number, hs_na, hs_null, hs_marker,
-                      hs_remove, hs_bool, hs_list[VER_3_0], hs_dict[VER_3_0], hs_inner_grid[VER_3_0]]).setName('scalar')
-
-hs_nl = Combine(And([Optional(Literal('\r')), Literal('\n')]))
-
-hs_row = GenerateMatch( \
-    lambda ver: Group(And([DelimitedList(hs_cell[ver], delim=hs_valueSep),
-                           Suppress(Regex(r' *')),
-                           Suppress(hs_nl)
-                           ])).setName('row'))
-
-hs_rows = GenerateMatch( \
-    lambda ver: Group(ZeroOrMore(hs_row[ver])).setName("rows"))
-
-hs_metaPair = GenerateMatch( \
-    lambda ver: And([ \
-        hs_id, \
-        Suppress(And([ \
-            ZeroOrMore(Literal(' ')), \
-            Literal(':'), \
-            ZeroOrMore(Literal(' ')) \
-            ])), \
-        hs_scalar[ver] \
-        ]).setParseAction(lambda toks: [tuple(toks[:2])]).setName('metaPair'))
-hs_metaMarker = hs_id.copy().setParseAction( \
-    lambda toks: [(toks[0], MARKER)]).setName('metaMarker')
-hs_metaItem = GenerateMatch( \
-    lambda ver: Or([ \
-        hs_metaMarker, \
-        hs_metaPair[ver] \
-        ]).setName('metaItem'))
-hs_meta = GenerateMatch( \
-    lambda ver: DelimitedList(hs_metaItem[ver], \
-                              delim=' ').setParseAction( \
-        lambda toks: [SortableDict(toks.asList())] \
-        ).setName('meta'))
-
-hs_col = GenerateMatch( \
-    lambda ver: And([ \
-        hs_id, \
-        Optional(And([ \
-            Suppress(Literal(' ')), \
-            hs_meta[ver]
-        ])).setName('colMeta') \
-        ]).setParseAction(lambda toks: [ \
-        (toks[0], toks[1] if len(toks) > 1 else {})]))
-
-hs_cols = GenerateMatch( \
-    lambda ver: And([
-        DelimitedList(
-            hs_col[ver], delim=hs_valueSep).setParseAction(  # + hs_nl
-            lambda toks: [SortableDict(toks.asList())]),
-        Suppress(Regex(r' *')),
-        Suppress(hs_nl)
-    ])
-)
-
-hs_gridVer = Combine(And([Suppress(Literal('ver:')) + hs_str]))
-
-
-def _assign_ver(toks):
-    ver = toks[0]
-    if len(toks) > 1:
-        grid_meta = toks[1]
-    else:
-        grid_meta = SortableDict()
-
-    # Put 'ver' at the start
-    grid_meta.add_item('ver', ver, index=0)
-    return grid_meta
-
-
-hs_gridMeta = GenerateMatch( \
-    lambda ver: And([ \
-        hs_gridVer, \
-        Optional(And([ \
-            Suppress(Literal(' ')), \
-            hs_meta[ver] \
-            ])).setName('gridMeta'),
-        Suppress(Regex(r' *')),
-        Suppress(hs_nl)
-    ]).setParseAction(_assign_ver))  # + hs_nl
-
-
-def _gen_grid(toks):
-    (grid_meta, col_meta, rows) = toks
-    if len(rows) == 1 and rows[0] == None:
-        rows = []
-    g = Grid(version=grid_meta.pop('ver'),
-             metadata=grid_meta,
-             columns=list(col_meta.items()))
-    g.extend(map(lambda row: dict(zip(col_meta.keys(), row)), rows))
-    return g
-
-
-hs_grid_2_0 <<= And([ \
-    hs_gridMeta[VER_2_0],
-    hs_cols[VER_2_0],
-    hs_rows[VER_2_0],
-]).setParseAction(_gen_grid)
-
-hs_grid_3_0 <<= And([ \
-    hs_gridMeta[VER_3_0],
-    hs_cols[VER_3_0],
-    hs_rows[VER_3_0],
-]).setParseAction(_gen_grid)
-
-
-def parse_grid(grid_data, parseAll=True):
+def _grammar():
+    """
+    Return the module holding the Zinc grammar, building it on first use.
+    """
+    from . import zincgrammar
+    return zincgrammar
+
+
+def __getattr__(name):
+    # The grammar elements (hs_grid, hs_row...) are still reachable from
+    # here, but are only built when first asked for.
+    if name.startswith('hs_'):
+        return getattr(_grammar(), name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # No module __getattr__ before Python 3.7; build the grammar now.
+    from .zincgrammar import *
+
+
+def _line_col(text, pos):
+    """
+    Return the (line, column) of the given offset, both counting from 1.
+    """
+    return (text.count('\n', 0, pos) + 1, pos - text.rfind('\n', 0, pos))
+
+
+class _RowFallback(object):
+    """
+    Handles the rows of a grid that the reader rejects; it is passed to
+    ZincReader as its `row_error`.  Each such row is given to the grammar
+    on its own, rather than parsing the whole grid again.  Rows that the
+    grammar rejects too are either recorded in `errors` (for
+    ON_ERROR_COLLECT) or raised as a ParseException located in the grid.
+    """
+
+    def __init__(self, grid_data, version, engine, collect):
+        self._grid_data = grid_data
+        self._version = version
+        self._engine = engine
+        self._collect = collect
+        # Rows arrive in order, so line numbers are counted as we go.
+        self._pos = 0
+        self._line = 1
+        self.errors = []
+
+    def __call__(self, start, end, exc):
+        grid_data = self._grid_data
+        pos = getattr(exc, 'pos', start)
+        message = reason = six.text_type(exc)
+        if self._engine != ENGINE_READER:
+            row_str = grid_data[start:end]
+            try:
+                return list(_grammar().hs_row[self._version].parseString(
+                    row_str, parseAll=True)[0])
+            except pp.ParseException as pe:
+                pos = start + pe.loc
+                reason = pe.msg
+                message = LINE_COL_RE.sub(u'', CHAR_NUM_RE.sub(
+                    u'', six.text_type(pe)))
+            except Exception:
+                pass
+
+            if (not self._collect) and ('<<' in row_str):
+                # The row may hold a grid spanning several lines; leave it
+                # to the grammar to read the whole grid.
+                raise exc
+
+        if not self._collect:
+            raise pp.ParseException(grid_data, pos, reason)
+
+        self._line += grid_data.count('\n', self._pos, pos)
+        self._pos = pos
+        col = pos - grid_data.rfind('\n', 0, pos)
+        self.errors.append((self._line, col, message))
+        return None
+
+
+def parse_grid(grid_data, parseAll=True, engine=ENGINE_AUTO, lazy=False,
+               columns=None, filter=None, limit=None, on_error=ON_ERROR_RAISE,
+               grid_class=Grid, compact=False):
     """
-    Parse the incoming grid.
+    Parse the incoming grid.  parseAll=False always uses the pyparsing
+    grammar, since the reader only handles whole grids.  With `lazy`, the
+    reader returns rows that decode their cells on first access; grids it
+    hands to the grammar are decoded as usual.  If `columns` is given, only
+    those columns are decoded and returned.
+
+    `filter` is a Haystack filter applied to each row as it is read, and
+    reading stops once `limit` rows match.  Filters that follow references
+    (`siteRef->dis`) need the whole grid, so are applied after parsing.
+
+    With on_error=ON_ERROR_COLLECT, rows that cannot be parsed are left out
+    and the grid's `errors` lists the (line, col, message) of each.  This
+    requires the reader, even with ENGINE_PYPARSING; the grammar is only
+    used for rows the reader rejects (unless ENGINE_READER is given).
+    Problems outside the rows still raise ZincParseException.  Cells of
+    lazy rows that turn out to be invalid raise ValueError when read.
+
+    The grid returned is a `grid_class`, such as ColumnarGrid; the reader
+    fills it as it goes.  With `compact` (unless `lazy` is set), its rows
+    are CompactRows.
     """
+    if on_error not in (ON_ERROR_RAISE, ON_ERROR_COLLECT):
+        raise ValueError('Unrecognised on_error, should be ON_ERROR_RAISE '
+                         'or ON_ERROR_COLLECT')
+
     try:
         # First element is the grid metadata
         ver_match = VERSION_RE.match(grid_data)
@@ -649,14 +403,70 @@ def parse_grid(grid_data, parseAll=True):
                 grid_data, 1, 1)
         version = Version(ver_match.group(1))
 
+        # Filters that follow references are applied to the whole grid.
+        from .grid_filter import row_filter_function  # imports this module
+        (row_filter, filter_columns) = row_filter_function(filter)
+        post_filter = (row_filter is None) and bool(filter) \
+                and bool(filter.strip())
+
+        collect = (on_error == ON_ERROR_COLLECT)
+        row_fallback = None
+        if collect or (engine == ENGINE_AUTO):
+            row_fallback = _RowFallback(grid_data, version, engine, collect)
+
+        g = None
+        errors = []
+        if parseAll and ((engine != ENGINE_PYPARSING) or collect):
+            try:
+                if not post_filter:
+                    g = read_grid(grid_data, lazy=lazy, columns=columns,
+                                  row_filter=row_filter,
+                                  filter_columns=filter_columns,
+                                  limit=limit, row_error=row_fallback,
+                                  grid_class=grid_class, compact=compact)
+                else:
+                    g = read_grid(grid_data, lazy=lazy,
+                                  row_error=row_fallback,
+                                  grid_class=grid_class)
+                if collect:
+                    errors = row_fallback.errors
+                if not post_filter:
+                    g.errors = errors
+                    return g
+            except pp.ParseException:
+                # A row that neither the reader nor the grammar accepts.
+                raise
+            except Exception:
+                if engine == ENGINE_READER:
+                    raise
+                # Let the reference grammar have a go, it will either cope
+                # with the oddity or give a proper error.
+                LOG.debug('Reader rejected grid, retrying with grammar',
+                          exc_info=1)
+
         # Now parse the grid of the grid accordingly
-        g = hs_grid[version].parseString(grid_data, parseAll=parseAll)[0]
+        if g is None:
+            g = _grammar().hs_grid[version].parseString(grid_data, parseAll=parseAll)[0]
+        if filter or limit:
+            g = g.filter(filter or '', limit=limit or 0)
+        if columns is not None:
+            g = g._project(columns)
+        if not isinstance(g, grid_class):
+            g = grid_class.from_grid(g)
+        if compact and not lazy:
+            g.compact()
+        g.errors = errors
         return g
     except pp.ParseException as pe:
         LOG.debug('Failing grid: %r', grid_data)
         raise ZincParseException(
             'Failed to parse: %s' % reformat_exception(pe, pe.lineno),
             grid_data, pe.lineno, pe.col)
+    except ZincReaderError as zre:
+        LOG.debug('Failing grid: %r', grid_data)
+        (line, col) = _line_col(grid_data, zre.pos)
+        raise ZincParseException(
+            'Failed to parse: %s' % zre, grid_data, line, col)
     except:
         LOG.debug('Failing grid: %r', grid_data, exc_info=1)
         (_, exc, _) = sys.exc_info()
@@ -664,12 +474,25 @@ def parse_grid(grid_data, parseAll=True):
             'Failed to parse: %s' % exc, grid_data, 0, 0)
 
 
-def parse_scalar(scalar_data, version):
+def parse_scalar(scalar_data, version, engine=ENGINE_AUTO):
     """
     Parse a Project Haystack scalar in ZINC format.
     """
+    if engine != ENGINE_PYPARSING:
+        try:
+            return read_scalar(scalar_data, version)
+        except ZincReaderError as zre:
+            if engine == ENGINE_READER:
+                raise ZincParseException(
+                    'Failed to parse scalar: %s' % zre,
+                    scalar_data, 1, zre.pos + 1)
+        except Exception:
+            if engine == ENGINE_READER:
+                raise
+        # Fall through to the reference grammar.
+
     try:
-        return hs_scalar[version].parseString(scalar_data, parseAll=True)[0]
+        return _grammar().hs_scalar[version].parseString(scalar_data, parseAll=True)[0]
     except pp.ParseException as pe:
         # Raise a new exception with the appropriate line number.
         raise ZincParseException(
@@ -679,3 +502,133 @@ def parse_scalar(scalar_data, version):
         LOG.debug('Failing scalar data: %r (version %r)',
                   scalar_data, version)
         raise
+
+
+def _parse_stream_header(text, engine):
+    """
+    Parse the version line and column definitions of a streamed grid.
+    Returns an empty grid carrying the header, the column names and the
+    reader to use for the rows.
+    """
+    reader = ZincReader(text)
+    try:
+        (ver_str, grid_meta, columns, pos) = reader.read_header()
+        if pos != len(text):
+            reader.error('Expected end of header', pos)
+    except Exception:
+        if engine == ENGINE_READER:
+            raise
+        ver_match = VERSION_RE.match(text)
+        if ver_match is None:
+            raise
+        version = Version(ver_match.group(1))
+        grammar = _grammar()
+        (grid_meta, columns) = \
+            (grammar.hs_gridMeta[version] + grammar.hs_cols[version]) \
+            .parseString(text, parseAll=True)
+        ver_str = grid_meta.pop('ver')
+        reader.set_version(version)
+
+    grid = Grid(version=ver_str, metadata=grid_meta,
+                columns=list(columns.items()))
+    return (grid, list(columns.keys()), reader)
+
+
+def _parse_stream_row(reader, text, engine):
+    """
+    Parse a single streamed row, returning the list of cells.
+    """
+    reader.set_text(text)
+    try:
+        (cells, pos) = reader.read_row(0)
+        if pos != len(text):
+            reader.error('Expected end of row', pos)
+        return cells
+    except Exception:
+        if engine == ENGINE_READER:
+            raise
+        return list(_grammar().hs_row[reader.version].parseString(
+            text, parseAll=True)[0])
+
+
+def _stream_exception(text, start_line):
+    """
+    Wrap the exception being handled in a ZincParseException.  Line numbers
+    count from the start of the stream.
+    """
+    (_, exc, _) = sys.exc_info()
+    if isinstance(exc, ZincReaderError):
+        (line, col) = _line_col(text, exc.pos)
+    elif isinstance(exc, pp.ParseException):
+        (line, col) = (exc.lineno, exc.col)
+    else:
+        (line, col) = (1, 1)
+
+    zpe = ZincParseException(
+        'Failed to parse line %d: %s' % (start_line + line - 1, exc),
+        text, start_line + line - 1, col)
+    zpe._first_line = start_line
+    return zpe
+
+
+def iter_parse(stream, charset='utf-8', chunk_size=CHUNK_SIZE,
+               engine=ENGINE_AUTO):
+    """
+    Parse Zinc grids from a file-like object (or string) without reading it
+    all into memory.  For each grid, an empty Grid carrying the version,
+    metadata and columns is yielded, followed by each of its rows as a dict.
+    """
+    lines = iter_lines(stream, charset=charset, chunk_size=chunk_size)
+    return _iter_parse_lines(lines, engine)
+
+
+def parse_header(stream, charset='utf-8', chunk_size=CHUNK_SIZE,
+                 engine=ENGINE_AUTO):
+    """
+    Parse only the version, metadata and columns of the first Zinc grid in
+    a string or file-like object.  These are returned in an empty Grid; no
+    more than the header lines are read, and the rows are never scanned.
+    Returns None if there is no grid.
+    """
+    lines = iter_lines(stream, charset=charset, chunk_size=chunk_size)
+    return next(_iter_parse_lines(lines, engine), None)
+
+
+def _iter_parse_lines(lines, engine):
+    """
+    Parse Zinc grids a line at a time; see iter_parse.
+    """
+    line_num = 0
+    reader = None
+    for line in lines:
+        line_num += 1
+        if line == '\n':
+            # Blank lines separate grids
+            reader = None
+            continue
+
+        start_line = line_num
+        text = line
+        if reader is None:
+            # The header includes the column definitions on the next line.
+            text += next(lines, '')
+            line_num += 1
+
+        while True:
+            try:
+                if reader is None:
+                    (item, col_names, reader) = \
+                        _parse_stream_header(text, engine)
+                else:
+                    item = dict(zip(col_names,
+                                    _parse_stream_row(reader, text, engine)))
+                break
+            except Exception:
+                # An embedded grid spans several lines; try adding the next.
+                more = next(lines, None) if '<<' in text else None
+                if more is None:
+                    LOG.debug('Failing text: %r', text, exc_info=1)
+                    raise _stream_exception(text, start_line)
+                text += more
+                line_num += 1
+        yield item
@@ -0,0 +1,721 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# Hand-written Zinc grid reader.
+# (C) 2016 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+"""
+A single-pass, character-dispatched reader for Zinc grids.
+
+The pyparsing grammar in `zincparser` tries every scalar alternative on
+every cell, which makes it very slow on large grids.  This reader looks at
+the first character of each cell to decide what it is, then uses a single
+anchored regular expression to consume it.
+
+The reader only accepts the canonical forms of each Zinc type.  Anything it
+does not recognise raises `ZincReaderError`, and `zincparser.parse_grid`
+then retries the grid with the pyparsing grammar, which remains the
+reference implementation.
+
+In lazy mode, strings, URIs, Refs, numbers and date/time values in rows are
+only checked against their regular expression; the row (a `LazyRow`) keeps
+their offset and decodes them when they are first read.  The same scanning
+is used to step over the cells of columns that were not asked for.
+"""
+
+import re
+
+import six
+
+from .datatypes import Quantity, Coordinate, Uri, Bin, MARKER, NA, REMOVE, \
+    Ref, XStr
+from .datetimeparser import DateTimeParser
+from .grid import Grid
+from .lazyrow import LazyRow, Pending
+from .sortabledict import SortableDict
+from .version import Version, VER_3_0
+
+# Rows read before they are added to a grid that is not a Grid.
+BATCH_ROWS = 1024
+
+# Token regular expressions.  These mirror the pyparsing grammar in
+# zincparser; see that module for the references to the Zinc specification.
+ID_RE = re.compile(r'[a-z][a-zA-Z0-9_]*')
+STR_RE = re.compile(r'"([^\x00-\x1f\\"]*'
+                    r'(?:\\(?:[bfnrt\\"$]|[uU][0-9a-fA-F]{4})'
+                    r'[^\x00-\x1f\\"]*)*)"')
+URI_RE = re.compile(r'`([^\x00-\x1f\\`]*'
+                    r'(?:\\(?:[bfnrt\\:/?#\[\]@&=;`]|[uU][0-9a-fA-F]{4})'
+                    r'[^\x00-\x1f\\`]*)*)`')
+REF_RE = re.compile(r'@([a-zA-Z0-9_:\-.~]*)')
+NUMBER_RE = re.compile(r'-?[0-9_]+(?:\.[0-9_]+)?(?:[eE][+\-]?[0-9_]+)?')
+UNIT_RE = re.compile(u'[a-zA-Z%_/$\u0080-\ufffe]+')
+DATE_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+TIME_RE = re.compile(r'[0-9]{2}:[0-9]{2}:[0-9]{2}(?:\.[0-9]+)?')
+DATETIME_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}[Tt]'
+                         r'[0-9]{2}:[0-9]{2}:[0-9]{2}(?:\.[0-9]+)?'
+                         r'(?:[zZ]|[+\-][0-9]{2}:[0-9]{2})?')
+TZ_NAME_RE = re.compile(r' ([A-Z][a-zA-Z0-9_\-]*)')
+TZ_UTC_OFFSET_RE = re.compile(r' ((?:UTC|GMT)(?:0|[+\-][0-9]+)?)')
+COORD_RE = re.compile(r'C\((-?[0-9_]*(?:\.[0-9_]+)?) *, *'
+                      r'(-?[0-9_]*(?:\.[0-9_]+)?)\)')
+BIN_RE = re.compile(r'Bin\(([\x20-\x27\x2a-\x7f]*)\)')
+XSTR_RE = re.compile(r'([a-zA-Z0-9_]+)\(')
+
+# Separators
+SPACES_RE = re.compile(r' *')
+CELL_SEP_RE = re.compile(r' *(?:(,) *|(\r?\n))')
+EOL_RE = re.compile(r' *\r?\n')
+META_SEP_RE = re.compile(r' *: *')
+TAG_SEP_RE = re.compile(r': *')
+INNER_END_RE = re.compile(r' *>>')
+
+# String escapes
+ESC_RE = re.compile(r'\\([uU][0-9a-fA-F]{4}|.)')
+ESC_CHARS = {
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+
+# Singleton literals, longest first so that 'NaN' wins over 'NA' and 'N'.
+LITERALS = {
+    'T': [('T', True)],
+    'F': [('F', False)],
+    'M': [('M', MARKER)],
+    'R': [('R', REMOVE)],
+    'N': [('NaN', float('nan')), ('NA', NA), ('N', None)],
+    'I': [('INF', float('inf'))],
+}
+
+
+class ZincReaderError(ValueError):
+    """
+    Exception raised when the reader meets input it does not accept.  `pos`
+    is the offset into the text at which the problem was found.
+    """
+
+    def __init__(self, message, pos):
+        self.pos = pos
+        super(ZincReaderError, self).__init__(message)
+
+
+def _unescape_match(match):
+    esc = match.group(1)
+    if len(esc) > 1:
+        return six.unichr(int(esc[1:], base=16))
+    return ESC_CHARS.get(esc, esc)
+
+
+def _unescape_uri_match(match):
+    esc = match.group(1)
+    if esc == '#':
+        # \# is passed through with backslash.
+        return '\\#'
+    return _unescape_match(match)
+
+
+def unescape(s, uri=False):
+    """
+    Decode the escape sequences in a string or URI body.  The body is
+    assumed to have been validated by STR_RE or URI_RE.
+    """
+    if '\\' not in s:
+        return s
+    return ESC_RE.sub(_unescape_uri_match if uri else _unescape_match, s)
+
+
+class ZincReader(object):
+    """
+    Reader for a single Zinc grid held in a string.  `version` is the
+    Project Haystack version whose grammar is used; when not given, it is
+    taken from the grid's `ver` marker.  When `lazy` is set, rows are
+    returned as `LazyRow` objects that decode their cells from the text on
+    demand.  If `columns` is given, only those columns are kept; the cells
+    of the others are scanned but never decoded.
+
+    `row_filter` is a function taking the grid and a row, as returned by
+    `grid_filter.filter_function`; rows for which it is false are dropped.
+    `filter_columns` names the tags it reads, which are decoded even when
+    not in `columns`.  Reading stops once `limit` rows have been kept.
+
+    When `compact` is set (and `lazy` is not), rows of the outermost grid
+    are CompactRows sharing the grid's row schema rather than `dict`s.
+
+    The outermost grid is made with `grid_class`, Grid by default.  Rows
+    are added to other classes, such as ColumnarGrid, in batches of
+    `BATCH_ROWS` as they are read rather than once all are read.
+
+    `row_error`, if given, is called as `row_error(start, end, exc)` for
+    each row that cannot be read, where the failing row is taken to be
+    `text[start:end]` and `exc` is the exception raised.  It returns the
+    row's cells, or None to leave the row out, and reading carries on from
+    `end`.  Otherwise, the exception propagates.
+
+    These only apply to the outermost grid.
+    """
+
+    def __init__(self, text, version=None, lazy=False, columns=None,
+                 row_filter=None, filter_columns=None, limit=None,
+                 row_error=None, grid_class=Grid, compact=False):
+        self._text = text
+        self._grid_class = grid_class
+        self._compact = compact
+        self._columns = columns
+        self._row_filter = row_filter
+        self._filter_columns = filter_columns or []
+        self._limit = limit
+        self._row_error = row_error
+        self._stopped = False
+        self._datetimes = DateTimeParser()
+        self._version = None
+        self._v3 = False
+        if version is not None:
+            self.set_version(version)
+
+        self._dispatch = {
+            '"': self._read_str,
+            '`': self._read_uri,
+            '@': self._read_ref,
+            '-': self._read_number,
+            '[': self._read_list,
+            '{': self._read_dict,
+            '<': self._read_inner_grid,
+        }
+        for c in '0123456789':
+            self._dispatch[c] = self._read_digits
+        for c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz':
+            self._dispatch[c] = self._read_word
+
+        # Row cells may be skipped over rather than decoded.
+        self._skip_dispatch = dict(self._dispatch)
+        self._skip_dispatch.update({
+            '"': self._skip_str,
+            '`': self._skip_uri,
+            '@': self._skip_ref,
+            '-': self._skip_number,
+        })
+        for c in '0123456789':
+            self._skip_dispatch[c] = self._skip_digits
+
+        self._lazy = lazy
+        if lazy:
+            self._row_dispatch = self._skip_dispatch
+        else:
+            self._row_dispatch = self._dispatch
+
+    @property
+    def version(self):
+        return self._version
+
+    def set_text(self, text):
+        """
+        Point the reader at new text, keeping the selected grammar.
+        """
+        self._text = text
+
+    def set_version(self, version):
+        """
+        Select the grammar for the given Project Haystack version.
+        """
+        if not isinstance(version, Version):
+            version = Version(version)
+        self._version = version
+        self._v3 = Version.nearest(version) >= VER_3_0
+
+    def error(self, message, pos):
+        """
+        Raise a ZincReaderError describing the text at pos.
+        """
+        raise ZincReaderError('%s at %r' % (
+            message, self._text[pos:pos + 20]), pos)
+
+    # Grid structure
+
+    def read_grid(self):
+        """
+        Read the entire text as a single grid.
+        """
+        (grid, pos) = self._read_grid(0, inner=False)
+        if (pos != len(self._text)) and not self._stopped:
+            self.error('Expected end of grid', pos)
+        return grid
+
+    def read_header(self, pos=0):
+        """
+        Read the version line and column definitions starting at pos.
+        Returns (version, grid metadata, column definitions, pos) where
+        version is the raw version string.
+        """
+        text = self._text
+        if not text.startswith('ver:', pos):
+            self.error('Expected version marker', pos)
+
+        (ver_str, pos) = self._read_str(pos + 4)
+        if self._version is None:
+            self.set_version(ver_str)
+
+        grid_meta = SortableDict()
+        if text.startswith(' ', pos) and ID_RE.match(text, pos + 1):
+            (items, pos) = self._read_meta(pos + 1)
+            grid_meta.update(items)
+        pos = self._read_eol(pos)
+
+        columns = SortableDict()
+        while True:
+            match = ID_RE.match(text, pos)
+            if match is None:
+                self.error('Expected column name', pos)
+            pos = match.end()
+
+            col_meta = {}
+            if text.startswith(' ', pos) and ID_RE.match(text, pos + 1):
+                (col_meta, pos) = self._read_meta(pos + 1)
+                col_meta = SortableDict(col_meta)
+            columns[match.group(0)] = col_meta
+
+            match = CELL_SEP_RE.match(text, pos)
+            if match is None:
+                self.error('Expected column separator', pos)
+            pos = match.end()
+            if match.group(2) is not None:
+                break
+
+        return (ver_str, grid_meta, columns, pos)
+
+    def read_row(self, pos, col_dispatch=None):
+        """
+        Read a single row starting at pos.  Returns the list of cell values
+        and the position of the next row.  In lazy mode, some cells are
+        `Pending` placeholders.  `col_dispatch` optionally gives the dispatch
+        table for each column (see `column_dispatch`); cells beyond it are
+        skipped.
+        """
+        text = self._text
+        dispatch = self._row_dispatch
+        cells = []
+        while True:
+            c = text[pos:pos + 1]
+            if col_dispatch is not None:
+                idx = len(cells)
+                dispatch = col_dispatch[idx] if idx < len(col_dispatch) \
+                        else self._skip_dispatch
+
+            if c in (' ', ',', '\r', '\n', ''):
+                # Empty cell
+                cells.append(None)
+            else:
+                try:
+                    read_fn = dispatch[c]
+                except KeyError:
+                    self.error('Unrecognised value', pos)
+                try:
+                    (value, pos) = read_fn(pos)
+                except ZincReaderError:
+                    raise
+                except ValueError as ex:
+                    # Well-formed, but not a valid value (a date of
+                    # 2019-02-30 for instance); report where it is.
+                    self.error(six.text_type(ex), pos)
+                cells.append(value)
+
+            match = CELL_SEP_RE.match(text, pos)
+            if match is None:
+                self.error('Expected cell separator', pos)
+            pos = match.end()
+            if match.group(2) is not None:
+                return (cells, pos)
+
+    def column_dispatch(self, col_names, keep):
+        """
+        Return the per-column dispatch tables for read_row that decode only
+        the columns named in keep, and the (index, name) pairs of those
+        columns in the order given by keep.
+        """
+        index = dict((name, idx) for (idx, name) in enumerate(col_names))
+        kept = [(index[name], name) for name in keep if name in index]
+        kept_idx = set(idx for (idx, name) in kept)
+        col_dispatch = [
+            self._row_dispatch if (idx in kept_idx) else self._skip_dispatch
+            for idx in range(len(col_names))
+        ]
+        return (col_dispatch, kept)
+
+    def _read_grid(self, pos, inner):
+        (ver_str, grid_meta, columns, pos) = self.read_header(pos)
+        col_names = list(columns.keys())
+
+        row_filter = None
+        limit = None
+        row_error = None
+        if not inner:
+            row_filter = self._row_filter
+            limit = self._limit or None
+            row_error = self._row_error
+
+        col_dispatch = None
+        extra = None
+        if (self._columns is not None) and not inner:
+            keep = list(self._columns)
+            if row_filter is not None:
+                # The filter may need tags that are not returned.
+                extra = [name for name in self._filter_columns
+                         if (name not in keep) and (name in columns)]
+                keep.extend(extra)
+            (col_dispatch, kept) = self.column_dispatch(col_names, keep)
+            columns = SortableDict(
+                [(name, columns[name]) for (idx, name) in kept
+                 if not (extra and name in extra)])
+
+        grid_class = Grid if inner else self._grid_class
+        grid = grid_class(version=ver_str, metadata=grid_meta,
+                          columns=list(columns.items()))
+        batch = None if grid_class is Grid else BATCH_ROWS
+        schema = None
+        if self._compact and not (inner or self._lazy):
+            schema = grid.row_schema
+
+        text = self._text
+        end = len(text)
+        rows = []
+        while pos < end:
+            if inner and INNER_END_RE.match(text, pos):
+                break
+            if (limit is not None) and (len(grid) + len(rows) >= limit):
+                self._stopped = True
+                break
+            if batch and (len(rows) >= batch):
+                grid.extend(rows)
+                rows = []
+
+            if row_error is None:
+                (cells, pos) = self.read_row(pos, col_dispatch)
+            else:
+                start = pos
+                try:
+                    (cells, pos) = self.read_row(pos, col_dispatch)
+                except Exception as ex:
+                    # Carry on from the end of the line the problem is on.
+                    pos = text.find('\n', getattr(ex, 'pos', start))
+                    pos = end if pos < 0 else (pos + 1)
+                    cells = row_error(start, pos, ex)
+                    if cells is None:
+                        continue
+
+            if col_dispatch is not None:
+                # Mirror zip(), which drops the columns of a short row.
+                cells = [(name, cells[idx]) for (idx, name) in kept
+                         if idx < len(cells)]
+            elif schema is not None:
+                # The cells are in the order of the schema's columns.
+                cells = schema.row(cells)
+            else:
+                cells = zip(col_names, cells)
+
+            if self._lazy:
+                row = LazyRow(self._decode, cells)
+            elif schema is None:
+                row = dict(cells)
+            elif col_dispatch is None:
+                row = cells
+            else:
+                row = schema.row_from(cells)
+
+            if row_filter is not None:
+                if not row_filter(grid, row):
+                    continue
+                if extra:
+                    for name in extra:
+                        if schema is None:
+                            dict.pop(row, name, None)
+                        else:
+                            row.pop(name, None)
+            rows.append(row)
+
+        grid.extend(rows)
+        return (grid, pos)
+
+    def _read_meta(self, pos):
+        """
+        Read space-separated metadata items; returns a list of (name, value)
+        pairs.
+        """
+        text = self._text
+        items = []
+        while True:
+            match = ID_RE.match(text, pos)
+            if match is None:
+                self.error('Expected metadata name', pos)
+            name = match.group(0)
+            pos = match.end()
+
+            match = META_SEP_RE.match(text, pos)
+            if match is not None:
+                (value, pos) = self.read_scalar(match.end())
+            else:
+                value = MARKER
+            items.append((name, value))
+
+            if text.startswith(' ', pos) and ID_RE.match(text, pos + 1):
+                pos += 1
+            else:
+                return (items, pos)
+
+    def _read_eol(self, pos):
+        match = EOL_RE.match(self._text, pos)
+        if match is None:
+            self.error('Expected end of line', pos)
+        return match.end()
+
+    # Scalars
+
+    def read_scalar(self, pos):
+        """
+        Read a single scalar value at pos.  Returns the value and the
+        position immediately after it.
+        """
+        try:
+            read_fn = self._dispatch[self._text[pos]]
+        except (KeyError, IndexError):
+            self.error('Unrecognised value', pos)
+        return read_fn(pos)
+
+    def _decode(self, pos):
+        """
+        Decode a cell left pending by a lazy row.
+        """
+        return self.read_scalar(pos)[0]
+
+    def _match_str(self, pos):
+        match = STR_RE.match(self._text, pos)
+        if match is None:
+            self.error('Malformed string', pos)
+        return match
+
+    def _read_str(self, pos):
+        match = self._match_str(pos)
+        return (unescape(match.group(1)), match.end())
+
+    def _skip_str(self, pos):
+        return (Pending(pos), self._match_str(pos).end())
+
+    def _match_uri(self, pos):
+        match = URI_RE.match(self._text, pos)
+        if match is None:
+            self.error('Malformed URI', pos)
+        return match
+
+    def _read_uri(self, pos):
+        match = self._match_uri(pos)
+        return (Uri(unescape(match.group(1), uri=True)), match.end())
+
+    def _skip_uri(self, pos):
+        return (Pending(pos), self._match_uri(pos).end())
+
+    def _read_ref(self, pos):
+        text = self._text
+        match = REF_RE.match(text, pos)
+        name = match.group(1)
+        pos = match.end()
+        if text.startswith(' "', pos):
+            (value, pos) = self._read_str(pos + 1)
+            return (Ref(name, value), pos)
+        return (Ref(name, None), pos)
+
+    def _skip_ref(self, pos):
+        end = REF_RE.match(self._text, pos).end()
+        if self._text.startswith(' "', end):
+            end = self._match_str(end + 1).end()
+        return (Pending(pos), end)
+
+    def _scan_number(self, pos):
+        """
+        Match a number and its optional unit.  Returns (number, unit, pos)
+        where number is None for -INF and unit is None if not given.
+        """
+        text = self._text
+        if text.startswith('-INF', pos):
+            return (None, None, pos + 4)
+
+        match = NUMBER_RE.match(text, pos)
+        if match is None:
+            self.error('Malformed number', pos)
+        number = match.group(0)
+        pos = match.end()
+
+        match = UNIT_RE.match(text, pos)
+        if match is not None:
+            return (number, match.group(0), match.end())
+        return (number, None, pos)
+
+    def _read_number(self, pos):
+        (number, unit, pos) = self._scan_number(pos)
+        if number is None:
+            return (-float('INF'), pos)
+
+        value = float(number.replace('_', ''))
+        if unit is not None:
+            return (Quantity(value, unit=unit), pos)
+        return (value, pos)
+
+    def _skip_number(self, pos):
+        return (Pending(pos), self._scan_number(pos)[2])
+
+    def _scan_temporal(self, pos):
+        """
+        Match a date, time or date/time.  Returns (parse_fn, args, pos), or
+        (None, None, pos) if the text is not one of these.
+        """
+        text = self._text
+        match = DATETIME_RE.match(text, pos)
+        if match is not None:
+            iso_str = match.group(0)
+            pos = match.end()
+            tzname = None
+            if text.startswith(' ', pos):
+                name = TZ_NAME_RE.match(text, pos)
+                offset = TZ_UTC_OFFSET_RE.match(text, pos)
+                if (offset is not None) and \
+                        ((name is None) or (offset.end() > name.end())):
+                    name = offset
+                if name is not None:
+                    tzname = name.group(1)
+                    pos = name.end()
+            return (self._datetimes.datetime, (iso_str, tzname), pos)
+
+        match = DATE_RE.match(text, pos)
+        if match is not None:
+            return (self._datetimes.date, (match.group(0),), match.end())
+
+        match = TIME_RE.match(text, pos)
+        if match is not None:
+            return (self._datetimes.time, (match.group(0),), match.end())
+
+        return (None, None, pos)
+
+    def _read_digits(self, pos):
+        (parse_fn, args, end) = self._scan_temporal(pos)
+        if parse_fn is None:
+            return self._read_number(pos)
+        return (parse_fn(*args), end)
+
+    def _skip_digits(self, pos):
+        (parse_fn, args, end) = self._scan_temporal(pos)
+        if parse_fn is None:
+            return self._skip_number(pos)
+        return (Pending(pos), end)
+
+    def _read_word(self, pos):
+        text = self._text
+        if self._v3:
+            match = XSTR_RE.match(text, pos)
+            if (match is not None) and text.startswith('"', match.end()):
+                encoding = match.group(1)
+                (data, pos) = self._read_str(match.end())
+                if not text.startswith(')', pos):
+                    self.error('Malformed XStr', pos)
+                return (XStr(encoding, data), pos + 1)
+
+        c = text[pos]
+        if c == 'C':
+            match = COORD_RE.match(text, pos)
+            if match is not None:
+                (lat, lng) = match.groups()
+                return (Coordinate(float(lat.replace('_', '') or '0'),
+                                   float(lng.replace('_', '') or '0')),
+                        match.end())
+        elif (c == 'B') and not self._v3:
+            match = BIN_RE.match(text, pos)
+            if match is not None:
+                return (Bin(match.group(1)), match.end())
+
+        for (literal, value) in LITERALS.get(c, []):
+            if text.startswith(literal, pos):
+                if (value is NA) and not self._v3:
+                    continue
+                return (value, pos + len(literal))
+
+        self.error('Unrecognised value', pos)
+
+    def _read_list(self, pos):
+        if not self._v3:
+            self.error('Lists require Haystack 3.0', pos)
+
+        text = self._text
+        pos = SPACES_RE.match(text, pos + 1).end()
+        values = []
+        if text.startswith(',', pos):
+            # An empty list with a trailing separator.
+            pos = SPACES_RE.match(text, pos + 1).end()
+            if not text.startswith(']', pos):
+                self.error('Expected end of list', pos)
+        while not text.startswith(']', pos):
+            (value, pos) = self.read_scalar(pos)
+            values.append(value)
+            pos = SPACES_RE.match(text, pos).end()
+            if text.startswith(',', pos):
+                pos = SPACES_RE.match(text, pos + 1).end()
+            elif not text.startswith(']', pos):
+                self.error('Expected list separator', pos)
+        return (values, pos + 1)
+
+    def _read_dict(self, pos):
+        if not self._v3:
+            self.error('Dicts require Haystack 3.0', pos)
+
+        text = self._text
+        values = {}
+        pos += 1
+        while True:
+            pos = SPACES_RE.match(text, pos).end()
+            if text.startswith('}', pos):
+                return (values, pos + 1)
+
+            match = ID_RE.match(text, pos)
+            if match is None:
+                self.error('Expected tag name', pos)
+            name = match.group(0)
+            pos = match.end()
+
+            match = TAG_SEP_RE.match(text, pos)
+            if match is not None:
+                (values[name], pos) = self.read_scalar(match.end())
+            else:
+                values[name] = MARKER
+
+            if not text.startswith((' ', '}'), pos):
+                self.error('Expected tag separator', pos)
+
+    def _read_inner_grid(self, pos):
+        if (not self._v3) or (not self._text.startswith('<<', pos)):
+            self.error('Unrecognised value', pos)
+
+        pos = SPACES_RE.match(self._text, pos + 2).end()
+        (grid, pos) = self._read_grid(pos, inner=True)
+        match = INNER_END_RE.match(self._text, pos)
+        if match is None:
+            self.error('Expected end of grid', pos)
+        return (grid, match.end())
+
+
+def read_grid(grid_str, **kwargs):
+    """
+    Read a single Zinc grid using the hand-written reader.  The keyword
+    arguments (`lazy`, `columns`, `row_filter`, `row_error`...) are those of
+    ZincReader.
+    """
+    return ZincReader(grid_str, **kwargs).read_grid()
+
+
+def read_scalar(scalar_str, version):
+    """
+    Read a single Zinc scalar using the hand-written reader.
+    """
+    reader = ZincReader(scalar_str, version=version)
+    (value, pos) = reader.read_scalar(0)
+    if pos != len(scalar_str):
+        reader.error('Expected end of value', pos)
+    return value
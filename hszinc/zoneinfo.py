@@ -402,6 +402,12 @@ HAYSTACK_TIMEZONES_SET=set(HAYSTACK_TIMEZONES)
 # Mapping of pytz-recognised timezones to Haystack timezones.
 _TZ_MAP = None
 _TZ_RMAP = None
+_OFFSET_INDEX = None
+
+# Timezone names found for tzinfo objects outside the timezone map, by
+# (tzinfo, UTC offset).
+_TZ_NAME_CACHE = {}
+_TZ_NAME_CACHE_SIZE = 1024
 
 def _map_timezones():
     """
@@ -470,37 +476,77 @@ def timezone(haystack_tz, version=LATEST_VER):
                 % haystack_tz)
     return pytz.timezone(tz_name)
 
+def _offset_index():
+    """
+    Return a dict of the Haystack timezones that ever use each UTC offset,
+    as lists of (Haystack name, tzinfo, fixed), generating it if needed.
+    Zones that have always used the offset come first.
+    """
+    global _OFFSET_INDEX
+    if _OFFSET_INDEX is None:
+        index = {}
+        for olson_name, haystack_name in list(get_tz_rmap().items()):
+            tz = pytz.timezone(olson_name)
+            if isinstance(tz, pytz.tzinfo.StaticTzInfo):
+                offsets = set([tz._utcoffset])
+            else:
+                offsets = set(info[0] for info in tz._transition_info)
+            fixed = (len(offsets) == 1)
+            for offset in offsets:
+                index.setdefault(offset, []).append(
+                        (haystack_name, tz, fixed))
+        for candidates in index.values():
+            candidates.sort(key=lambda candidate: not candidate[2])
+        _OFFSET_INDEX = index
+    return _OFFSET_INDEX
+
+def _resolve_timezone(dt, offset):
+    """
+    Find a Haystack timezone in which dt has the given UTC offset.  Returns
+    the name, and whether the zone always uses that offset.
+    """
+    for (haystack_name, tz, fixed) in _offset_index().get(offset, []):
+        if fixed or (dt.astimezone(tz).utcoffset() == offset):
+            return (haystack_name, fixed)
+    raise ValueError('Unable to get timezone of %r' % dt)
+
 def timezone_name(dt, version=LATEST_VER):
     """
     Determine an appropriate timezone for the given date/time object
     """
-    tz_rmap = get_tz_rmap(version=version)
-    if dt.tzinfo is None:
+    tzinfo = dt.tzinfo
+    if tzinfo is None:
         raise ValueError('%r has no timezone' % dt)
 
-    # Easy case: pytz timezone.
-    try:
-        tz_name = dt.tzinfo.zone
-        return tz_rmap[tz_name]
-    except KeyError:
-        # Not in timezone map
-        pass
-    except AttributeError:
-        # Not a pytz-compatible tzinfo
-        pass
-
-    # Hard case, try to find one that's equivalent.  Hopefully we don't get
-    # many of these.  Start by getting the current timezone offset, and a
-    # timezone-naïve copy of the timestamp.
-    offset  = dt.utcoffset()
-    dt_notz = dt.replace(tzinfo=None)
+    # Easy case: pytz or zoneinfo timezone.
+    tz_name = getattr(tzinfo, 'zone', None) or getattr(tzinfo, 'key', None)
+    if tz_name is not None:
+        try:
+            return get_tz_rmap(version=version)[tz_name]
+        except KeyError:
+            # Not in timezone map
+            pass
 
+    # Hard case, find one that's equivalent.  Fixed offsets
+    # (datetime.timezone and the like) map to zones such as GMT-10.
+    offset = dt.utcoffset()
     if offset == datetime.timedelta(0):
         # UTC?
         return 'UTC'
 
-    for olson_name, haystack_name in list(tz_rmap.items()):
-        if pytz.timezone(olson_name).utcoffset(dt_notz) == offset:
-            return haystack_name
+    try:
+        key = (tzinfo, offset)
+        return _TZ_NAME_CACHE[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # Not hashable, so cannot be cached.
+        return _resolve_timezone(dt, offset)[0]
 
-    raise ValueError('Unable to get timezone of %r' % dt)
+    (haystack_name, fixed) = _resolve_timezone(dt, offset)
+    if fixed:
+        # Right whatever the date, so worth remembering.
+        if len(_TZ_NAME_CACHE) >= _TZ_NAME_CACHE_SIZE:
+            _TZ_NAME_CACHE.clear()
+        _TZ_NAME_CACHE[key] = haystack_name
+    return haystack_name
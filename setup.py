@@ -11,6 +11,7 @@ requirements = [
 ]
 if sys.version_info.major == 2:
     requirements.append("backports.functools_lru_cache")
+    requirements.append("futures")
 
 setup(name='hszinc',
         url='https://github.com/vrtsystems/hszinc',
@@ -42,6 +43,10 @@ setup(name='hszinc',
         extras_require={
             'unitconversion': [
                 'pint'
+            ],
+            'dataframe': [
+                'numpy',
+                'pandas'
             ]
         },
         requires=requirements,
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Helpers shared between the grid tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import gc
+import tracemalloc
+
+from hszinc import Grid, Ref, VER_3_0
+
+
+def make_point_grid(rows, cls=Grid, columns=None):
+    """
+    Return a grid of class cls holding copies of the rows, with a column for
+    each tag in the order first seen.  columns gives the metadata of any
+    column that has some.
+    """
+    columns = columns or {}
+    grid = cls(version=VER_3_0, metadata={'dis': 'Points'})
+    for row in rows:
+        for name in row:
+            if name not in grid.column:
+                grid.column[name] = dict(columns.get(name, {}))
+    grid.extend([dict(row) for row in rows])
+    return grid
+
+
+def check_memory_saving(build, baseline, factor):
+    """
+    Check that what build() returns takes less than 1/factor of the memory
+    of what baseline() returns.
+    """
+    sizes = []
+    tracemalloc.start()
+    try:
+        for make in (baseline, build):
+            before = tracemalloc.get_traced_memory()[0]
+            result = make()
+            # Grids hold reference cycles; let go of any built along the way.
+            gc.collect()
+            sizes.append(tracemalloc.get_traced_memory()[0] - before)
+            del result
+    finally:
+        tracemalloc.stop()
+    (baseline_size, size) = sizes
+    assert size * factor < baseline_size
+
+
+def make_site_grid(cls=Grid):
+    grid = cls(columns={'id': {}, 'siteRef': {}, 'kind': {}, 'val': {}})
+    grid.extend([
+        {'id': Ref('p%d' % i), 'siteRef': Ref('s%d' % (i % 3)),
+         'kind': 'Number' if i % 2 else 'Bool', 'val': float(i)}
+        for i in range(12)])
+    return grid
+
+
+def scan(grid, tag, value):
+    return [row for row in grid if (tag in row) and (row[tag] == value)]
+
+
+def check_lookups(grid, tag, values):
+    for value in values:
+        assert grid.lookup(tag, value) == scan(grid, tag, value)
+
+
+def check_tag_index(cls):
+    grid = make_site_grid(cls)
+    sites = [Ref('s%d' % i) for i in range(4)]
+    assert grid.lookup('siteRef', Ref('s1')) == scan(grid, 'siteRef',
+                                                     Ref('s1'))
+    grid.create_index('siteRef')
+    grid.create_index('kind')
+    check_lookups(grid, 'siteRef', sites)
+    assert len(grid.lookup('siteRef', Ref('s1'))) == 4
+
+    grid.append({'id': Ref('p12'), 'siteRef': Ref('s3')})
+    grid.extend([{'id': Ref('p13'), 'siteRef': Ref('s1')}, {'id': Ref('x')}])
+    check_lookups(grid, 'siteRef', sites)
+    grid[2] = {'id': Ref('p2'), 'siteRef': Ref('s3'), 'kind': 'Str'}
+    grid[-1] = {'id': Ref('p14'), 'siteRef': Ref('s0')}
+    check_lookups(grid, 'siteRef', sites)
+    check_lookups(grid, 'kind', ['Number', 'Bool', 'Str'])
+    del grid[-1]
+    grid.pop()
+    check_lookups(grid, 'siteRef', sites)
+    grid.insert(0, {'id': Ref('first'), 'siteRef': Ref('s2')})
+    del grid[5]
+    grid.insert(-2, {'id': Ref('middle'), 'siteRef': Ref('s1')})
+    check_lookups(grid, 'siteRef', sites)
+    check_lookups(grid, 'kind', ['Number', 'Bool', 'Str'])
+    del grid[1:4]
+    check_lookups(grid, 'siteRef', sites)
+    assert grid.lookup('kind', 'Nothing') == []
+
+    grid.drop_index('siteRef')
+    check_lookups(grid, 'siteRef', sites)
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+# Columnar grid tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+
+import hszinc
+from hszinc import ColumnarGrid, Grid, Quantity, Ref, Uri, MARKER
+from hszinc.columnar import NO_TIMESTAMP
+from hszinc.zoneinfo import timezone
+from .helpers import check_memory_saving, check_tag_index, \
+    make_point_grid
+
+BRISBANE = timezone('Brisbane')
+SYDNEY = timezone('Sydney')
+
+POINTS = [
+    {'id': Ref('p1', 'Point 1'), 'dis': 'Point 1',
+     'val': Quantity(12.5, 'kW'),
+     'ts': BRISBANE.localize(datetime.datetime(2019, 1, 2, 3, 4, 5)),
+     'site': MARKER},
+    {'id': Ref('p2'), 'dis': 'Point 2', 'val': None,
+     'ts': SYDNEY.localize(datetime.datetime(2019, 7, 1, 0, 0, 0, 123456))},
+    {'id': Ref('p3'), 'val': 7, 'ts': None, 'site': MARKER},
+    {'id': Ref('p4'), 'dis': 'Point 1', 'val': -1.5,
+     'ts': SYDNEY.localize(datetime.datetime(2019, 1, 1))},
+]
+POINT_COLUMNS = {'val': {'unit': 'kW'}}
+
+
+def check_rows(expected, actual):
+    assert len(actual) == len(expected)
+    for (e_row, a_row) in zip(expected, actual):
+        assert a_row == e_row
+        assert list(a_row.keys()) == list(e_row.keys())
+        for (e_value, a_value) in zip(e_row.values(), a_row.values()):
+            assert type(a_value) is type(e_value)
+            if isinstance(e_value, datetime.datetime) and e_value.tzinfo:
+                assert a_value.tzinfo.zone == e_value.tzinfo.zone
+                assert a_value.utcoffset() == e_value.utcoffset()
+
+
+def test_same_rows():
+    grid = make_point_grid(POINTS, columns=POINT_COLUMNS)
+    columnar = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    check_rows(grid, columnar)
+    assert columnar == grid
+    assert grid == columnar
+    assert columnar[-1] == grid[-1]
+    assert 'site' not in columnar[1]
+    assert columnar[1]['val'] is None
+
+
+def test_from_grid():
+    grid = make_point_grid(POINTS, columns=POINT_COLUMNS)
+    columnar = ColumnarGrid.from_grid(grid)
+    check_rows(grid, columnar)
+    assert columnar.metadata['dis'] == 'Points'
+    assert list(columnar.column.keys()) == list(grid.column.keys())
+    assert columnar.version == grid.version
+
+
+def test_rows_are_snapshots():
+    grid = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    row = grid[0]
+    row['dis'] = 'Changed'
+    assert grid[0]['dis'] == 'Point 1'
+    grid[0] = row
+    assert grid[0]['dis'] == 'Changed'
+
+
+def test_index_errors():
+    grid = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    with pytest.raises(IndexError):
+        grid[4]
+    with pytest.raises(IndexError):
+        grid[-5]
+    with pytest.raises(TypeError):
+        grid.append(['not', 'a', 'dict'])
+    assert len(ColumnarGrid()) == 0
+    with pytest.raises(IndexError):
+        ColumnarGrid()[0]
+
+
+def test_insert_delete():
+    grid = make_point_grid(POINTS, columns=POINT_COLUMNS)
+    columnar = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    for g in (grid, columnar):
+        g.insert(1, {'id': Ref('p0'), 'other': 'New column'})
+        g.insert(-1, {'dis': 'Before last'})
+        g.insert(100, {'dis': 'Last'})
+        del g[0]
+        del g[1::2]
+    check_rows(grid, columnar)
+    assert columnar.pop() == grid[-1]
+    assert len(columnar) == len(grid) - 1
+
+
+def test_type_changes():
+    grid = Grid()
+    columnar = ColumnarGrid()
+    rows = [
+        {'a': None, 'b': 1.5, 'c': 'x', 'd': Ref('r')},
+        {'a': 2.5, 'b': 'text', 'c': True, 'd': Ref('r')},
+        {'a': 1, 'b': 1, 'c': 1, 'd': Uri('http://example.com/')},
+        {'a': 2 ** 60, 'b': 1.0, 'c': 1.0, 'd': Ref('r', 'Ref R')},
+        {'a': datetime.datetime(2019, 1, 1), 'e': Quantity(1, 'kW')},
+    ]
+    for g in (grid, columnar):
+        g.extend(rows)
+        g[1] = {'a': float('nan'), 'c': {'x': 1}}
+    # Compare cell by cell; NaN is not equal to itself.
+    check_rows(grid[2:], columnar[2:])
+    assert columnar[0] == grid[0]
+    assert list(columnar[1].keys()) == ['a', 'c']
+    assert columnar[1]['a'] != columnar[1]['a']
+    assert columnar[1]['c'] == {'x': 1}
+
+
+def test_index():
+    grid = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    assert grid['@p2'] == grid[1]
+    assert grid.get(Ref('p3'))['val'] == 7
+    assert grid.get('@p9') is None
+    grid.append({'id': Ref('p5'), 'dis': 'Point 5'})
+    assert grid['@p5']['dis'] == 'Point 5'
+    del grid[0]
+    assert grid['@p2'] == grid[0]
+    with pytest.raises(KeyError):
+        grid['@p1 \'Point 1\'']
+
+
+def test_slice():
+    grid = make_point_grid(POINTS, columns=POINT_COLUMNS)
+    columnar = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    part = columnar[1:3]
+    assert isinstance(part, ColumnarGrid)
+    check_rows(grid[1:3], part)
+    check_rows(grid[::-2], columnar[::-2])
+    # The slice is independent of the grid it was taken from.
+    part.append({'val': Quantity(1.0, 'W')})
+    assert len(columnar) == 4
+    assert part[-1]['val'] == Quantity(1.0, 'W')
+
+
+def test_filter():
+    columnar = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    result = columnar.filter('site and val > 5')
+    assert [row['id'] for row in result] == [Ref('p1', 'Point 1'), Ref('p3')]
+
+
+def test_dump():
+    grid = make_point_grid(POINTS, columns=POINT_COLUMNS)
+    columnar = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    for mode in (hszinc.MODE_ZINC, hszinc.MODE_JSON):
+        assert hszinc.dump(columnar, mode=mode) == hszinc.dump(grid, mode=mode)
+
+
+def test_column_array():
+    grid = make_point_grid(POINTS, ColumnarGrid, POINT_COLUMNS)
+    values = grid.column_array('val')
+    assert values.typecode == 'd'
+    assert list(values)[0] == 12.5
+    assert values[1] != values[1]
+    stamps = grid.column_array('ts')
+    assert stamps[0] == 1546362245000000
+    assert stamps[2] == NO_TIMESTAMP
+    with pytest.raises(TypeError):
+        grid.column_array('dis')
+    with pytest.raises(KeyError):
+        grid.column_array('nosuchcolumn')
+
+
+def test_memory():
+    start = datetime.datetime(2019, 1, 1, tzinfo=BRISBANE)
+    rows = [{'ts': start + datetime.timedelta(minutes=5 * i),
+             'val': Quantity(float(i), 'kW'), 'point': Ref('p1')}
+            for i in range(10000)]
+
+    def build(cls):
+        grid = cls()
+        grid.extend([dict(row) for row in rows])
+        return grid
+    check_memory_saving(lambda: build(ColumnarGrid), lambda: build(Grid), 5)
+
+
+HIS_ZINC = '''ver:"3.0" id:@p1 hisStart:2019-01-01T00:00:00+10:00 Brisbane
+ts,val unit:"kW",status
+''' + ''.join('2019-01-01T00:%02d:%02d+10:00 Brisbane,%d.5kW,"%s"\n'
+              % (i // 60, i % 60, i, 'fault' if i % 7 == 0 else 'ok')
+              for i in range(1500))
+
+
+@pytest.mark.parametrize('mode', [hszinc.MODE_ZINC, hszinc.MODE_JSON])
+def test_parse_columnar(mode):
+    text = hszinc.dump(hszinc.parse(HIS_ZINC), mode=mode)
+    expected = hszinc.parse(text, mode=mode)
+    grid = hszinc.parse(text, mode=mode, columnar=True)
+    assert isinstance(grid, ColumnarGrid)
+    assert grid == expected
+    check_rows(expected, grid)
+    assert grid.column_array('val')[1499] == 1499.5
+
+
+@pytest.mark.parametrize('mode', [hszinc.MODE_ZINC, hszinc.MODE_JSON])
+def test_parse_columnar_filter(mode):
+    text = hszinc.dump(hszinc.parse(HIS_ZINC), mode=mode)
+    grid = hszinc.parse(text, mode=mode, columnar=True,
+                        filter='status == "fault"', limit=200)
+    assert isinstance(grid, ColumnarGrid)
+    assert len(grid) == 200
+    assert grid[-1]['val'] == Quantity(1393.5, 'kW')
+
+
+def test_tag_index():
+    check_tag_index(ColumnarGrid)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+# Compact row tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import copy
+import pickle
+
+import pytest
+
+import hszinc
+from hszinc import (ColumnarGrid, CompactRow, Grid, Quantity, Ref, MARKER,
+                    VER_3_0)
+from hszinc import compactrow
+from hszinc.compactrow import row_schema
+from hszinc.zincparser import ENGINE_PYPARSING
+from .helpers import check_memory_saving, check_tag_index
+
+SITES_ZINC = '''ver:"3.0"
+id,dis,site,area,siteRef
+@s1,"Site 1",M,1200m²,@s1
+@s2,"Site 2",M,,@s2
+@e1,"Equip 1",,,@s1
+@e2,,,,@s2
+'''
+
+
+def test_mapping():
+    schema = row_schema(['id', 'dis', 'val'])
+    row = schema.row([Ref('p1'), 'Point 1'])
+    assert isinstance(row, CompactRow)
+    assert row.get('dis') == 'Point 1'
+    assert row.get('val', 'x') == 'x'
+    assert 'id' in row
+    assert 'val' not in row
+    assert len(row) == 2
+    assert list(row) == ['id', 'dis']
+    assert row.items() == [('id', Ref('p1')), ('dis', 'Point 1')]
+    assert row == {'id': Ref('p1'), 'dis': 'Point 1'}
+    assert {'id': Ref('p1'), 'dis': 'Point 1'} == row
+    assert dict(row) == {'id': Ref('p1'), 'dis': 'Point 1'}
+    with pytest.raises(KeyError):
+        row['val']
+    with pytest.raises(KeyError):
+        row['other']
+
+    assert schema.row([1, 2, 3]) == {'id': 1, 'dis': 2, 'val': 3}
+    assert schema.row([1, 2, 3, 4]) == {'id': 1, 'dis': 2, 'val': 3}
+    assert row_schema([]).row([]) == {}
+
+
+def test_assign():
+    schema = row_schema(['id', 'dis', 'val'])
+    row = schema.row_from({'id': Ref('p1'), 'dis': 'Point 1'})
+    row['val'] = 12
+    row['dis'] = 'Point One'
+    row['other'] = MARKER
+    assert row == {'id': Ref('p1'), 'dis': 'Point One', 'val': 12,
+                   'other': MARKER}
+    assert list(row) == ['id', 'dis', 'val', 'other']
+
+    del row['dis']
+    del row['other']
+    assert row == {'id': Ref('p1'), 'val': 12}
+    assert row._extra is None
+    for key in ('dis', 'other'):
+        with pytest.raises(KeyError):
+            del row[key]
+
+    assert row.pop('val') == 12
+    assert row.setdefault('dis', 'Point 1') == 'Point 1'
+    row.update(val=3)
+    assert row == {'id': Ref('p1'), 'dis': 'Point 1', 'val': 3}
+
+
+def test_shared_schema():
+    grid = Grid(version=VER_3_0)
+    grid.column['id'] = {}
+    grid.column['dis'] = {}
+    assert grid.row_schema is row_schema(['id', 'dis'])
+    first = grid.compact_row({'id': Ref('a')})
+    second = grid.compact_row([('id', Ref('b')), ('dis', 'B')])
+    assert type(first) is type(second)
+    assert not hasattr(first, '__dict__')
+
+
+def test_copy_pickle():
+    row = row_schema(['id', 'dis']).row_from({'id': Ref('a'), 'more': 1})
+    for other in (row.copy(), copy.copy(row), copy.deepcopy(row),
+                  pickle.loads(pickle.dumps(row))):
+        assert type(other) is type(row)
+        assert other == row
+        assert list(other) == ['id', 'more']
+    other = row.copy()
+    other['dis'] = 'A'
+    assert 'dis' not in row
+
+
+def test_schema_cache(monkeypatch):
+    monkeypatch.setattr(compactrow, '_SCHEMAS', type(compactrow._SCHEMAS)())
+    monkeypatch.setattr(compactrow, '_MAX_SCHEMAS', 2)
+    first = row_schema(['a'])
+    second = row_schema(['b'])
+    assert row_schema(['a']) is first
+    # The least recently used schema makes way for a new one.
+    third = row_schema(['c'])
+    assert list(compactrow._SCHEMAS.values()) == [first, third]
+    assert row_schema(['b']) is not second
+
+    # Rows unpickled past the limit still share their schema.
+    rows = pickle.loads(pickle.dumps([second.row([i]) for i in range(10)]))
+    assert len(set(type(row) for row in rows)) == 1
+    assert rows[0]._schema is row_schema(['b'])
+
+
+def test_grid_compact():
+    grid = hszinc.parse(SITES_ZINC)
+    expected = [dict(row) for row in grid]
+    grid.create_index('siteRef')
+    grid.compact()
+    assert all(type(row) is grid.row_schema.row_class for row in grid)
+    assert list(grid) == expected
+    assert grid['@s2']['dis'] == 'Site 2'
+    assert grid['@s2'] is grid[1]
+    assert grid.lookup('siteRef', Ref('s1')) == [expected[0], expected[2]]
+
+    grid.append(grid.compact_row({'id': Ref('e3'), 'siteRef': Ref('s1')}))
+    grid[0] = grid.compact_row(expected[0])
+    assert grid['@e3']['siteRef'] == Ref('s1')
+    assert len(grid.filter('siteRef == @s1')) == 3
+    with pytest.raises(TypeError):
+        grid.append([('id', Ref('e4'))])
+
+
+def test_tag_index():
+    check_tag_index(CompactGrid)
+
+
+class CompactGrid(Grid):
+    """
+    A grid that stores each row added as a CompactRow.
+    """
+
+    def _compacted(self, row):
+        return self.row_schema.row_from(row)
+
+    def __setitem__(self, index, value):
+        super(CompactGrid, self).__setitem__(index, self._compacted(value))
+
+    def insert(self, index, value):
+        super(CompactGrid, self).insert(index, self._compacted(value))
+
+    def extend(self, values):
+        super(CompactGrid, self).extend(
+            [self._compacted(value) for value in values])
+
+
+@pytest.mark.parametrize('mode', [hszinc.MODE_ZINC, hszinc.MODE_JSON])
+def test_parse_compact(mode):
+    text = hszinc.dump(hszinc.parse(SITES_ZINC), mode=mode)
+    expected = hszinc.parse(text, mode=mode)
+    grid = hszinc.parse(text, mode=mode, compact=True)
+    assert all(isinstance(row, CompactRow) for row in grid)
+    assert grid == expected
+    assert list(grid) == list(expected)
+    assert hszinc.dump(grid, mode=mode) == text
+    assert list(grid.filter('siteRef->site')) == \
+        list(expected.filter('siteRef->site'))
+    assert list(grid.filter('site and dis == "Site 1"')) == [expected[0]]
+
+
+@pytest.mark.parametrize('mode', [hszinc.MODE_ZINC, hszinc.MODE_JSON])
+@pytest.mark.parametrize('filter', ['siteRef', 'siteRef->site', None])
+def test_parse_compact_columns(mode, filter):
+    text = hszinc.dump(hszinc.parse(SITES_ZINC), mode=mode)
+    options = dict(mode=mode, columns=['dis', 'id'], filter=filter)
+    expected = hszinc.parse(text, **options)
+    grid = hszinc.parse(text, compact=True, **options)
+    assert all(isinstance(row, CompactRow) for row in grid)
+    assert list(grid) == list(expected)
+    assert list(grid.column) == ['dis', 'id']
+
+
+def test_parse_compact_engines():
+    grammar = hszinc.zincparser.parse_grid(SITES_ZINC, compact=True,
+                                           engine=ENGINE_PYPARSING)
+    assert all(isinstance(row, CompactRow) for row in grammar)
+    assert grammar == hszinc.parse(SITES_ZINC)
+
+    lazy = hszinc.parse(SITES_ZINC, compact=True, lazy=True)
+    assert not any(isinstance(row, CompactRow) for row in lazy)
+
+    columnar = hszinc.parse(SITES_ZINC, compact=True, columnar=True)
+    assert isinstance(columnar, ColumnarGrid)
+    assert columnar == lazy
+
+
+def test_memory():
+    grid = Grid(version=VER_3_0)
+    for name in ('id', 'dis', 'val', 'siteRef', 'point'):
+        grid.column[name] = {}
+    rows = [{'id': Ref('p%d' % i), 'dis': 'Point', 'val': Quantity(1, 'kW'),
+             'siteRef': Ref('s1'), 'point': MARKER} for i in range(10000)]
+    check_memory_saving(lambda: [grid.compact_row(row) for row in rows],
+                        lambda: [dict(row) for row in rows], 2)
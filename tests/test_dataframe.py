@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# NumPy and pandas conversion tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import datetime
+
+import pytest
+
+import hszinc
+from hszinc import ColumnarGrid, Grid, Quantity, Ref, MARKER, NA, VER_3_0
+from hszinc.zoneinfo import timezone
+from .helpers import make_point_grid
+
+numpy = pytest.importorskip('numpy')
+pandas = pytest.importorskip('pandas')
+
+BRISBANE = timezone('Brisbane')
+SYDNEY = timezone('Sydney')
+
+POINTS = [
+    {'id': Ref('p1'), 'dis': 'Point 1', 'val': Quantity(12.5, 'kW'),
+     'ts': BRISBANE.localize(datetime.datetime(2019, 1, 2, 3, 4, 5)),
+     'site': MARKER, 'ok': True, 'misc': [1, 2]},
+    {'id': Ref('p2'), 'dis': 'Point 2', 'val': None, 'ts': None,
+     'site': NA, 'ok': None, 'misc': 'text'},
+    {'id': Ref('p3'), 'val': Quantity(-1.0, 'kW'),
+     'ts': BRISBANE.localize(datetime.datetime(2019, 1, 3)), 'ok': False},
+]
+POINT_COLUMNS = {'val': {'unit': 'kW'}}
+
+
+@pytest.mark.parametrize('cls', [Grid, ColumnarGrid])
+def test_to_numpy(cls):
+    arrays = make_point_grid(POINTS, cls, POINT_COLUMNS).to_numpy()
+    assert list(arrays.keys()) == ['id', 'dis', 'val', 'ts', 'site', 'ok',
+                                   'misc']
+
+    val = arrays['val']
+    assert val.dtype == numpy.float64
+    assert list(val.mask) == [False, True, False]
+    assert val[0] == 12.5 and val[2] == -1.0
+
+    ts = arrays['ts']
+    assert ts.dtype == numpy.dtype('datetime64[us]')
+    assert list(ts.mask) == [False, True, False]
+    assert ts[0] == numpy.datetime64('2019-01-01T17:04:05', 'us')
+
+    site = arrays['site']
+    assert site.dtype == bool
+    assert list(site.mask) == [False, True, False]
+    assert not site[2]
+
+    assert list(arrays['ok'].mask) == [False, True, False]
+    assert arrays['dis'][2] is numpy.ma.masked
+    assert arrays['id'][2] == Ref('p3')
+    assert arrays['misc'][0] == [1, 2]
+
+
+def test_to_numpy_columns():
+    grid = make_point_grid(POINTS, columns=POINT_COLUMNS)
+    arrays = grid.to_numpy(['val', 'nosuchcolumn', 'id'])
+    assert list(arrays.keys()) == ['val', 'id']
+
+
+def test_mixed_values():
+    grid = Grid()
+    grid.column['a'] = {}
+    grid.column['b'] = {}
+    grid.column['c'] = {}
+    grid.extend([
+        {'a': Quantity(1.0, 'kW'), 'b': 1.0, 'c': 'text'},
+        {'a': Quantity(1.0, 'W'), 'b': 2, 'c': Ref('r')},
+    ])
+    arrays = grid.to_numpy()
+    assert arrays['a'].dtype == object
+    assert arrays['b'].dtype == numpy.float64
+    assert arrays['c'].dtype == object
+    frame = grid.to_dataframe()
+    assert frame['a'].dtype == object
+    assert frame['c'].dtype == object
+    assert frame.attrs['units'] == {}
+
+
+@pytest.mark.parametrize('cls', [Grid, ColumnarGrid])
+def test_to_dataframe(cls):
+    frame = make_point_grid(POINTS, cls, POINT_COLUMNS).to_dataframe()
+    assert frame['val'].dtype == numpy.float64
+    assert str(frame['ts'].dt.tz) == 'Australia/Brisbane'
+    assert frame['ts'][0] == pandas.Timestamp('2019-01-02T03:04:05+10:00')
+    assert frame['ts'].isna().tolist() == [False, True, False]
+    assert isinstance(frame['dis'].dtype, pandas.CategoricalDtype)
+    assert frame['dis'].isna().tolist() == [False, False, True]
+    assert isinstance(frame['id'].dtype, pandas.CategoricalDtype)
+    assert frame['site'].dtype == 'boolean'
+    assert frame['site'].tolist() == [True, pandas.NA, False]
+    assert frame['ok'].tolist() == [True, pandas.NA, False]
+    assert frame.attrs['metadata'] == {'dis': 'Points'}
+    assert frame.attrs['units'] == {'val': 'kW'}
+    assert frame.attrs['markers'] == ['site']
+    assert frame.attrs['columns']['val'] == {'unit': 'kW'}
+
+
+def test_dataframe_units():
+    # Only columns of quantities have a unit, whatever their metadata says.
+    grid = Grid(version=VER_3_0)
+    grid.column['plain'] = {'unit': 'kW'}
+    grid.column['power'] = {'dis': 'Power'}
+    grid.extend([{'plain': 1.5, 'power': Quantity(1.5, 'W')},
+                 {'plain': None, 'power': None}])
+    frame = grid.to_dataframe()
+    assert frame.attrs['units'] == {'power': 'W'}
+    assert frame.attrs['columns']['plain'] == {'unit': 'kW'}
+    assert frame.attrs['columns']['power'] == {'dis': 'Power'}
+
+    result = Grid.from_dataframe(frame, version=VER_3_0)
+    assert dict(result.column['plain'].items()) == {'unit': 'kW'}
+    assert type(result[0]['plain']) is float
+    assert result[0]['plain'] == 1.5
+    assert isinstance(result[0]['power'], Quantity)
+    assert result[0]['power'].unit == 'W'
+    assert list(result) == list(grid)
+
+
+def test_mixed_timezones():
+    grid = Grid()
+    grid.column['ts'] = {}
+    grid.extend([
+        {'ts': BRISBANE.localize(datetime.datetime(2019, 1, 1))},
+        {'ts': SYDNEY.localize(datetime.datetime(2019, 1, 1))},
+    ])
+    frame = grid.to_dataframe()
+    assert str(frame['ts'].dt.tz) == 'UTC'
+    assert frame['ts'][1] == pandas.Timestamp('2018-12-31T13:00:00Z')
+
+
+@pytest.mark.parametrize('cls', [Grid, ColumnarGrid])
+def test_from_dataframe(cls):
+    grid = make_point_grid(POINTS, columns=POINT_COLUMNS)
+    result = cls.from_dataframe(grid.to_dataframe(), version=VER_3_0)
+    assert isinstance(result, cls)
+    assert result.metadata['dis'] == 'Points'
+    assert dict(result.column['val'].items()) == {'unit': 'kW'}
+    assert result[0] == grid[0]
+    assert result[0]['ts'].tzinfo.zone == 'Australia/Brisbane'
+    # Missing cells come back as None, missing markers as absent.
+    assert result[1] == {'id': Ref('p2'), 'dis': 'Point 2', 'val': None,
+                         'ts': None, 'site': None, 'ok': None,
+                         'misc': 'text'}
+    assert result[2] == {'id': Ref('p3'), 'dis': None,
+                         'val': Quantity(-1.0, 'kW'), 'ts': grid[2]['ts'],
+                         'ok': False, 'misc': None}
+
+
+def test_from_plain_dataframe():
+    frame = pandas.DataFrame({
+        'ts': pandas.to_datetime(['2019-01-01T00:00:00', None]),
+        'val': [1.5, float('nan')],
+        'count': [1, 2],
+        'name': ['a', None],
+    })
+    grid = Grid.from_dataframe(frame)
+    assert list(grid.column.keys()) == ['ts', 'val', 'count', 'name']
+    assert grid[0] == {
+        'ts': datetime.datetime(2019, 1, 1, tzinfo=timezone('UTC')),
+        'val': 1.5, 'count': 1, 'name': 'a'}
+    assert grid[1] == {'ts': None, 'val': None, 'count': 2, 'name': None}
+    assert hszinc.dump(grid)
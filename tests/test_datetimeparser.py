@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Date/time decoding tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import datetime
+
+import iso8601
+import pytest
+
+import hszinc
+from hszinc.datetimeparser import DateTimeParser
+from hszinc.zoneinfo import timezone
+
+
+def _reference(iso_str, tzname):
+    isodt = iso8601.parse_date(iso_str.upper())
+    if not tzname:
+        return isodt
+    return isodt.astimezone(timezone(tzname))
+
+
+def check_same_datetime(expected, actual):
+    assert actual == expected
+    assert actual.replace(tzinfo=None) == expected.replace(tzinfo=None)
+    assert actual.utcoffset() == expected.utcoffset()
+    assert actual.tzname() == expected.tzname()
+
+
+def _hours(start, count, offset, step=datetime.timedelta(minutes=30)):
+    """
+    Generate ISO 8601 strings at `step` intervals with a fixed offset.
+    """
+    for i in range(count):
+        yield (start + (step * i)).isoformat() + offset
+
+
+# Runs of values across DST changes, in the order a history grid would have
+# them.
+SERIES = [
+    # Sydney: DST ends 2019-04-07, starts 2019-10-06
+    ([s for s in _hours(datetime.datetime(2019, 4, 6, 20), 20, '+11:00')] +
+     [s for s in _hours(datetime.datetime(2019, 4, 7, 2), 20, '+10:00')],
+     'Sydney'),
+    ([s for s in _hours(datetime.datetime(2019, 10, 5, 20), 40, '+10:00')],
+     'Sydney'),
+    # New York: values given in UTC, converted to local time
+    ([s for s in _hours(datetime.datetime(2019, 3, 10, 0), 30, 'Z')] +
+     [s for s in _hours(datetime.datetime(2019, 11, 3, 0), 30, 'z')],
+     'New_York'),
+    # Offsets that do not match the zone at all
+    ([s for s in _hours(datetime.datetime(2019, 1, 1), 10, '-05:00')],
+     'Brisbane'),
+    (['2019-01-01T00:00:00Z', '2019-06-01T12:00:00.5Z'], 'UTC'),
+    (['2019-01-01T00:00:00+01:00', '2019-01-01T00:00:00Z'], None),
+    (['2019-01-01T00:00:00.1234567891+10:00'], 'Brisbane'),
+    (['2019-01-01t00:00:00.000001Z'], 'GMT+5'),
+]
+
+
+@pytest.mark.parametrize('values,tzname', SERIES)
+def test_datetime_matches_iso8601(values, tzname):
+    parser = DateTimeParser()
+    # Twice over, so the second pass is served from the caches.
+    for iso_str in values + values:
+        check_same_datetime(_reference(iso_str, tzname),
+                            parser.datetime(iso_str, tzname))
+
+
+def test_datetime_cached_tzinfo():
+    parser = DateTimeParser()
+    first = parser.datetime('2019-01-01T00:00:00+10:00', 'Brisbane')
+    second = parser.datetime('2019-01-02T00:00:00+10:00', 'Brisbane')
+    assert second.tzinfo is first.tzinfo
+
+
+def test_datetime_unknown_zone():
+    parser = DateTimeParser()
+    value = parser.datetime('2019-01-01T00:00:00+10:00', 'Nowhere')
+    assert value.utcoffset() == datetime.timedelta(hours=10)
+    assert value.hour == 0
+
+
+def test_datetime_no_offset():
+    # As iso8601, times without an offset are taken as UTC.
+    value = DateTimeParser().datetime('2019-01-01T00:00:00', None)
+    assert value.utcoffset() == datetime.timedelta(0)
+
+
+def test_invalid_values():
+    parser = DateTimeParser()
+    with pytest.raises(ValueError):
+        parser.date('2019-02-30')
+    with pytest.raises(ValueError):
+        parser.time('24:00:00')
+    with pytest.raises(ValueError):
+        parser.time('12:00:00.1234567')
+    with pytest.raises(ValueError):
+        parser.datetime('2019-02-30T00:00:00Z', 'UTC')
+
+
+def test_date_time():
+    parser = DateTimeParser()
+    assert parser.date('2019-01-02') == datetime.date(2019, 1, 2)
+    assert parser.time('03:04:05') == datetime.time(3, 4, 5)
+    assert parser.time('03:04:05.5') == datetime.time(3, 4, 5, 500000)
+    assert parser.time('03:04:05.000012') == datetime.time(3, 4, 5, 12)
+
+
+def test_history_grid():
+    rows = '\n'.join('%s Sydney,%d' % (iso_str, i) for (i, iso_str) in
+                     enumerate(SERIES[0][0]))
+    grid = hszinc.parse('ver:"3.0"\nts,val\n%s\n' % rows)
+    for (row, iso_str) in zip(grid, SERIES[0][0]):
+        check_same_datetime(_reference(iso_str, 'Sydney'), row['ts'])
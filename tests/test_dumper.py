@@ -5,8 +5,10 @@
 # vim: set ts=4 sts=4 et tw=78 sw=4 si:
 
 import datetime
+import io
 import json
 
+import pytest
 import pytz
 
 import hszinc
@@ -834,3 +836,177 @@ def test_grid_types_json():
             }},
         ],
     }
+
+
+def test_write_grid_json():
+    from hszinc.jsondumper import write_grid, iter_grid
+    grid = make_metadata_grid()
+    grid.column['note'] = {}
+    grid.append({'siteName': 'Quotes " and \\ slashes\nand Café',
+                 'note': 'tab\there'})
+    grid.append({})
+    stream = io.StringIO()
+    write_grid(grid, stream)
+    text = stream.getvalue()
+    assert text == hszinc.dump(grid, mode=hszinc.MODE_JSON)
+    grid_json = json.loads(text)
+    assert grid_json['rows'][2]['siteName'] == \
+        's:Quotes " and \\ slashes\nand Café'
+    assert grid_json['rows'][2]['note'] == 's:tab\there'
+    assert grid_json['rows'][3] == {'siteName': None, 'val': None,
+                                    'note': None}
+    # A piece for the header, one for each row and one to finish.
+    assert len(list(iter_grid(grid))) == len(grid) + 2
+
+
+def test_write_grid_json_empty():
+    grid = hszinc.Grid(version=hszinc.VER_3_0)
+    grid.column['empty'] = {}
+    grid_json = json.loads(hszinc.dump(grid, mode=hszinc.MODE_JSON))
+    assert grid_json == {'meta': {'ver': '3.0'}, 'cols': [{'name': 'empty'}],
+                         'rows': []}
+
+
+def make_long_grid(count, version=hszinc.VER_3_0):
+    grid = hszinc.Grid(version=version, metadata={'dis': 'Long'})
+    grid.column['id'] = {}
+    grid.column['val'] = {'unit': 'kW'}
+    grid.extend([{'id': hszinc.Ref('r%d' % i),
+                  'val': hszinc.Quantity(i, 'kW')} for i in range(count)])
+    return grid
+
+
+def test_iter_dump():
+    grids = [make_long_grid(10), make_simple_grid(), make_long_grid(0)]
+    for mode in (hszinc.MODE_ZINC, hszinc.MODE_JSON):
+        for chunk_rows in (1, 3, 1000):
+            for data in (grids, grids[0], []):
+                assert ''.join(hszinc.iter_dump(data, mode=mode,
+                                                chunk_rows=chunk_rows)) \
+                    == hszinc.dump(data, mode=mode)
+
+
+def test_iter_dump_chunks():
+    grid = make_long_grid(10)
+    # The header comes first, on its own.
+    pieces = list(hszinc.iter_dump(grid, chunk_rows=4))
+    assert pieces[0] == 'ver:"3.0" dis:"Long"\nid,val unit:"kW"\n'
+    assert [piece.count('\n') for piece in pieces[1:]] == [4, 4, 2]
+
+    pieces = list(hszinc.iter_dump(grid, mode=hszinc.MODE_JSON,
+                                   chunk_rows=4))
+    assert pieces[0].startswith('{"meta":')
+    assert [piece.count('"id"') for piece in pieces[1:]] == [4, 4, 2, 0]
+
+
+def test_iter_dump_first_piece():
+    # The header is sent before any row is dumped.
+    grid = make_long_grid(2)
+    grid.append({'id': object()})
+    for mode in (hszinc.MODE_ZINC, hszinc.MODE_JSON):
+        pieces = hszinc.iter_dump(grid, mode=mode, chunk_rows=2)
+        assert 'r0' not in next(pieces)
+        assert 'r1' in next(pieces)
+        with pytest.raises(NotImplementedError):
+            next(pieces)
+
+
+def test_dump_to():
+    grids = [make_long_grid(5), make_metadata_grid()]
+    for mode in (hszinc.MODE_ZINC, hszinc.MODE_JSON):
+        expected = hszinc.dump(grids, mode=mode)
+
+        stream = io.StringIO()
+        hszinc.dump_to(grids, stream, mode=mode, chunk_rows=2)
+        assert stream.getvalue() == expected
+
+        stream = io.BytesIO()
+        hszinc.dump_to(grids, stream, mode=mode, charset='utf-16')
+        assert stream.getvalue().decode('utf-16') == expected
+
+
+class Temperature(object):
+    def __init__(self, celsius):
+        self.celsius = celsius
+
+
+class HotTemperature(Temperature):
+    pass
+
+
+def test_register_scalar_dumper():
+    hszinc.register_scalar_dumper(
+        Temperature, lambda t, version: '%.1f°C' % t.celsius)
+    hszinc.register_scalar_dumper(
+        Temperature, lambda t, version: 'n:%f °C' % t.celsius,
+        mode=hszinc.MODE_JSON)
+    assert hszinc.dump_scalar(Temperature(20)) == '20.0°C'
+    # Subclasses use the dumper of their base class.
+    assert hszinc.dump_scalar(HotTemperature(40)) == '40.0°C'
+    assert hszinc.dump_scalar(HotTemperature(40), mode=hszinc.MODE_JSON) \
+        == 'n:40.000000 °C'
+
+
+class MyUri(hszinc.Uri):
+    pass
+
+
+class MyDateTime(datetime.datetime):
+    pass
+
+
+def test_dump_scalar_subclass():
+    # The nearest base class wins, even where a later one would also match.
+    assert hszinc.dump_scalar(MyUri('http://example.com')) == \
+        '`http://example.com`'
+    assert hszinc.dump_scalar(MyUri('http://example.com'),
+                              mode=hszinc.MODE_JSON) == 'u:http://example.com'
+    value = MyDateTime(2019, 1, 2, 3, 4, 5, tzinfo=pytz.utc)
+    assert hszinc.dump_scalar(value) == '2019-01-02T03:04:05+00:00 UTC'
+
+
+def test_dump_scalar_unhandled():
+    for mode in (hszinc.MODE_ZINC, hszinc.MODE_JSON):
+        with pytest.raises(NotImplementedError):
+            hszinc.dump_scalar(Exception(), mode=mode)
+
+
+def make_mixed_grid():
+    grid = make_long_grid(3)
+    grid.column['mixed'] = {}
+    grid.column['empty'] = {}
+    # More rows than are looked at to find the columns' types.
+    grid.extend([{'id': hszinc.Ref('x%d' % i), 'val': 1.5}
+                 for i in range(200)])
+    grid.extend([
+        {'id': 'not a ref', 'val': None, 'mixed': hszinc.MARKER},
+        {'id': None, 'val': hszinc.Quantity(2, 'kW'), 'mixed': 'text'},
+        {'mixed': [1.0, datetime.date(2019, 1, 2)], 'empty': True},
+    ])
+    return grid
+
+
+def test_row_dumper():
+    from hszinc import zincdumper, jsondumper
+    grid = make_mixed_grid()
+    for module in (zincdumper, jsondumper):
+        _dump_row = module.row_dumper(grid)
+        for row in grid:
+            assert _dump_row(row) == module.dump_row(grid, row)
+
+
+def test_row_dumper_typed_columns(monkeypatch):
+    from hszinc import zincdumper, jsondumper
+    # Columns holding one type of value never go through dump_scalar.
+    grid = make_long_grid(50)
+    grid.append({'id': hszinc.Ref('last')})
+    modules = (zincdumper, jsondumper)
+    expected = [[module.dump_row(grid, row) for row in grid]
+                for module in modules]
+
+    def no_dispatch(scalar, version=None):
+        raise AssertionError('Dispatched %r' % (scalar,))
+    for module in modules:
+        monkeypatch.setattr(module, 'dump_scalar', no_dispatch)
+    assert [list(map(module.row_dumper(grid), grid))
+            for module in modules] == expected
@@ -7,9 +7,14 @@ from datetime import time, date, datetime
 
 from iso8601 import iso8601
 
-from hszinc import Grid, Uri, Ref, Coordinate, MARKER, XStr
+import pytest
+
+import hszinc
+from hszinc import Grid, Uri, Ref, Coordinate, MARKER, XStr, MODE_JSON
 from hszinc.filter_ast import FilterUnary, FilterBinary, FilterPath, FilterAST
-from hszinc.grid_filter import hs_filter, _FnWrapper, filter_function
+from hszinc.grid_filter import hs_filter, _FnWrapper, filter_function, \
+    filter_columns
+from hszinc.zincparser import ZincParseException
 from hszinc.zoneinfo import timezone
 
 
@@ -305,3 +310,97 @@ def test_filter_and_limit():
     grid.append({'equip': 'Chicago', 'hvac': MARKER, 'siteRef': Ref('id1'), 'curVal': 74})
 
     assert len(grid.filter('not acme', limit=1)) == 1
+
+
+def test_filter_columns():
+    assert filter_columns('site or (equip and curVal > 75)') == \
+        ['site', 'equip', 'curVal']
+    assert filter_columns('equip and not equip') == ['equip']
+    assert filter_columns('equip and siteRef->geoCity == "Chicago"') is None
+
+
+PARSE_GRID = '''ver:"2.0"
+id,site,equip,geoCity,curVal,siteRef
+@id1,M,"Chicago",,76
+@id2,,,"Richmond",75
+@id3,,"Chicago",,74,@id1
+'''
+
+PARSE_GRID_JSON = {
+    'meta': {'ver': '2.0'},
+    'cols': [{'name': 'id'}, {'name': 'site'}, {'name': 'equip'},
+             {'name': 'geoCity'}, {'name': 'curVal'}, {'name': 'siteRef'}],
+    'rows': [
+        {'id': 'r:id1', 'site': 'm:', 'equip': 'Chicago', 'curVal': 'n:76'},
+        {'id': 'r:id2', 'geoCity': 'Richmond', 'curVal': 'n:75'},
+        {'id': 'r:id3', 'equip': 'Chicago', 'curVal': 'n:74',
+         'siteRef': 'r:id1'},
+    ],
+}
+
+
+def _ids(grid):
+    return [row['id'].name for row in grid]
+
+
+@pytest.mark.parametrize('grid_str,mode', [
+    (PARSE_GRID, hszinc.MODE_ZINC), (PARSE_GRID_JSON, MODE_JSON)])
+@pytest.mark.parametrize('filter,limit,columns', [
+    ('curVal <= 75', None, None),
+    ('curVal', 1, None),
+    (None, 2, None),
+    ('  ', None, None),
+    ('equip == "Chicago"', None, ['id']),
+    ('equip and siteRef->site', None, None),
+    ('siteRef->site or curVal > 75', 5, ['curVal', 'id']),
+])
+def test_parse_filter(grid_str, mode, filter, limit, columns):
+    # Filtering while parsing gives the same grid as filtering afterwards.
+    expected = hszinc.parse(grid_str, mode=mode)
+    if filter or limit:
+        expected = expected.filter(filter or '', limit=limit or 0)
+    if columns is not None:
+        expected = expected._project(columns)
+
+    grid = hszinc.parse(grid_str, mode=mode, filter=filter, limit=limit,
+                        columns=columns)
+    assert list(grid.column.keys()) == list(expected.column.keys())
+    assert [dict(row) for row in grid] == [dict(row) for row in expected]
+
+
+def test_parse_filter_values():
+    assert _ids(hszinc.parse(PARSE_GRID, filter='curVal <= 75')) == \
+        ['id2', 'id3']
+    assert _ids(hszinc.parse(PARSE_GRID_JSON, mode=MODE_JSON,
+                             filter='site')) == ['id1']
+
+    # The filter may use columns that are not returned
+    grid = hszinc.parse(PARSE_GRID, columns=['id'],
+                        filter='equip == "Chicago"')
+    assert list(grid.column.keys()) == ['id']
+    assert [dict(row) for row in grid] == [{'id': Ref('id1')},
+                                           {'id': Ref('id3')}]
+
+
+def test_parse_filter_lazy():
+    grid = hszinc.parse(PARSE_GRID, filter='curVal > 74', lazy=True)
+    assert _ids(grid) == ['id1', 'id2']
+    # Only the tags read by the filter (and the id) were decoded
+    assert 'Richmond' not in grid[1].decoded_values()
+    assert grid[1]['geoCity'] == 'Richmond'
+
+
+def test_parse_limit_stops_early():
+    # The malformed row is never reached.
+    grid_str = PARSE_GRID + '@id4,oops\n'
+    with pytest.raises(ZincParseException):
+        hszinc.parse(grid_str)
+    assert _ids(hszinc.parse(grid_str, filter='curVal < 76', limit=2)) == \
+        ['id2', 'id3']
+
+
+def test_parse_filter_grammar_fallback():
+    # The reader hands oddities to the grammar, which is filtered after.
+    grid = hszinc.parse('ver:"2.0"\nid,val\n@a,C(1 ,2)\n@b,_5\n',
+                        filter='val', columns=['id'], limit=1)
+    assert [dict(row) for row in grid] == [{'id': Ref('a')}]
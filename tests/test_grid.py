@@ -10,8 +10,12 @@ from __future__ import unicode_literals
 import copy
 import datetime
 
-from hszinc import Grid, Version, VER_3_0, Quantity, Coordinate
+import pytest
+
+from hszinc import Grid, Version, VER_3_0, Quantity, Coordinate, Ref, Uri, \
+    MARKER
 from hszinc.sortabledict import SortableDict
+from .helpers import check_lookups, check_tag_index, make_site_grid
 
 
 def test_grid_given_metadata():
@@ -370,3 +374,72 @@ def test_slice():
     assert len(result) == 2
     assert result['id1']
     assert result['id2']
+
+
+def test_tag_index():
+    check_tag_index(Grid)
+
+
+def test_tag_index_unhashed():
+    grid = Grid(columns={'val': {}})
+    grid.extend([
+        {'val': 5.0}, {'val': Quantity(5.0, 'kW')}, {'val': 5},
+        {'val': Uri('http://example.com/')}, {'val': True}, {'val': 1},
+        {'val': Ref('r', 'R')}, {},
+    ])
+    grid.create_index('val')
+    check_lookups(grid, 'val', [5.0, Quantity(5.0, 'kW'), True, Ref('r'),
+                                Ref('r', 'R'), None,
+                                Uri('http://example.com/')])
+    assert len(grid.lookup('val', 5)) == 3
+
+
+def test_filter_index():
+    grid = make_site_grid()
+    # Comparing a Ref with a number raises, so this row must not be looked
+    # at by the filter.
+    grid.append({'id': Ref('odd'), 'siteRef': Ref('s9'), 'val': Ref('x')})
+    with pytest.raises(TypeError):
+        grid.filter('val > 3 and siteRef == @s1')
+
+    grid.create_index('siteRef')
+    result = grid.filter('val > 3 and siteRef == @s1')
+    assert [row['id'] for row in result] == [Ref('p4'), Ref('p7'),
+                                             Ref('p10')]
+    result = grid.filter('kind == "Number" and siteRef == @s1 and val > 3',
+                         limit=2)
+    assert [row['id'] for row in result] == [Ref('p1'), Ref('p7')]
+    # Terms under "or" cannot narrow the rows down.
+    with pytest.raises(TypeError):
+        grid.filter('val > 3 or siteRef == @s1')
+
+
+def test_grid_extend_chunks():
+    grid = Grid(version=VER_3_0, columns={'id': {}, 'val': {}})
+    grid.append({'val': 0.0})
+    for chunk in range(5):
+        grid.extend(({'id': Ref('p%d' % ((chunk * 10) + i)),
+                      'val': float(i)} for i in range(10)))
+    assert len(grid) == 51
+    assert grid['@p0'] is grid[1]
+    assert grid['@p49'] is grid[50]
+    grid.extend(grid[1:3])
+    assert len(grid) == 53
+    assert grid['@p0'] is grid[51]
+
+
+def test_grid_extend_notdict():
+    grid = Grid(version=VER_3_0, columns={'id': {}})
+    with pytest.raises(TypeError):
+        grid.extend([{'id': Ref('a')}, ['not', 'a', 'dict']])
+    # Nothing is added if any row is rejected.
+    assert len(grid) == 0
+
+
+def test_grid_extend_version():
+    grid = Grid(version='2.0', columns={'val': {}})
+    with pytest.raises(ValueError):
+        grid.extend([{'val': 1.0}, {'val': [1, 2]}])
+    grid = Grid(columns={'val': {}})
+    grid.extend([{'val': 1.0}, {'val': [1, 2]}])
+    assert grid.version == VER_3_0
@@ -1,2 +1,54 @@
+# -*- coding: utf-8 -*-
+# Import time tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+import json
+import os
+import subprocess
+import sys
+
+# Seconds `import hszinc` may take.  Building the grammars and the pint
+# unit registry up front took around 0.7s.
+IMPORT_BUDGET = 0.4
+
+# Modules that should only be loaded once they are needed.
+DEFERRED = ['hszinc.zincgrammar', 'hszinc.filtergrammar', 'pint']
+
+SCRIPT = '''
+import json, sys, time
+start = time.time()
+import hszinc
+elapsed = time.time() - start
+print(json.dumps({'elapsed': elapsed,
+                  'loaded': [m for m in %r if m in sys.modules]}))
+''' % (DEFERRED,)
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _import_hszinc():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(THIS_DIR)] +
+        [p for p in [env.get('PYTHONPATH')] if p])
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT],
+                                     env=env)
+    return json.loads(output.decode('utf-8'))
+
+
 def test_import():
     import hszinc
+
+
+def test_import_defers_setup():
+    assert _import_hszinc()['loaded'] == []
+
+
+def test_import_budget():
+    # Best of a few, to ride out a busy machine.
+    elapsed = min(_import_hszinc()['elapsed'] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET, \
+        'import hszinc took %.3fs, budget is %.3fs' % (elapsed,
+                                                        IMPORT_BUDGET)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# JSON backend tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import datetime
+import json
+
+import pytest
+
+import hszinc
+from hszinc import jsoncodec
+from hszinc.zoneinfo import timezone
+
+BACKENDS = jsoncodec.available_json_backends()
+
+GRID_JSON = {
+    'meta': {'ver': '3.0', 'dis': 's:Café ✓', 'site': 'r:site Site "1"'},
+    'cols': [{'name': 'id'}, {'name': 'val', 'unit': 's:kW'},
+             {'name': 'ts'}, {'name': 'inner'}],
+    'rows': [
+        {'id': 'r:a', 'val': 'n:1.5 kW',
+         'ts': 't:2019-01-01T00:00:00+10:00 Brisbane',
+         'inner': ['m:', 'u:http://example.com/a/b', {'x': 'n:2'}]},
+        {'id': 'r:b', 'val': 12345678901234567890, 'inner': None},
+        {'id': 'r:c', 'val': 0.1, 'inner': True},
+    ],
+}
+
+
+@pytest.fixture
+def backend(request):
+    yield hszinc.use_json_backend(request.param)
+    hszinc.use_json_backend()
+
+
+def test_default_backend():
+    assert 'json' in BACKENDS
+    assert hszinc.use_json_backend() == BACKENDS[0]
+    assert jsoncodec.json_backend() == BACKENDS[0]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        hszinc.use_json_backend('nosuchjson')
+
+
+@pytest.mark.parametrize('backend', BACKENDS, indirect=True)
+def test_parse_same(backend):
+    text = json.dumps(GRID_JSON, ensure_ascii=False)
+    hszinc.use_json_backend('json')
+    expected = hszinc.parse(text, mode=hszinc.MODE_JSON)
+    hszinc.use_json_backend(backend)
+    grid = hszinc.parse(text, mode=hszinc.MODE_JSON)
+    assert grid == expected
+    assert grid[1]['val'] == 12345678901234567890
+    assert grid.metadata['dis'] == 'Café ✓'
+
+
+@pytest.mark.parametrize('backend', BACKENDS, indirect=True)
+def test_dump_same(backend):
+    grid = hszinc.Grid(version=hszinc.VER_3_0,
+                       metadata={'dis': 'Café ✓ "quoted" /slash'})
+    grid.column['val'] = {'unit': 'kW'}
+    grid.column['ts'] = {}
+    grid.extend([
+        {'val': hszinc.Quantity(1.5, 'kW'),
+         'ts': timezone('Brisbane').localize(datetime.datetime(2019, 1, 1))},
+        {'val': [hszinc.MARKER, {'big': 12345678901234567890}]},
+        {'val': True},
+    ])
+    text = hszinc.dump(grid, mode=hszinc.MODE_JSON)
+    assert isinstance(text, type(''))
+    # Compact throughout, however the backend writes it.
+    assert text.startswith('{"meta":{')
+    assert (', "' not in text) and ('": ' not in text)
+    hszinc.use_json_backend('json')
+    assert json.loads(text) == json.loads(
+        hszinc.dump(grid, mode=hszinc.MODE_JSON))
+
+
+@pytest.mark.parametrize('backend', BACKENDS, indirect=True)
+def test_fallback(backend):
+    # The standard library has the final say on what is accepted.
+    assert jsoncodec.loads('[NaN, 1e400]')[1] == float('inf')
+    assert jsoncodec.dumps(2 ** 70) == '1180591620717411303424'
+    with pytest.raises(ValueError):
+        jsoncodec.loads('{"meta": ')
+    with pytest.raises(TypeError):
+        jsoncodec.dumps(object())
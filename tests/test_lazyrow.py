@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Lazily decoded row tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import copy
+import datetime
+import json
+import pickle
+import warnings
+
+import pytest
+
+import hszinc
+from hszinc.lazyrow import LazyRow
+from .pint_enable import _enable_pint
+from .test_zincreader import CORPUS, check_same_value
+
+GRID = '''ver:"3.0"
+id,dis,ts,val,site
+@p1 "Point 1","A \\"quoted\\" name",2019-01-02T03:04:05+10:00 Brisbane,12.5kW,M
+@p2,`http://example.com/`,2019-01-03,-INF,[1,2]
+'''
+
+
+def _parse(grid_str, lazy):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            return hszinc.parse(grid_str, lazy=lazy)
+        except hszinc.zincparser.ZincParseException as zpe:
+            return zpe
+
+
+def check_same_rows(expected, actual):
+    assert len(actual) == len(expected)
+    for (e_row, a_row) in zip(expected, actual):
+        assert list(a_row.keys()) == list(e_row.keys())
+        for key in e_row.keys():
+            if isinstance(e_row[key], hszinc.Grid):
+                check_same_rows(e_row[key], a_row[key])
+            else:
+                check_same_value(e_row[key], a_row[key])
+
+
+@pytest.mark.parametrize('grid_str', CORPUS)
+@pytest.mark.parametrize("with_pint", [(False,), (True,)])
+def test_lazy_conformance(grid_str, with_pint):
+    _enable_pint(with_pint)
+    expected = _parse(grid_str, lazy=False)
+    actual = _parse(grid_str, lazy=True)
+    if isinstance(expected, Exception):
+        assert isinstance(actual, Exception)
+        return
+
+    assert str(actual.version) == str(expected.version)
+    assert list(actual.column.keys()) == list(expected.column.keys())
+    check_same_rows(expected, actual)
+
+
+def test_lazy_decodes_on_access():
+    _enable_pint(False)
+    grid = hszinc.parse(GRID, lazy=True)
+    row = grid[0]
+    assert isinstance(row, LazyRow)
+    assert isinstance(row, dict)
+
+    # Only the id (for the grid index) and the marker have been decoded.
+    assert row.decoded_values() == [hszinc.Ref('p1', 'Point 1'),
+                                    hszinc.MARKER]
+
+    assert row['dis'] == 'A "quoted" name'
+    assert len(row.decoded_values()) == 3
+    assert row.get('val') == hszinc.Quantity(12.5, 'kW')
+    assert row.get('missing') is None
+    assert row['ts'].tzinfo is not None
+    assert row['ts'].utcoffset() == datetime.timedelta(hours=10)
+
+    row = grid[1]
+    assert row['dis'] == hszinc.Uri('http://example.com/')
+    assert row['ts'] == datetime.date(2019, 1, 3)
+    assert row['val'] == -float('inf')
+    assert row['site'] == [1.0, 2.0]
+    assert grid['@p2'] is row
+
+
+def test_lazy_behaves_as_dict():
+    _enable_pint(False)
+    eager = hszinc.parse(GRID)
+    for (e_row, row) in zip(eager, hszinc.parse(GRID, lazy=True)):
+        assert row == e_row
+        assert e_row == row
+        assert not (row != e_row)
+        assert dict(row) == e_row
+        assert dict(**row) == e_row
+        assert {k: v for (k, v) in row.items()} == e_row
+        assert list(row.values()) == list(e_row.values())
+        assert row.copy() == e_row
+        assert type(row.copy()) is dict
+        assert repr(row) == repr(e_row)
+        # Copies are plain dicts, detached from the source text.
+        for clone in (copy.deepcopy(row), pickle.loads(pickle.dumps(row))):
+            assert type(clone) is dict
+            assert list(clone.keys()) == list(e_row.keys())
+            assert clone['ts'] == e_row['ts']
+
+    assert hszinc.dump(hszinc.parse(GRID, lazy=True)) == hszinc.dump(eager)
+
+    row = hszinc.parse(GRID, lazy=True)[0]
+    assert row.pop('dis') == 'A "quoted" name'
+    assert row.setdefault('val') == hszinc.Quantity(12.5, 'kW')
+    row['val'] = 1.0
+    assert row['val'] == 1.0
+    assert 'dis' not in row
+
+    # Lazy rows serialise like any other dict
+    row = hszinc.parse('ver:"2.0"\na,b\n"x",1\n', lazy=True)[0]
+    assert json.dumps(row, sort_keys=True) == '{"a": "x", "b": 1.0}'
+
+
+def test_lazy_inner_grid():
+    grid = hszinc.parse('ver:"3.0"\na\n<<ver:"3.0"\nb\n"c"\n>>\n', lazy=True)
+    inner = grid[0]['a']
+    assert isinstance(inner[0], LazyRow)
+    assert inner[0]['b'] == 'c'
+
+
+def test_lazy_invalid_value_deferred():
+    grid = hszinc.parse('ver:"2.0"\na,b\n2019-02-30,1\n', lazy=True)
+    assert grid[0]['b'] == 1.0
+    with pytest.raises(ValueError):
+        grid[0]['a']
@@ -6,8 +6,10 @@
 
 from __future__ import unicode_literals
 
+import copy
 import datetime
 import json
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import math
 import os
 import warnings
@@ -1411,6 +1413,148 @@ def _check_multi_grid_json_str(pint_en):
     check_null(grid_list[2])
 
 
+@pytest.mark.parametrize("with_pint", [(False,), (True,)])
+def test_multi_grid_workers(with_pint):
+    _enable_pint(with_pint)
+    grid_list = hszinc.parse('\n'.join([
+        SIMPLE_EXAMPLE, METADATA_EXAMPLE, NULL_EXAMPLE] * 4),
+        single=False, workers=2)
+    assert len(grid_list) == 12
+    for offset in range(0, 12, 3):
+        check_simple(grid_list[offset])
+        check_metadata(grid_list[offset + 1])
+        check_null(grid_list[offset + 2])
+
+    grid_list = hszinc.parse([SIMPLE_EXAMPLE_JSON, METADATA_EXAMPLE_JSON],
+                             mode=MODE_JSON, single=False, workers=2)
+    check_simple(grid_list[0])
+    check_metadata(grid_list[1], force_metadata_order=False)
+
+
+@pytest.mark.parametrize('pool_class', [ThreadPoolExecutor,
+                                        ProcessPoolExecutor])
+def test_multi_grid_executor(pool_class):
+    _enable_pint(False)
+    with pool_class(max_workers=2) as executor:
+        grid_list = hszinc.parse('\n'.join([
+            SIMPLE_EXAMPLE, METADATA_EXAMPLE, NULL_EXAMPLE]),
+            single=False, executor=executor)
+    assert len(grid_list) == 3
+    check_simple(grid_list[0])
+    check_metadata(grid_list[1])
+    check_null(grid_list[2])
+
+
+def test_multi_grid_workers_error():
+    try:
+        hszinc.parse('\n'.join([SIMPLE_EXAMPLE,
+                                'ver:"2.0"\nc1,c2\n1,2\n3,oops\n']),
+                     single=False, workers=2)
+        assert False, 'Parsed a malformed grid'
+    except ZincParseException as zpe:
+        assert zpe.line == 4
+        assert 'oops' in str(zpe)
+
+
+@pytest.mark.parametrize('buf_type', [bytes, bytearray, memoryview])
+def test_parse_buffer(buf_type):
+    _enable_pint(False)
+    data = buf_type('\n'.join([
+        SIMPLE_EXAMPLE, METADATA_EXAMPLE, NULL_EXAMPLE]).encode('utf-8')
+                    + b'\n\n')
+    grid_list = hszinc.parse(data, single=False)
+    assert len(grid_list) == 3
+    check_simple(grid_list[0])
+    check_metadata(grid_list[1])
+    check_null(grid_list[2])
+
+    grid = hszinc.parse(buf_type(json.dumps(SIMPLE_EXAMPLE_JSON).encode(
+        'utf-8')), mode=MODE_JSON)
+    check_simple(grid)
+
+
+def test_parse_latin1_buffer():
+    grid = hszinc.parse(memoryview(
+        'ver:"2.0"\na\n"caf\u00e9"\n'.encode('latin-1')), charset='latin-1')
+    assert grid[0]['a'] == 'caf\u00e9'
+
+
+@pytest.mark.parametrize('charset', ['utf-16', 'utf-16-be', 'utf-32'])
+@pytest.mark.parametrize('buf_type', [bytes, memoryview])
+def test_parse_utf16_buffer(charset, buf_type):
+    # Not split on ASCII bytes, which these charsets do not use.
+    _enable_pint(False)
+    data = buf_type('\n'.join([
+        SIMPLE_EXAMPLE, METADATA_EXAMPLE, NULL_EXAMPLE]).encode(charset))
+    grid_list = hszinc.parse(data, charset=charset, single=False)
+    assert len(grid_list) == 3
+    check_simple(grid_list[0])
+    check_metadata(grid_list[1])
+    check_null(grid_list[2])
+
+
+def test_parse_file(tmp_path):
+    _enable_pint(False)
+    path = tmp_path / 'grids.zinc'
+    path.write_bytes('\n'.join([SIMPLE_EXAMPLE, METADATA_EXAMPLE]).encode(
+        'utf-8'))
+    grid_list = hszinc.parse_file(str(path), single=False)
+    assert len(grid_list) == 2
+    check_simple(grid_list[0])
+    check_metadata(grid_list[1])
+
+    # Options are passed through, and lazy rows outlive the mapping.
+    grid = hszinc.parse_file(str(path), lazy=True, columns=['firstName'])
+    assert list(grid.column.keys()) == ['firstName']
+    assert grid[0]['firstName'] == 'Jack'
+
+    path = tmp_path / 'grid.json'
+    path.write_bytes(json.dumps(SIMPLE_EXAMPLE_JSON).encode('utf-8'))
+    check_simple(hszinc.parse_file(str(path), mode=MODE_JSON))
+
+    path = tmp_path / 'empty.zinc'
+    path.write_bytes(b'')
+    with pytest.raises(ZincParseException):
+        hszinc.parse_file(str(path))
+
+
+def test_columns_zinc():
+    _enable_pint(False)
+    grid = hszinc.parse('''ver:"2.0" dis:"Points"
+id,dis,ts,curVal unit:"kW",extra
+@p1,"Point 1",2019-01-02T03:04:05Z UTC,12.5kW,"\\u00e9"
+@p2,"Point 2",,,
+@p3
+''', columns=['curVal', 'id', 'nosuch'])
+    assert grid.metadata['dis'] == 'Points'
+    assert list(grid.column.keys()) == ['curVal', 'id']
+    assert grid.column['curVal']['unit'] == 'kW'
+    assert grid[0] == {'id': hszinc.Ref('p1'),
+                       'curVal': hszinc.Quantity(12.5, 'kW')}
+    assert grid[1] == {'id': hszinc.Ref('p2'), 'curVal': None}
+    assert grid[2] == {'id': hszinc.Ref('p3')}
+    assert grid['@p1'] is grid[0]
+
+    # Skipped cells are still checked.
+    with pytest.raises(ZincParseException):
+        hszinc.parse('ver:"2.0"\nid,dis\n@p1,oops\n', columns=['id'])
+
+
+def test_columns_json():
+    _enable_pint(False)
+    grid = hszinc.parse({
+        'meta': {'ver': '2.0'},
+        'cols': [{'name': 'id'}, {'name': 'ts'}, {'name': 'val'}],
+        'rows': [
+            {'id': 'r:p1', 'ts': 't:2019-01-02T03:04:05Z UTC', 'val': 'n:1'},
+            {'id': 'r:p2'},
+        ],
+    }, mode=MODE_JSON, columns=['val', 'id'])
+    assert list(grid.column.keys()) == ['val', 'id']
+    assert grid[0] == {'id': hszinc.Ref('p1'), 'val': 1.0}
+    assert grid[1] == {'id': hszinc.Ref('p2')}
+
+
 @pytest.mark.parametrize("with_pint", [(False,), (True,)])
 def test_grid_meta(with_pint):
     _check_grid_meta(with_pint)
@@ -1963,6 +2107,39 @@ def _check_scalar_json_rawnum(pint_en):
     assert hszinc.parse_scalar(123.45, mode=MODE_JSON) == 123.45
 
 
+@pytest.mark.parametrize('scalar', [
+    'n:abc', 'n:', 'r:', 'd:2019-1-2', 'h:1:2', 't:2019-01-01', 'u:', 'b:',
+    'c:abc', 'm:x', 'z:x', '-:x', 'q:unknown', 'plain string', '', 'x',
+])
+def test_scalar_json_malformed_prefix(scalar):
+    # Strings that are not valid values of their type are left as they are.
+    assert hszinc.parse_scalar(scalar, mode=MODE_JSON) == scalar
+
+
+@pytest.mark.parametrize('scalar,tzname', [
+    ('2019-04-07T02:30:00+11:00', 'Sydney'),
+    ('2019-04-07T02:30:00+10:00', 'Sydney'),
+    ('2019-11-03T05:30:00.123Z', 'New_York'),
+    ('2019-11-03T05:30:00z', 'UTC'),
+    ('2019-11-03T05:30:00+0200', 'Berlin'),
+])
+def test_scalar_json_datetime_zones(scalar, tzname):
+    expected = hszinc.zoneinfo.timezone(tzname)
+    value = hszinc.parse_scalar('t:%s %s' % (scalar, tzname),
+                                mode=MODE_JSON)
+    reference = hszinc.parse_scalar('t:%s %s' % (scalar.upper(), 'UTC'),
+                                    mode=MODE_JSON)
+    assert value == reference
+    assert value.tzinfo.zone == expected.zone
+    assert value.utcoffset() == \
+            expected.normalize(value.astimezone(expected)).utcoffset()
+
+
+def test_scalar_json_unknown_type():
+    with pytest.raises(TypeError):
+        hszinc.parse_scalar(object(), mode=MODE_JSON)
+
+
 @pytest.mark.parametrize("with_pint", [(False,), (True,)])
 def test_str_version(with_pint):
     _check_str_version(with_pint)
@@ -2030,7 +2207,92 @@ c1, c2
         assert False, 'Parsed a clearly invalid grid'
     except hszinc.zincparser.ZincParseException as zpe:
         assert zpe.line == 4
-        assert zpe.col == 1
+        assert zpe.col == 4
+
+
+@pytest.mark.parametrize("with_pint", [(False,), (True,)])
+def test_malformed_row_collect(with_pint):
+    _enable_pint(with_pint)
+    grid = hszinc.parse('''ver:"2.0"
+c1, c2
+1, "No problems here"
+2, We should fail here
+3, "No issue"
+4, 2019-02-30
+_5, "Only the grammar reads this"
+''', on_error=hszinc.ON_ERROR_COLLECT)
+    assert [row['c1'] for row in grid] == [1.0, 3.0, 5.0]
+    assert [(line, col) for (line, col, message) in grid.errors] == \
+        [(4, 4), (6, 4)]
+    assert 'found \'We\'' in grid.errors[0][2]
+    assert 'out of range' in grid.errors[1][2]
+
+
+def test_malformed_row_collect_options():
+    grid_str = '''ver:"2.0"
+id,site,dis
+@a,M,"A"
+@b,M,oops
+@c
+@d,M,"D"
+@e,M,"E"
+'''
+    for lazy in (False, True):
+        grid = hszinc.parse(grid_str, on_error=hszinc.ON_ERROR_COLLECT,
+                            lazy=lazy, columns=['dis'], filter='site',
+                            limit=2)
+        assert list(grid.column.keys()) == ['dis']
+        assert [row['dis'] for row in grid] == ['A', 'D']
+        assert [error[:2] for error in grid.errors] == [(4, 6)]
+
+    # Filters that follow references keep the errors too.
+    grid = hszinc.parse(grid_str, on_error=hszinc.ON_ERROR_COLLECT,
+                        filter='siteRef->dis')
+    assert len(grid) == 0
+    assert [error[:2] for error in grid.errors] == [(4, 6)]
+
+    # Without on_error, a parsed grid has no errors.
+    assert hszinc.parse(grid_str.replace('oops', '"B"')).errors == []
+
+
+def test_malformed_collect_header():
+    # Only rows can be skipped.
+    with pytest.raises(ZincParseException):
+        hszinc.parse('ver:"2.0" ThisIsNotATag\nempty\n',
+                     on_error=hszinc.ON_ERROR_COLLECT)
+    with pytest.raises(ValueError):
+        hszinc.parse('ver:"2.0"\nempty\n', on_error='ignore')
+
+
+def test_malformed_row_window():
+    grid_str = 'ver:"2.0"\nc1,c2\n' + ('1,2\n' * 10000) + \
+            '3,' + ('x' * 1000) + '\n' + ('1,2\n' * 10)
+    try:
+        hszinc.parse(grid_str)
+        assert False, 'Parsed a clearly invalid grid'
+    except ZincParseException as zpe:
+        assert zpe.line == 10003
+        assert zpe.col == 3
+        # The text is only rendered on demand.
+        assert zpe._formatted is None
+        lines = str(zpe).split('\n')
+        # The message, border, 3 lines either side and the pointer
+        assert len(lines) == 11
+        assert lines[4].startswith('10002| 1,2 ')
+        assert lines[5].startswith('10003 >3,xxx')
+        assert lines[6].index('^') == lines[5].index('3,x') + 2
+        assert max(len(line) for line in lines[1:]) < 200
+
+
+def test_malformed_row_pickle():
+    import pickle
+    try:
+        hszinc.parse('ver:"2.0"\nc1,c2\n1,2\n3,oops\n')
+        assert False, 'Parsed a clearly invalid grid'
+    except ZincParseException as zpe:
+        clone = pickle.loads(pickle.dumps(zpe))
+        assert (clone.line, clone.col) == (zpe.line, zpe.col)
+        assert str(clone) == str(zpe)
 
 
 def test_malformed_zinc_scalar():
@@ -2200,6 +2462,63 @@ def _check_grid_in_grid_in_grid_json(pint_en=True):
     assert isinstance(inner[0]['innerinner'], Grid)
     assert inner[0]['innerinner'][0]['comment'] == "A innerinnergrid"
 
+
+NESTED_JSON = {
+    'meta': {'ver': '3.0', 'site': 'r:site'},
+    'cols': [{'name': 'id'}, {'name': 'tags', 'unit': 's:kW'},
+             {'name': 'inner'}],
+    'rows': [
+        {'id': 'r:a', 'tags': ['n:1 kW', 'm:', {'x': 'd:2019-01-02'}],
+         'inner': {'meta': {'ver': '3.0'}, 'cols': [{'name': 'v'}],
+                   'rows': [{'v': 'n:2'}, {'v': ['s:x']}]}},
+        {'id': 'r:b', 'tags': {'y': 'h:01:02:03'}},
+    ],
+}
+
+
+def _check_nested_json(grid):
+    assert grid.metadata['site'] == hszinc.Ref('site')
+    assert grid.column['tags'] == {'unit': 'kW'}
+    assert grid[0]['id'] == hszinc.Ref('a')
+    assert grid[0]['tags'] == [hszinc.Quantity(1, 'kW'), MARKER,
+                               {'x': datetime.date(2019, 1, 2)}]
+    inner = grid[0]['inner']
+    assert isinstance(inner, Grid)
+    assert [row['v'] for row in inner] == [2.0, ['x']]
+    assert grid[1]['tags'] == {'y': datetime.time(1, 2, 3)}
+
+
+def test_json_decoded_left_alone():
+    data = copy.deepcopy(NESTED_JSON)
+    grid = hszinc.parse(data, mode=MODE_JSON)
+    _check_nested_json(grid)
+    assert data == NESTED_JSON
+    assert grid[0] is not data['rows'][0]
+
+
+def test_json_decoded_consume():
+    data = copy.deepcopy(NESTED_JSON)
+    rows = data['rows']
+    tags = rows[0]['tags']
+    inner_rows = rows[0]['inner']['rows']
+    grid = hszinc.parse(data, mode=MODE_JSON, consume=True)
+    _check_nested_json(grid)
+    # The row dicts and lists are reused rather than copied.
+    assert grid[0] is rows[0]
+    assert grid[1] is rows[1]
+    assert grid[0]['tags'] is tags
+    assert grid[0]['inner'][0] is inner_rows[0]
+
+
+def test_json_decoded_consume_columns():
+    data = copy.deepcopy(NESTED_JSON)
+    grid = hszinc.parse(data, mode=MODE_JSON, consume=True, columns=['id'],
+                        filter='tags')
+    assert list(grid.column.keys()) == ['id']
+    assert grid[0] is data['rows'][0]
+    assert list(grid) == [{'id': hszinc.Ref('a')}, {'id': hszinc.Ref('b')}]
+
+
 def test_unescape():
     assert _unescape("a\\nb") == "a\nb"
 
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+# Streaming parser tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import io
+import json
+
+import pytest
+
+import hszinc
+from hszinc import Grid, MODE_ZINC
+from hszinc.zincparser import ZincParseException
+from .pint_enable import _enable_pint
+
+MULTI_GRID = '''ver:"2.0" database:"test" dis:"Site Energy Summary"
+siteName dis:"Sites", val dis:"Value" unit:"kW"
+"Site 1", 356.214kW
+"Site 2", 463.028kW
+
+ver:"3.0"
+inner,dis
+<<ver:"3.0"
+comment
+"An inner grid"
+>>,"Spans lines"
+[1,2,3],"A list"
+N,"Café"
+'''
+
+
+def _consume(items):
+    """
+    Group the output of iter_parse back into (header, rows) pairs.
+    """
+    grids = []
+    for item in items:
+        if isinstance(item, Grid):
+            grids.append((item, []))
+        else:
+            grids[-1][1].append(item)
+    return grids
+
+
+def check_multi_grid(grids):
+    assert len(grids) == 2
+
+    (header, rows) = grids[0]
+    assert len(header) == 0
+    assert str(header.version) == '2.0'
+    assert list(header.metadata.keys()) == ['database', 'dis']
+    assert list(header.column.keys()) == ['siteName', 'val']
+    assert header.column['val']['unit'] == 'kW'
+    assert rows == [
+        {'siteName': 'Site 1', 'val': hszinc.Quantity(356.214, 'kW')},
+        {'siteName': 'Site 2', 'val': hszinc.Quantity(463.028, 'kW')},
+    ]
+
+    (header, rows) = grids[1]
+    assert str(header.version) == '3.0'
+    assert len(rows) == 3
+    assert isinstance(rows[0]['inner'], Grid)
+    assert rows[0]['inner'][0]['comment'] == 'An inner grid'
+    assert rows[0]['dis'] == 'Spans lines'
+    assert rows[1]['inner'] == [1.0, 2.0, 3.0]
+    assert rows[2] == {'inner': None, 'dis': 'Café'}
+
+
+@pytest.mark.parametrize("with_pint", [(False,), (True,)])
+def test_iter_parse_text(with_pint):
+    _enable_pint(with_pint)
+    check_multi_grid(_consume(hszinc.iter_parse(io.StringIO(MULTI_GRID))))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 4096])
+def test_iter_parse_binary(chunk_size):
+    # Small chunks split multi-byte characters across reads.
+    stream = io.BytesIO(MULTI_GRID.encode('utf-8'))
+    check_multi_grid(_consume(hszinc.iter_parse(stream,
+                                                chunk_size=chunk_size)))
+
+
+def test_iter_parse_str():
+    check_multi_grid(_consume(hszinc.iter_parse(MULTI_GRID)))
+
+
+def test_iter_parse_matches_parse():
+    grids = hszinc.parse(MULTI_GRID, single=False)
+    streamed = _consume(hszinc.iter_parse(MULTI_GRID))
+    assert len(grids) == len(streamed)
+    for (grid, (header, rows)) in zip(grids, streamed):
+        header.extend(rows)
+        assert header == grid
+
+
+def test_iter_parse_is_lazy():
+    class ExplodingStream(io.StringIO):
+        def read(self, size=-1):
+            data = super(ExplodingStream, self).read(size)
+            if not data:
+                raise AssertionError('Read past the first row')
+            return data
+
+    stream = ExplodingStream('ver:"2.0"\nval\n1\n2\n' + ('3\n' * 1000))
+    items = hszinc.iter_parse(stream, chunk_size=16)
+    assert isinstance(next(items), Grid)
+    assert next(items) == {'val': 1.0}
+
+
+def test_iter_parse_grammar_fallback():
+    # Oddities the reader does not accept are handed to the grammar.
+    grid_str = 'ver:"2.0"\na,b\n_5,C(-.5 ,1)\n'
+    streamed = _consume(hszinc.iter_parse(grid_str))
+    assert streamed[0][1] == [hszinc.parse(grid_str)[0]]
+
+
+def test_iter_parse_error_line():
+    stream = io.StringIO('ver:"2.0"\nc1,c2\n1,2\n3,oops\n')
+    items = hszinc.iter_parse(stream, mode=MODE_ZINC)
+    assert next(items).column.keys()
+    assert next(items) == {'c1': 1.0, 'c2': 2.0}
+    try:
+        next(items)
+        assert False, 'Parsed a malformed row'
+    except ZincParseException as zpe:
+        assert zpe.line == 4
+
+
+def test_iter_parse_empty():
+    assert list(hszinc.iter_parse('')) == []
+    assert list(hszinc.iter_parse('\n\n')) == []
+
+
+@pytest.mark.parametrize("with_pint", [(False,), (True,)])
+def test_parse_header(with_pint):
+    _enable_pint(with_pint)
+    # The rows are never looked at, so they may as well be rubbish.
+    grid_str = ('ver:"3.0" err dis:"Oops" hisStart:2019-01-01T00:00:00Z UTC\n'
+                'ts,val unit:"kW"\n') + ('not a row\n' * 1000)
+    for data in (grid_str, grid_str.encode('utf-8'), io.StringIO(grid_str),
+                 io.BytesIO(grid_str.encode('utf-8'))):
+        header = hszinc.parse_header(data)
+        assert isinstance(header, Grid)
+        assert len(header) == 0
+        assert str(header.version) == '3.0'
+        assert header.metadata['err'] is hszinc.MARKER
+        assert header.metadata['dis'] == 'Oops'
+        assert header.metadata['hisStart'].year == 2019
+        assert list(header.column.keys()) == ['ts', 'val']
+        assert header.column['val']['unit'] == 'kW'
+
+
+def test_parse_header_reads_header_only():
+    class ExplodingStream(io.StringIO):
+        def read(self, size=-1):
+            if self.tell() > 100:
+                raise AssertionError('Read past the header')
+            return super(ExplodingStream, self).read(size)
+
+    stream = ExplodingStream('ver:"2.0" more\nid\n' + ('@a\n' * 1000))
+    header = hszinc.parse_header(stream)
+    assert 'more' in header.metadata
+    assert list(header.column.keys()) == ['id']
+
+
+def test_parse_header_empty():
+    assert hszinc.parse_header('') is None
+    with pytest.raises(ZincParseException):
+        hszinc.parse_header('ver:"2.0"\n')
+
+
+def test_parse_header_json():
+    grid_json = {
+        'meta': {'ver': '2.0', 'err': 'm:', 'dis': 's:Oops'},
+        'cols': [{'name': 'ts'}, {'name': 'val', 'unit': 's:kW'}],
+        'rows': [{'ts': 'not decoded'}],
+    }
+    for data in (grid_json, json.dumps(grid_json),
+                 json.dumps(grid_json).encode('utf-8'),
+                 io.StringIO(json.dumps(grid_json))):
+        header = hszinc.parse_header(data, mode=hszinc.MODE_JSON)
+        assert len(header) == 0
+        assert str(header.version) == '2.0'
+        assert header.metadata['err'] is hszinc.MARKER
+        assert header.metadata['dis'] == 'Oops'
+        assert list(header.column.keys()) == ['ts', 'val']
+        assert header.column['val']['unit'] == 'kW'
+
+
+@pytest.mark.parametrize('buf_type', [bytes, bytearray, memoryview])
+def test_iter_parse_buffer(buf_type):
+    data = buf_type(MULTI_GRID.encode('utf-8'))
+    check_multi_grid(_consume(hszinc.iter_parse(data, chunk_size=5)))
+    assert list(hszinc.parse_header(data).column.keys()) == \
+        ['siteName', 'val']
+
+
+MULTI_GRID_JSON = [
+    {
+        'meta': {'ver': '2.0', 'database': 's:test',
+                 'dis': 's:Site Energy Summary'},
+        'cols': [{'name': 'siteName', 'dis': 's:Sites'},
+                 {'name': 'val', 'dis': 's:Value', 'unit': 's:kW'}],
+        'rows': [{'siteName': 's:Site 1', 'val': 'n:356.214 kW'},
+                 {'siteName': 's:Site 2', 'val': 'n:463.028 kW'}],
+    },
+    {
+        'meta': {'ver': '3.0'},
+        'cols': [{'name': 'inner'}, {'name': 'dis'}],
+        'rows': [{'inner': {'meta': {'ver': '3.0'},
+                            'cols': [{'name': 'comment'}],
+                            'rows': [{'comment': 's:An inner grid'}]},
+                  'dis': 's:Spans lines'},
+                 {'inner': ['n:1', 'n:2', 'n:3'], 'dis': 's:A list'},
+                 {'inner': None, 'dis': 's:Café'}],
+    },
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 4096])
+def test_iter_parse_json(chunk_size):
+    text = json.dumps(MULTI_GRID_JSON, indent=1, ensure_ascii=False)
+    for stream in (io.StringIO(text), io.BytesIO(text.encode('utf-8'))):
+        check_multi_grid(_consume(hszinc.iter_parse(
+            stream, mode=hszinc.MODE_JSON, chunk_size=chunk_size)))
+
+
+def test_iter_parse_json_single():
+    grid_json = MULTI_GRID_JSON[0]
+    streamed = _consume(hszinc.iter_parse(json.dumps(grid_json),
+                                          mode=hszinc.MODE_JSON))
+    (header, rows) = streamed[0]
+    header.extend(rows)
+    assert header == hszinc.parse(grid_json, mode=hszinc.MODE_JSON)
+
+
+def test_iter_parse_json_numbers():
+    # Raw numbers may be split across chunks.
+    grid_json = {'meta': {'ver': '3.0'}, 'cols': [{'name': 'v'}],
+                 'rows': [{'v': 12345.678}, {'v': 987654321}]}
+    stream = io.StringIO(json.dumps(grid_json, separators=(',', ':')))
+    items = list(hszinc.iter_parse(stream, mode=hszinc.MODE_JSON,
+                                   chunk_size=3))
+    assert items[1:] == [{'v': 12345.678}, {'v': 987654321}]
+
+
+def test_iter_parse_json_rows_first():
+    # Rows ahead of the header have to be held until it is known.
+    text = '{"rows": [{"a": "n:1"}], "cols": [{"name": "a"}], ' \
+           '"meta": {"ver": "2.0"}}'
+    streamed = _consume(hszinc.iter_parse(text, mode=hszinc.MODE_JSON))
+    assert list(streamed[0][0].column.keys()) == ['a']
+    assert streamed[0][1] == [{'a': 1.0}]
+
+
+def test_iter_parse_json_large_value(monkeypatch):
+    # A value spanning many chunks is not decoded again for every chunk.
+    decodes = []
+    raw_decode = json.JSONDecoder.raw_decode
+
+    def counting_decode(self, s, idx=0):
+        decodes.append(idx)
+        return raw_decode(self, s, idx)
+    monkeypatch.setattr(json.JSONDecoder, 'raw_decode', counting_decode)
+
+    rows = [{'a': 'n:%d' % i} for i in range(5000)]
+    text = json.dumps({'rows': rows, 'cols': [{'name': 'a'}],
+                       'meta': {'ver': '2.0'}})
+    streamed = _consume(hszinc.iter_parse(io.StringIO(text),
+                                          mode=hszinc.MODE_JSON,
+                                          chunk_size=64))
+    assert streamed[0][1] == [{'a': float(i)} for i in range(5000)]
+    assert len(decodes) < 50
+
+
+def test_iter_parse_json_is_lazy():
+    class ExplodingStream(io.StringIO):
+        def read(self, size=-1):
+            if self.tell() > 200:
+                raise AssertionError('Read past the first row')
+            return super(ExplodingStream, self).read(size)
+
+    rows = ','.join(['{"val": "n:1"}'] * 1000)
+    stream = ExplodingStream('{"meta": {"ver": "2.0"}, '
+                             '"cols": [{"name": "val"}], '
+                             '"rows": [%s]}' % rows)
+    items = hszinc.iter_parse(stream, mode=hszinc.MODE_JSON, chunk_size=16)
+    assert isinstance(next(items), Grid)
+    assert next(items) == {'val': 1.0}
+
+
+@pytest.mark.parametrize('text', [
+    '{"meta": {"ver": "2.0"}, "cols": [], "rows": [{"a": "n:1"} {}]}',
+    '{"meta": {"ver": "2.0"}, "cols": [], "rows": [{"a": "n:1"}, ]}',
+    '{"meta": {"ver": "2.0"}, "rows": []}',
+    '{"meta": {"ver": "2.0"}, "cols": []} x',
+    '{"meta": {"ver": "2.0"}, "cols": [], "rows": [',
+])
+def test_iter_parse_json_malformed(text):
+    with pytest.raises(ValueError):
+        list(hszinc.iter_parse(io.StringIO(text), mode=hszinc.MODE_JSON,
+                               chunk_size=8))
+
+
+def test_iter_parse_json_malformed_is_lazy():
+    # A malformed row fails at once, not once the rest has been read.
+    class ExplodingStream(io.StringIO):
+        def read(self, size=-1):
+            if self.tell() > 200:
+                raise AssertionError('Read past the malformed row')
+            return super(ExplodingStream, self).read(size)
+
+    rows = ','.join(['{"val": "n:1"}'] * 1000)
+    stream = ExplodingStream('{"meta": {"ver": "2.0"}, '
+                             '"cols": [{"name": "val"}], '
+                             '"rows": [{"val": oops}, %s]}' % rows)
+    items = hszinc.iter_parse(stream, mode=hszinc.MODE_JSON, chunk_size=16)
+    assert isinstance(next(items), Grid)
+    with pytest.raises(ValueError) as error:
+        next(items)
+    assert 'at char 69' in str(error.value)
+
+
+def test_iter_parse_json_empty():
+    assert list(hszinc.iter_parse('', mode=hszinc.MODE_JSON)) == []
+    assert list(hszinc.iter_parse(' [ ] ', mode=hszinc.MODE_JSON)) == []
+
+
+def test_parse_header_json_reads_header_only():
+    class ExplodingStream(io.BytesIO):
+        def read(self, size=-1):
+            if self.tell() > 100:
+                raise AssertionError('Read past the header')
+            return super(ExplodingStream, self).read(size)
+
+    stream = ExplodingStream(('{"meta": {"ver": "2.0", "more": "m:"}, '
+                              '"cols": [{"name": "id"}], "rows": [%s]}'
+                              % ','.join(['{"id": "r:a"}'] * 1000)
+                              ).encode('utf-8'))
+    header = hszinc.parse_header(stream, mode=hszinc.MODE_JSON)
+    assert 'more' in header.metadata
+    assert list(header.column.keys()) == ['id']
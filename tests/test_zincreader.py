@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# Zinc reader conformance tests
+# (C) 2018 VRT Systems
+#
+# vim: set ts=4 sts=4 et tw=78 sw=4 si:
+
+from __future__ import unicode_literals
+
+import ast
+import datetime
+import io
+import math
+import os
+import warnings
+
+import pytest
+
+import hszinc
+from hszinc import Grid
+from hszinc.parser import GRID_SEP, TRAILING_NL_RE
+from hszinc.zincparser import parse_grid, parse_scalar, ZincParseException, \
+    ENGINE_READER, ENGINE_PYPARSING
+from .pint_enable import _enable_pint
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load_corpus():
+    """
+    Collect every Zinc grid embedded in the parser test suite.
+    """
+    with io.open(os.path.join(THIS_DIR, 'test_parser.py'),
+                 encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    corpus = []
+    for node in ast.walk(tree):
+        value = getattr(node, 'value', getattr(node, 's', None))
+        if not isinstance(value, type(u'')) or not value.startswith('ver:'):
+            continue
+        for grid_str in GRID_SEP.split(TRAILING_NL_RE.sub('\n', value)):
+            if grid_str not in corpus:
+                corpus.append(grid_str)
+    return corpus
+
+
+CORPUS = _load_corpus()
+
+
+def _parse(grid_str, engine):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            return parse_grid(grid_str, engine=engine)
+        except ZincParseException as zpe:
+            return zpe
+
+
+def check_same_value(expected, actual):
+    assert type(actual) is type(expected), \
+        '%r is not the same type as %r' % (actual, expected)
+    if isinstance(expected, Grid):
+        check_same_grid(expected, actual)
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for (e, a) in zip(expected, actual):
+            check_same_value(e, a)
+    elif isinstance(expected, dict):
+        assert list(actual.keys()) == list(expected.keys())
+        for key in expected.keys():
+            check_same_value(expected[key], actual[key])
+    elif isinstance(expected, float) and math.isnan(expected):
+        assert math.isnan(actual)
+    elif isinstance(expected, hszinc.Quantity):
+        assert (actual.value, actual.unit) == (expected.value, expected.unit)
+    elif isinstance(expected, datetime.datetime):
+        assert actual == expected
+        assert actual.tzinfo == expected.tzinfo
+    else:
+        assert actual == expected
+
+
+def check_same_grid(expected, actual):
+    assert str(actual.version) == str(expected.version)
+    check_same_value(dict(expected.metadata), dict(actual.metadata))
+    assert list(actual.column.keys()) == list(expected.column.keys())
+    for col in expected.column.keys():
+        check_same_value(dict(expected.column[col]),
+                         dict(actual.column[col]))
+    assert len(actual) == len(expected)
+    for (e, a) in zip(expected, actual):
+        check_same_value(e, a)
+
+
+def test_corpus_found():
+    # Make sure the corpus extraction has not silently broken.
+    assert len(CORPUS) > 40
+
+
+@pytest.mark.parametrize('grid_str', CORPUS)
+@pytest.mark.parametrize("with_pint", [(False,), (True,)])
+def test_reader_conformance(grid_str, with_pint):
+    _enable_pint(with_pint)
+    expected = _parse(grid_str, ENGINE_PYPARSING)
+    actual = _parse(grid_str, ENGINE_READER)
+
+    if isinstance(expected, ZincParseException):
+        assert isinstance(actual, ZincParseException), \
+            'Reader accepted a grid the grammar rejects: %r' % grid_str
+    else:
+        assert not isinstance(actual, ZincParseException), \
+            'Reader rejected %r: %s' % (grid_str, actual)
+        check_same_grid(expected, actual)
+
+
+@pytest.mark.parametrize('grid_str', [
+    'ver:"2.0"\na\n1',                      # Missing final newline
+    'ver:"2.0"  foo\na\n1\n',               # Two spaces between tags
+    'ver:"2.0"\na\n 1\n',                   # Leading space
+    'ver:"2.0"\na\nNA\n',                   # NA is Haystack 3.0
+    'ver:"2.0"\na\n[1]\n',                  # Lists are Haystack 3.0
+    'ver:"3.0"\na\n[,1]\n',
+    'ver:"3.0"\na\nBin(text/plain)\n',      # Bin is Haystack 2.0
+    'ver:"3.0"\na\n{a : 1}\n',
+    'ver:"3.0"\na\n"\\u00"\n',
+])
+def test_reader_rejects(grid_str):
+    assert isinstance(_parse(grid_str, ENGINE_PYPARSING), ZincParseException)
+    assert isinstance(_parse(grid_str, ENGINE_READER), ZincParseException)
+
+
+def test_reader_error_position():
+    try:
+        parse_grid('ver:"2.0"\nc1, c2\n1, "ok"\n2, oops\n',
+                   engine=ENGINE_READER)
+        assert False, 'Parsed a clearly invalid grid'
+    except ZincParseException as zpe:
+        assert zpe.line == 4
+        assert zpe.col == 4
+
+
+@pytest.mark.parametrize('scalar_str', [
+    'N', 'M', 'T', '1.5kg', '-INF', '"a\\nb"', '@ref "Dis"', '`uri`',
+    '2010-11-28T07:23:02.500-08:00 Los_Angeles', '12:34:56', '2010-11-28',
+    'C(1.5,-2)', '[1,"a",{b c:2}]', 'hex("deadbeef")',
+])
+def test_scalar_conformance(scalar_str):
+    expected = parse_scalar(scalar_str, hszinc.VER_3_0,
+                            engine=ENGINE_PYPARSING)
+    actual = parse_scalar(scalar_str, hszinc.VER_3_0, engine=ENGINE_READER)
+    check_same_value(expected, actual)
+
+
+@pytest.mark.parametrize('grid_str', CORPUS)
+def test_reader_projection(grid_str):
+    _enable_pint(False)
+    full = _parse(grid_str, ENGINE_PYPARSING)
+    if isinstance(full, ZincParseException):
+        return
+
+    # Every other column, in reverse, plus one that is not there.
+    columns = list(full.column.keys())[::-2] + ['missing']
+    expected = full._project(columns)
+    assert list(expected.column.keys()) == columns[:-1]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        actual = parse_grid(grid_str, engine=ENGINE_READER, columns=columns)
+    check_same_grid(expected, actual)
+
+
+def test_collect_reader():
+    # Without the grammar to fall back on, oddities are errors.
+    grid = parse_grid('ver:"2.0"\nc1,c2\n1,2\n_5,6\n7,8\n',
+                      engine=ENGINE_READER, on_error=hszinc.ON_ERROR_COLLECT)
+    assert [row['c1'] for row in grid] == [1.0, 7.0]
+    assert [error[:2] for error in grid.errors] == [(4, 1)]
+
+
+def test_fallback_inner_grid():
+    # The reader rejects a value inside an inner grid spanning lines; the
+    # grammar gets the whole grid.
+    grid_str = 'ver:"3.0"\na,b\n<<ver:"3.0"\nc\n_5\n>>,1\n'
+    grid = hszinc.parse(grid_str)
+    assert grid[0]['a'][0]['c'] == 5.0
+    assert grid[0]['b'] == 1.0
@@ -11,6 +11,7 @@ from hszinc import zoneinfo
 import iso8601
 import datetime
 import pytz
+import pytest
 
 def test_get_tz_map():
     # This should return a mapping of all possible timezone names.
@@ -78,3 +79,55 @@ def test_oddball_iso8601_datetime():
         assert False, 'Matched an oddball timezone'
     except ValueError:
         pass
+
+def check_timezone_name(dt, expected=None):
+    # Whatever the name, it must give the same offset at that time.
+    name = zoneinfo.timezone_name(dt)
+    if expected is not None:
+        assert name == expected
+    local = dt.astimezone(zoneinfo.timezone(name))
+    assert local.utcoffset() == dt.utcoffset()
+    return name
+
+def test_fixed_offset_datetime():
+    for hours in range(-12, 15):
+        offset = datetime.timedelta(hours=hours)
+        tz = datetime.timezone(offset)
+        expected = 'UTC' if not hours else 'GMT%+d' % -hours
+        for month in (1, 7):
+            check_timezone_name(datetime.datetime(2019, month, 1, tzinfo=tz),
+                                expected)
+            check_timezone_name(
+                datetime.datetime(2019, month, 1,
+                                  tzinfo=pytz.FixedOffset(hours * 60)),
+                expected)
+
+def test_fractional_offset_datetime():
+    # No fixed zone for these, so each time has to be checked.
+    tz = datetime.timezone(datetime.timedelta(hours=9, minutes=30))
+    assert check_timezone_name(datetime.datetime(2019, 1, 1, tzinfo=tz)) \
+            != check_timezone_name(datetime.datetime(2019, 7, 1, tzinfo=tz))
+    tz = datetime.timezone(datetime.timedelta(hours=5, minutes=45))
+    for month in range(1, 13):
+        check_timezone_name(datetime.datetime(2019, month, 1, tzinfo=tz))
+
+def test_timezone_name_cached(monkeypatch):
+    tz = datetime.timezone(datetime.timedelta(hours=3))
+    assert zoneinfo.timezone_name(datetime.datetime(2019, 1, 1, tzinfo=tz)) \
+            == 'GMT-3'
+    def fail(dt, offset):
+        raise AssertionError('Not cached')
+    monkeypatch.setattr(zoneinfo, '_resolve_timezone', fail)
+    assert zoneinfo.timezone_name(datetime.datetime(2020, 6, 1, tzinfo=tz)) \
+            == 'GMT-3'
+
+def test_stdlib_zoneinfo():
+    stdlib_zoneinfo = pytest.importorskip('zoneinfo')
+    for (key, name) in (('Australia/Sydney', 'Sydney'),
+                        ('America/New_York', 'New_York'),
+                        ('UTC', 'UTC')):
+        try:
+            tz = stdlib_zoneinfo.ZoneInfo(key)
+        except stdlib_zoneinfo.ZoneInfoNotFoundError:  # pragma: no cover
+            pytest.skip('No time zone data')
+        check_timezone_name(datetime.datetime(2019, 1, 1, tzinfo=tz), name)